@@ -1,10 +1,107 @@
 from django.contrib import admin
-from .models import MoodModel, UserPreference, Playlist, Track, SpecializedPlaylist
+from .models import MoodModel, UserPreference, Playlist, Track, SpecializedPlaylist, CatalogTrack, LLMCallRecord, LLMUsageRollup, PromptTemplate, PooledPlaylist, IdempotencyRecord, ArchivedHistoryMonth
 
-admin.site.register(MoodModel)
-admin.site.register(UserPreference)
-admin.site.register(Playlist)
-admin.site.register(Track)
+# __str__ of these models follows foreign keys, so the changelists join them up front
+# and the FK widgets use raw ids instead of rendering every related row.
+@admin.register(MoodModel)
+class MoodModelAdmin(admin.ModelAdmin):
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+@admin.register(UserPreference)
+class UserPreferenceAdmin(admin.ModelAdmin):
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+@admin.register(Playlist)
+class PlaylistAdmin(admin.ModelAdmin):
+    list_select_related = ('mood__user',)
+    raw_id_fields = ('mood', 'prompt_template')
+    readonly_fields = ('prompt_used', 'version')
+
+@admin.register(PromptTemplate)
+class PromptTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'version', 'created_at', 'content_hash')
+    list_filter = ('name',)
+
+    # Playlists point at a version by id and re-render it, so versions are never edited in place.
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Track)
+class TrackAdmin(admin.ModelAdmin):
+    raw_id_fields = ('playlist',)
+
+@admin.register(CatalogTrack)
+class CatalogTrackAdmin(admin.ModelAdmin):
+    list_display = ('title', 'artist', 'album', 'times_matched', 'last_verified_at')
+    search_fields = ('title', 'artist', 'spotify_uri')
+
+@admin.register(PooledPlaylist)
+class PooledPlaylistAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'favorite_genre', 'energy_bucket', 'time_of_day', 'season', 'market_code', 'expires_at')
+    list_filter = ('category', 'energy_bucket', 'time_of_day', 'season')
+    raw_id_fields = ('prompt_template',)
+
+@admin.register(LLMCallRecord)
+class LLMCallRecordAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'call_site', 'model', 'user', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'outcome')
+    list_filter = ('call_site', 'outcome', 'model')
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    search_fields = ('user__username',)
+
+    # Records are append-only.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(LLMUsageRollup)
+class LLMUsageRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'call_site', 'model', 'user', 'calls', 'failed_calls', 'skipped_calls', 'prompt_tokens', 'completion_tokens', 'average_latency_ms', 'latency_ms_p95')
+    list_filter = ('call_site', 'model')
+    list_select_related = ('user',)
+    date_hierarchy = 'day'
+    search_fields = ('user__username',)
+
+    @admin.display(description='Avg latency (ms)')
+    def average_latency_ms(self, obj):
+        return round(obj.latency_ms_sum / obj.calls) if obj.calls else None
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedHistoryMonth)
+class ArchivedHistoryMonthAdmin(admin.ModelAdmin):
+    list_display = ('user', 'month', 'mood_count', 'playlist_count', 'track_count', 'archived_at')
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    exclude = ('data',)
+
+    # Written only by `archive_history`.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'response_status', 'created_at', 'expires_at')
+    list_select_related = ('user',)
+    search_fields = ('key', 'user__username')
+    raw_id_fields = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 @admin.register(SpecializedPlaylist)
 class SpecializedPlaylistAdmin(admin.ModelAdmin):
@@ -0,0 +1,58 @@
+import re
+from collections import namedtuple
+
+# Playlist.alternates holds [title, artist, album, duration, spotify_uri, energy] lists, energy 1-10 or None.
+Alternate = namedtuple('Alternate', ['title', 'artist', 'album', 'duration', 'spotify_uri', 'energy'])
+Feedback = namedtuple('Feedback', ['direction', 'specific'])
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Comment words that ask for more (1) or less (-1) energy than the playlist's mood.
+DIRECTION_WORDS = {
+    'slow': 1, 'boring': 1, 'sleepy': 1, 'dull': 1, 'upbeat': 1, 'energetic': 1, 'faster': 1, 'louder': 1, 'livelier': 1, 'hype': 1,
+    'fast': -1, 'loud': -1, 'aggressive': -1, 'intense': -1, 'noisy': -1, 'calmer': -1, 'slower': -1, 'softer': -1, 'chill': -1, 'relaxing': -1,
+}
+# Words that say nothing beyond "not this one"; a comment made only of these, direction words and
+# stop words can be answered from the alternates. Anything else (an artist, a language, an era...)
+# is specific enough that it goes to the LLM.
+GENERIC_WORDS = {
+    'a', 'an', 'the', 'it', "it's", 'its', 'this', 'that', 'is', 'was', 'too', 'so', 'very', 'bit', 'little', 'really', 'just',
+    'i', "i'm", 'me', 'my', 'not', "don't", 'dont', 'do', 'no', 'like', 'love', 'hate', 'dislike', 'want', 'need', 'something',
+    'song', 'track', 'one', 'music', 'more', 'less', 'kind', 'of', 'for', 'mood', 'vibe', 'fit', 'fits', "doesn't", 'doesnt',
+    'bad', 'meh', 'ok', 'okay', 'fine', 'good', 'great', 'nice', 'please', 'else', 'other', 'different', 'and', 'but', 'or', 'to', 'be',
+    'heard', 'before', 'already', 'again', 'many', 'times', 'overplayed', 'skip', 'annoying', 'enough', 'anymore',
+}
+
+
+def encode(track, energy=None):
+    return [track['title'], track['artist'], track.get('album'), track.get('duration'), track['spotify_uri'], energy]
+
+
+def decode(entries):
+    return [Alternate(*entry) for entry in entries or []]
+
+
+def parse_feedback(comment):
+    words = _WORD_RE.findall((comment or '').lower())
+    direction = sum(DIRECTION_WORDS.get(word, 0) for word in words)
+    specific = any(word not in GENERIC_WORDS and word not in DIRECTION_WORDS for word in words)
+    return Feedback(direction=(direction > 0) - (direction < 0), specific=specific)
+
+
+def target_energy(mood_energy, rating, feedback):
+    """The energy to aim for: the mood's, shifted in the asked direction, further for worse ratings."""
+    shift = 3 if rating <= 2 else 1.5
+    return int(mood_energy) + feedback.direction * shift
+
+
+def pick(entries, mood_energy, target, exclude_uris=()):
+    """Index into `entries` of the unused alternate closest to `target` energy, or None."""
+    best_index, best_distance = None, None
+    for index, alternate in enumerate(decode(entries)):
+        if alternate.spotify_uri in exclude_uris:
+            continue
+        energy = alternate.energy if alternate.energy is not None else int(mood_energy)
+        distance = abs(energy - target)
+        if best_distance is None or distance < best_distance:
+            best_index, best_distance = index, distance
+    return best_index
@@ -0,0 +1,190 @@
+import math
+from collections import defaultdict
+from itertools import chain
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .archive import archived_moods
+from .models import LLMCallRecord, LLMUsageRollup, MoodModel, MoodRollup
+
+PERIODS = ('day', 'week', 'month')
+
+
+def period_start(day, period):
+    """First day of the day/week/month bucket containing `day`. Weeks start on Monday."""
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period '{period}'.")
+
+
+def _mood_day(mood):
+    return timezone.localtime(mood.timestamp).date() if timezone.is_aware(mood.timestamp) else mood.timestamp.date()
+
+
+def _category(mood):
+    return mood.category or 'Other'
+
+
+def apply_mood(mood, sign):
+    """Adds (sign=1) or removes (sign=-1) one mood from its day, week and month buckets."""
+    day = _mood_day(mood)
+    energy = int(mood.energy_level)
+    for period in PERIODS:
+        bucket = {
+            'user_id': mood.user_id,
+            'period': period,
+            'period_start': period_start(day, period),
+            'category': _category(mood),
+        }
+        deltas = {
+            'mood_count': F('mood_count') + sign,
+            'energy_sum': F('energy_sum') + sign * energy,
+            'energy_squares_sum': F('energy_squares_sum') + sign * energy * energy,
+        }
+        if MoodRollup.objects.filter(**bucket).update(**deltas):
+            continue
+        if sign < 0:
+            continue
+        try:
+            with transaction.atomic():
+                MoodRollup.objects.create(**bucket, mood_count=1, energy_sum=energy, energy_squares_sum=energy * energy)
+        except IntegrityError:
+            # Another request created the bucket between our UPDATE and INSERT.
+            MoodRollup.objects.filter(**bucket).update(**deltas)
+
+    if sign < 0:
+        MoodRollup.objects.filter(user_id=mood.user_id, mood_count__lte=0).delete()
+
+
+def rebuild_rollups(user=None):
+    """Recomputes rollups from scratch, for one user or everybody, including archived moods."""
+    moods = MoodModel.objects.all() if user is None else MoodModel.objects.filter(user=user)
+    buckets = defaultdict(lambda: [0, 0, 0])
+    live_moods = moods.only('user_id', 'timestamp', 'category', 'energy_level').iterator(chunk_size=2000)
+    for mood in chain(live_moods, archived_moods(user)):
+        day = _mood_day(mood)
+        energy = int(mood.energy_level)
+        for period in PERIODS:
+            totals = buckets[(mood.user_id, period, period_start(day, period), _category(mood))]
+            totals[0] += 1
+            totals[1] += energy
+            totals[2] += energy * energy
+
+    with transaction.atomic():
+        rollups = MoodRollup.objects.all() if user is None else MoodRollup.objects.filter(user=user)
+        rollups.delete()
+        MoodRollup.objects.bulk_create(
+            [
+                MoodRollup(
+                    user_id=user_id, period=period, period_start=start, category=category,
+                    mood_count=count, energy_sum=energy_sum, energy_squares_sum=energy_squares_sum,
+                )
+                for (user_id, period, start, category), (count, energy_sum, energy_squares_sum) in buckets.items()
+            ],
+            batch_size=1000,
+        )
+    return len(buckets)
+
+
+def _energy_stats(count, energy_sum, energy_squares_sum):
+    if not count:
+        return {'average': None, 'stddev': None}
+    average = energy_sum / count
+    variance = max(0.0, energy_squares_sum / count - average * average)
+    return {'average': round(average, 2), 'stddev': round(math.sqrt(variance), 2)}
+
+
+def mood_report(user_id, period, date_from=None, date_to=None):
+    """Category distribution and energy statistics per bucket, read from the rollup table only."""
+    rollups = MoodRollup.objects.filter(user_id=user_id, period=period)
+    if date_from:
+        rollups = rollups.filter(period_start__gte=period_start(date_from, period))
+    if date_to:
+        rollups = rollups.filter(period_start__lte=date_to)
+
+    buckets = {}
+    overall = {'count': 0, 'energy_sum': 0, 'energy_squares_sum': 0, 'categories': defaultdict(int)}
+    rows = rollups.order_by('period_start').values_list('period_start', 'category', 'mood_count', 'energy_sum', 'energy_squares_sum')
+    for start, category, count, energy_sum, energy_squares_sum in rows:
+        bucket = buckets.setdefault(start, {'count': 0, 'energy_sum': 0, 'energy_squares_sum': 0, 'categories': {}})
+        for totals in (bucket, overall):
+            totals['count'] += count
+            totals['energy_sum'] += energy_sum
+            totals['energy_squares_sum'] += energy_squares_sum
+        bucket['categories'][category] = count
+        overall['categories'][category] += count
+
+    return {
+        'period': period,
+        'buckets': [
+            {
+                'period_start': start,
+                'total': bucket['count'],
+                'categories': bucket['categories'],
+                'energy': _energy_stats(bucket['count'], bucket['energy_sum'], bucket['energy_squares_sum']),
+            }
+            for start, bucket in buckets.items()
+        ],
+        'totals': {
+            'total': overall['count'],
+            'categories': dict(overall['categories']),
+            'energy': _energy_stats(overall['count'], overall['energy_sum'], overall['energy_squares_sum']),
+        },
+    }
+
+
+def _day_bounds(day_from, day_to):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(day_from, time.min), tz),
+        timezone.make_aware(datetime.combine(day_to + timedelta(days=1), time.min), tz),
+    )
+
+
+def rollup_llm_usage(day_from, day_to):
+    """Rebuilds the daily LLMUsageRollup rows for day_from..day_to (inclusive) from the raw call records."""
+    start, end = _day_bounds(day_from, day_to)
+    groups = defaultdict(lambda: {'calls': 0, 'failed_calls': 0, 'skipped_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'latencies': []})
+    rows = (
+        LLMCallRecord.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values_list('created_at', 'call_site', 'model', 'user_id', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'outcome')
+        .iterator(chunk_size=5000)
+    )
+    for created_at, call_site, model, user_id, prompt_tokens, completion_tokens, latency_ms, outcome in rows:
+        totals = groups[(timezone.localtime(created_at).date(), call_site, model, user_id)]
+        if outcome == 'skipped':
+            totals['skipped_calls'] += 1
+            continue
+        totals['calls'] += 1
+        totals['failed_calls'] += outcome != 'success'
+        totals['prompt_tokens'] += prompt_tokens
+        totals['completion_tokens'] += completion_tokens
+        totals['latencies'].append(latency_ms)
+
+    rollups = []
+    for (day, call_site, model, user_id), totals in groups.items():
+        latencies = sorted(totals.pop('latencies'))
+        p95 = latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)] if latencies else 0
+        rollups.append(LLMUsageRollup(
+            day=day, call_site=call_site, model=model, user_id=user_id,
+            latency_ms_sum=sum(latencies), latency_ms_p95=p95, **totals,
+        ))
+
+    with transaction.atomic():
+        LLMUsageRollup.objects.filter(day__gte=day_from, day__lte=day_to).delete()
+        LLMUsageRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def prune_llm_calls(older_than_days):
+    """Deletes raw call records older than the retention window; their days must already be rolled up."""
+    cutoff, _ = _day_bounds(timezone.localdate() - timedelta(days=older_than_days), timezone.localdate())
+    deleted, _ = LLMCallRecord.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
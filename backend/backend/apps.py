@@ -10,13 +10,15 @@ class BackendAppConfig(AppConfig):
     name = 'backend'
 
     def ready(self):
+        from . import checks, signals  # noqa: F401
+
         app_env = os.environ.get('APP_ENV')
         run_main = os.environ.get('RUN_MAIN')
         django_settings_module = os.environ.get('DJANGO_SETTINGS_MODULE')
         sys_argv = os.sys.argv
 
         is_reloader = bool(django_settings_module and run_main == 'true')
-        is_management_command = any(cmd in sys_argv for cmd in ['makemigrations', 'migrate', 'collectstatic', 'createsuperuser'])
+        is_management_command = any(cmd in sys_argv for cmd in ['makemigrations', 'migrate', 'collectstatic', 'createsuperuser', 'run_benchmarks', 'benchmark_json', 'run_simulators', 'load_test', 'rebuild_mood_rollups', 'rollup_llm_usage', 'refill_playlist_pool', 'rebuild_track_features', 'benchmark_connections', 'archive_history', 'rebalance_track_keys', 'check_throttle_sharing'])
 
         should_run_startup_logic = (app_env == 'docker_startup') or (not is_reloader and not is_management_command)
 
@@ -0,0 +1,156 @@
+import contextvars
+import json
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedHistoryMonth, MoodModel, Playlist, Track
+
+# ArchivedHistoryMonth.data decompresses to {"format": 1, "moods": [...]}, where each mood is a list of
+# MOOD_FIELDS values followed by its playlists, each playlist a list of PLAYLIST_FIELDS values followed
+# by its tracks, each track a list of TRACK_FIELDS values. Moods are in time order. A track's
+# order_in_playlist is its 0-based position in the playlist.
+ARCHIVE_FORMAT = 1
+MOOD_FIELDS = ('id', 'mood_text', 'energy_level', 'timestamp', 'season', 'category')
+PLAYLIST_FIELDS = ('id', 'name', 'created_at', 'prompt_template_id', 'prompt_params', 'llm_fallback_count', 'total_tracks_generated')
+TRACK_FIELDS = ('id', 'title', 'artist', 'album', 'duration', 'spotify_uri', 'order_in_playlist')
+
+# Set while moods are being archived: they leave the live tables but the analytics rollups keep counting them.
+_archiving = contextvars.ContextVar('archiving_history', default=False)
+
+
+def is_archiving():
+    return _archiving.get()
+
+
+@contextmanager
+def _archiving_moods():
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def month_bounds(month):
+    """(first day, first day of the next month) for a date in the month."""
+    first = month.replace(day=1)
+    return first, (first + timedelta(days=32)).replace(day=1)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def encode(moods):
+    payload = {'format': ARCHIVE_FORMAT, 'moods': moods}
+    return zlib.compress(json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode(), 9)
+
+
+def decode(data):
+    if not data:
+        return []
+    payload = json.loads(zlib.decompress(bytes(data)))
+    if payload.get('format') != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported history archive format {payload.get('format')!r}.")
+    return payload['moods']
+
+
+def _packed_timestamp(entry):
+    # Freshly packed moods hold datetimes, decoded ones ISO strings.
+    value = entry[MOOD_FIELDS.index('timestamp')]
+    return value if isinstance(value, datetime) else parse_datetime(value)
+
+
+def _pack_track(track, position):
+    return [position if name == 'order_in_playlist' else getattr(track, name) for name in TRACK_FIELDS]
+
+
+def _pack_mood(mood):
+    return [
+        *(getattr(mood, name) for name in MOOD_FIELDS),
+        [
+            [*(getattr(playlist, name) for name in PLAYLIST_FIELDS), [_pack_track(track, position) for position, track in enumerate(playlist.tracks.all())]]
+            for playlist in mood.playlists.all()
+        ],
+    ]
+
+
+def archivable_months(cutoff, user=None):
+    """(user_id, first day of month) pairs that have moods older than `cutoff`, oldest first."""
+    moods = MoodModel.objects.filter(timestamp__lt=cutoff)
+    if user is not None:
+        moods = moods.filter(user=user)
+    months = moods.annotate(month=TruncMonth('timestamp')).values_list('user_id', 'month').distinct().order_by('month', 'user_id')
+    return [(user_id, month.date() if hasattr(month, 'date') else month) for user_id, month in months]
+
+
+def archive_month(user_id, month, cutoff):
+    """
+    Moves the user's moods from `month` that are older than `cutoff`, with their playlists and tracks, into
+    the month's ArchivedHistoryMonth row (merging with what is already there) and deletes them from the live
+    tables. Mood analytics rollups keep counting them. Returns (moods, playlists, tracks) moved.
+    """
+    first, next_first = month_bounds(month)
+    moods_qs = (
+        MoodModel.objects.filter(user_id=user_id, timestamp__gte=_start_of(first), timestamp__lt=min(_start_of(next_first), cutoff))
+        .order_by('timestamp')
+        .prefetch_related(Prefetch(
+            'playlists',
+            queryset=Playlist.objects.order_by('created_at').prefetch_related(Prefetch('tracks', queryset=Track.objects.order_by('order_key', 'id'))),
+        ))
+    )
+    with transaction.atomic():
+        moods = list(moods_qs.select_for_update(of=('self',)))
+        if not moods:
+            return 0, 0, 0
+        record, _ = ArchivedHistoryMonth.objects.select_for_update().get_or_create(user_id=user_id, month=first, defaults={'data': b''})
+        packed = decode(record.data) + [_pack_mood(mood) for mood in moods]
+        packed.sort(key=_packed_timestamp)
+
+        playlists = sum(len(mood.playlists.all()) for mood in moods)
+        tracks = sum(len(playlist.tracks.all()) for mood in moods for playlist in mood.playlists.all())
+        record.data = encode(packed)
+        record.mood_count = len(packed)
+        record.playlist_count += playlists
+        record.track_count += tracks
+        record.save()
+
+        with _archiving_moods():
+            MoodModel.objects.filter(pk__in=[mood.pk for mood in moods]).delete()
+    return len(moods), playlists, tracks
+
+
+def expand(record):
+    """The archived moods of `record`, newest first, shaped like MoodSerializer with playlists and tracks expanded."""
+    moods = []
+    for entry in reversed(decode(record.data)):
+        *mood_values, playlists = entry
+        mood = dict(zip(MOOD_FIELDS, mood_values))
+        mood['playlists'] = []
+        for playlist_entry in playlists:
+            *playlist_values, tracks = playlist_entry
+            playlist = dict(zip(PLAYLIST_FIELDS, playlist_values))
+            playlist['tracks'] = [dict(zip(TRACK_FIELDS, values)) for values in tracks]
+            mood['playlists'].append(playlist)
+        moods.append(mood)
+    return moods
+
+
+def archived_moods(user=None):
+    """Unsaved MoodModel instances for every archived mood, with the fields the analytics rollups use."""
+    records = ArchivedHistoryMonth.objects.all() if user is None else ArchivedHistoryMonth.objects.filter(user=user)
+    for record in records.iterator(chunk_size=100):
+        for entry in decode(record.data):
+            mood = dict(zip(MOOD_FIELDS, entry))
+            yield MoodModel(
+                user_id=record.user_id, timestamp=parse_datetime(mood['timestamp']),
+                energy_level=mood['energy_level'], category=mood['category'], season=mood['season'],
+            )
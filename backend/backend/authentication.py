@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+# Loaded from the cache instead of the database; everything else (the password hash in particular) stays
+# deferred and is fetched from the database only if a view reads it.
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser', 'date_joined')
+
+
+def user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def forget_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """
+    The default: a real User instance, read from the shared cache for up to AUTH_USER_CACHE_SECONDS.
+    Saving or deleting a user clears its entry (see signals.py), so deactivation takes effect at once.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN or not settings.AUTH_USER_CACHE_SECONDS:
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        values = cache.get(user_cache_key(user_id)) if user_id is not None else None
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(user_cache_key(user.pk), [getattr(user, name) for name in CACHED_USER_FIELDS], settings.AUTH_USER_CACHE_SECONDS)
+            return user
+        return User.from_db('default', CACHED_USER_FIELDS, values)
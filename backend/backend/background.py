@@ -0,0 +1,37 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='background')
+    return _executor
+
+
+def _run(func, args):
+    # The pool's threads are long-lived, so like request threads they keep their connection for
+    # CONN_MAX_AGE and health-check it before each task.
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception as e:
+        logger.error(f"Background task {func.__name__} failed: {str(e)}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args):
+    """
+    Runs func(*args) on a small per-process thread pool once the current transaction commits
+    (immediately outside one), so the task sees the rows the request just wrote. Fire and forget:
+    exceptions are logged, and queued tasks are lost if the process exits.
+    """
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, args))
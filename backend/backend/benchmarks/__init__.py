@@ -0,0 +1,5 @@
+"""
+Offline benchmark suite for the API hot paths.
+
+Run with `python manage.py run_benchmarks`; see that command for the options.
+"""
@@ -0,0 +1,90 @@
+import math
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import transaction
+
+from backend.query_budget import QueryBudgetExceeded, query_budget, record_queries
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def call(scenario, client, context):
+    if not scenario.writes:
+        return scenario.request(client, context)
+    # Writes are rolled back so every iteration sees the same seeded data.
+    with transaction.atomic():
+        response = scenario.request(client, context)
+        transaction.set_rollback(True)
+    return response
+
+
+def run_scenario(scenario, client, context, iterations, warmup):
+    """
+    Latency is measured on plain calls; query counts and allocations each get a separate
+    instrumented call so their overhead does not leak into the timings. The query count call
+    runs under the endpoint's query_budget, if it has one.
+    """
+    for _ in range(warmup):
+        response = call(scenario, client, context)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{scenario.name} returned HTTP {response.status_code}: {response.content[:300]!r}")
+
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = call(scenario, client, context)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+
+    budget = settings.QUERY_BUDGETS.get(scenario.endpoint)
+    over_budget = None
+    try:
+        with (record_queries() if budget is None else query_budget(scenario.endpoint)) as queries:
+            response = call(scenario, client, context)
+    except QueryBudgetExceeded as exceeded:
+        over_budget = str(exceeded)
+
+    tracemalloc.start()
+    call(scenario, client, context)
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'status_code': response.status_code,
+        'response_bytes': len(response.content),
+        'mean_ms': round(statistics.fmean(durations) * 1000, 3),
+        'p50_ms': round(percentile(durations, 50) * 1000, 3),
+        'p90_ms': round(percentile(durations, 90) * 1000, 3),
+        'p99_ms': round(percentile(durations, 99) * 1000, 3),
+        'max_ms': round(durations[-1] * 1000, 3),
+        'queries': queries.count,
+        'query_budget': budget,
+        'over_budget': over_budget,
+        'db_time_ms': round(queries.total_time * 1000, 3),
+        'peak_alloc_kb': round(peak / 1024, 1),
+        'retained_alloc_kb': round(allocated / 1024, 1),
+    }
+
+
+def compare(previous, current, threshold_pct):
+    """Yields (scenario, scale, metric, old, new, change_pct, regressed) for matching results of two runs."""
+    previous_results = {(r['scenario'], r['scale']): r for r in previous['results']}
+    for result in current['results']:
+        old = previous_results.get((result['scenario'], result['scale']))
+        if not old:
+            continue
+        for metric in ('p50_ms', 'p99_ms', 'queries', 'peak_alloc_kb'):
+            before, after = old[metric], result[metric]
+            change = ((after - before) / before * 100) if before else (0.0 if after == before else math.inf)
+            regressed = after > before if metric == 'queries' else change > threshold_pct
+            yield result['scenario'], result['scale'], metric, before, after, change, regressed
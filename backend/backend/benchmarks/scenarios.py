@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable
+    writes: bool = False
+    # URL name whose QUERY_BUDGETS entry applies; the scenario name when not given.
+    endpoint: str = None
+
+    def __post_init__(self):
+        self.endpoint = self.endpoint or self.name
+
+
+def _create_mood_and_playlist(client, context):
+    return client.post('/api/mood-playlist/', {
+        'mood_text': "Tired but hopeful after a long week",
+        'energy_level': 6,
+        'favorite_genre': 'Indie',
+        'song_count': 10,
+        'playlist_goal': 'Unwind',
+    }, format='json')
+
+
+def _reorder_playlist_tracks(client, context):
+    return client.post(
+        f"/api/playlists/{context['playlist_id']}/tracks/reorder/",
+        {'track_ids': list(reversed(context['track_ids']))},
+        format='json',
+    )
+
+
+def _add_track_to_playlist(client, context):
+    return client.post(
+        f"/api/playlists/{context['playlist_id']}/tracks/add/",
+        {'title': "Benchmark Added Song", 'artist': "Benchmark Artist", 'album': "Benchmark Album"},
+        format='json',
+    )
+
+
+SCENARIOS = [
+    Scenario('create_mood_and_playlist', _create_mood_and_playlist, writes=True),
+    Scenario('playlist_history', lambda client, context: client.get('/api/playlists/history/')),
+    Scenario('playlist_history_expanded', lambda client, context: client.get('/api/playlists/history/?expand=tracks'), endpoint='playlist_history'),
+    Scenario('mood_history', lambda client, context: client.get('/api/mood-history/')),
+    Scenario('mood_history_expanded', lambda client, context: client.get('/api/mood-history/?expand=playlists.tracks'), endpoint='mood_history'),
+    Scenario('mood_history_archive', lambda client, context: client.get('/api/mood-history/archive/')),
+    Scenario('reorder_playlist_tracks', _reorder_playlist_tracks, writes=True, endpoint='playlist_tracks_reorder'),
+    Scenario('add_track_to_playlist', _add_track_to_playlist, writes=True, endpoint='playlist_track_add'),
+    Scenario('specialized_playlists', lambda client, context: client.get('/api/specialized-playlists/')),
+]
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from backend import prompts
+from backend.analytics import rebuild_rollups
+from backend.management.commands.generate_specialized_playlists import SEED_PLAYLIST_TEMPLATES
+from backend.models import MoodModel, Playlist, SpecializedPlaylist, Track
+from backend.ordering import keys_between
+
+TRACKS_PER_PLAYLIST = 7
+BATCH_SIZE = 5000
+CATEGORIES = ["Happy", "Sad", "Calm", "Excited", "Anxious", "Nostalgic"]
+PROMPT_PARAMS = {
+    'feeling_description': "is feeling 'tired but hopeful after a long week'",
+    'mood_category': 'Calm',
+    'time_of_day': 'Evening',
+    'season': 'Fall',
+    'energy_level': 5,
+    'favorite_genre': 'Indie',
+    'market_code': None,
+    'playlist_goal': None,
+    'song_count': TRACKS_PER_PLAYLIST,
+}
+
+
+def benchmark_username(scale):
+    return f"benchmark_{scale}"
+
+
+def seed_user(scale):
+    """
+    Returns a user owning `scale` moods, each with one playlist of TRACKS_PER_PLAYLIST tracks.
+    An existing user of the right size is reused, so --keepdb runs skip seeding.
+    """
+    user, _ = User.objects.get_or_create(username=benchmark_username(scale), defaults={'email': f"benchmark_{scale}@example.com"})
+    if MoodModel.objects.filter(user=user).count() == scale:
+        return user
+
+    MoodModel.objects.filter(user=user).delete()
+    prompt_template, _ = prompts.playlist_generation_prompt(PROMPT_PARAMS)
+    order_keys = keys_between(None, None, TRACKS_PER_PLAYLIST)
+    now = timezone.now()
+    for batch_start in range(0, scale, BATCH_SIZE):
+        batch_range = range(batch_start, min(batch_start + BATCH_SIZE, scale))
+        moods = MoodModel.objects.bulk_create([
+            MoodModel(
+                user=user, mood_text=f"Benchmark mood {i}: tired but hopeful after a long week",
+                energy_level=i % 10 + 1, timestamp=now - timedelta(minutes=i), season='Fall',
+                category=CATEGORIES[i % len(CATEGORIES)],
+            )
+            for i in batch_range
+        ])
+        playlists = Playlist.objects.bulk_create([
+            Playlist(
+                mood=mood, name=f"Benchmark Playlist {i}", created_at=mood.timestamp,
+                prompt_template=prompt_template, prompt_params={**PROMPT_PARAMS, 'energy_level': mood.energy_level},
+                total_tracks_generated=TRACKS_PER_PLAYLIST,
+            )
+            for i, mood in zip(batch_range, moods)
+        ])
+        Track.objects.bulk_create([
+            Track(
+                playlist=playlist, title=f"Benchmark Song {track_index}", artist=f"Benchmark Artist {track_index}",
+                album="Benchmark Album", duration="3:30", spotify_uri=f"spotify:track:bench{playlist.pk}x{track_index}",
+                order_key=order_keys[track_index],
+            )
+            for playlist in playlists
+            for track_index in range(TRACKS_PER_PLAYLIST)
+        ], batch_size=BATCH_SIZE)
+
+    rebuild_rollups(user=user)
+    return user
+
+
+def seed_specialized_playlists():
+    today = timezone.now().date()
+    for template in SEED_PLAYLIST_TEMPLATES:
+        SpecializedPlaylist.objects.update_or_create(
+            name=template['name'],
+            defaults={
+                'description': template['description'],
+                'generation_prompt_keywords': template['generation_prompt_keywords'],
+                'target_song_count': template['target_song_count'],
+                'last_refreshed_date': today,
+                'cached_tracks': [
+                    {'id': i, 'title': f"Specialized Song {i}", 'artist': "Specialized Artist", 'duration': "3:30", 'spotify_track_id': None}
+                    for i in range(template['target_song_count'])
+                ],
+            },
+        )
@@ -0,0 +1,43 @@
+import json
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest import mock
+
+
+def _completion(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+    )
+
+
+def fake_chat_completion(call_site, deadline=None, **kwargs):
+    """Canned OpenAI responses for every call site, returned without any network access."""
+    if call_site == 'mood_category':
+        return _completion("Calm")
+    if call_site == 'track_replacement':
+        return _completion(json.dumps({"title": "Stub Replacement", "artist": "Stub Artist", "duration": "3:30"}))
+    tracks = [{"title": f"Stub Song {i}", "artist": f"Stub Artist {i}", "duration": "3:30"} for i in range(15)]
+    return _completion(json.dumps({"playlist_name": "Benchmark Stub Playlist", "tracks": tracks}))
+
+
+def fake_spotify_search(title, artist, market_code=None):
+    return {
+        "title": title,
+        "artist": artist,
+        "album": "Stub Album",
+        "duration_ms": 210000,
+        "duration": "3:30",
+        "spotify_uri": f"spotify:track:stub-{abs(hash((title, artist)))}",
+    }
+
+
+def stubbed_upstreams():
+    """Patches OpenAI, Spotify, GeoIP and DRF throttling so benchmarks run offline and unthrottled."""
+    stack = ExitStack()
+    stack.enter_context(mock.patch('backend.llm.chat_completion', side_effect=fake_chat_completion))
+    stack.enter_context(mock.patch('backend.views._search_spotify_for_track_details', side_effect=fake_spotify_search))
+    stack.enter_context(mock.patch('backend.views.geoip_reader', None))
+    stack.enter_context(mock.patch('rest_framework.throttling.SimpleRateThrottle.allow_request', return_value=True))
+    stack.enter_context(mock.patch('backend.throttling.LockedHistoryMixin.allow_request', return_value=True))
+    return stack
@@ -0,0 +1,38 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from spotipy.cache_handler import CacheHandler
+
+SPECIALIZED_PLAYLISTS_KEY = 'specialized_playlists'
+
+
+def _digest(*parts):
+    # Keys built from user-provided text are hashed so they are safe for every backend, memcached included.
+    return hashlib.sha1('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def spotify_miss_key(title, artist, market_code):
+    return f"spotify_miss:{_digest(title.strip().lower(), artist.strip().lower(), market_code or '')}"
+
+
+def is_known_spotify_miss(title, artist, market_code):
+    return cache.get(spotify_miss_key(title, artist, market_code)) is not None
+
+
+def remember_spotify_miss(title, artist, market_code):
+    cache.set(spotify_miss_key(title, artist, market_code), True, settings.CACHE_TTLS['SPOTIFY_MISS'])
+
+
+class SpotifyTokenCacheHandler(CacheHandler):
+    """Keeps the client-credentials token in the shared cache, so all workers use one token instead of fetching their own."""
+
+    def __init__(self, client_id, token_url):
+        self.key = f"spotify_token:{_digest(client_id, token_url)}"
+
+    def get_cached_token(self):
+        return cache.get(self.key)
+
+    def save_token_to_cache(self, token_info):
+        # spotipy refreshes tokens that are about to expire, so the entry only has to outlive the token.
+        cache.set(self.key, token_info, int(token_info.get('expires_in', 3600)))
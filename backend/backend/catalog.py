@@ -0,0 +1,216 @@
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogTrack
+
+logger = logging.getLogger(__name__)
+
+_BRACKETED = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]')
+_FEATURING = re.compile(r'\s+(feat\.?|ft\.?|featuring)\s+.*$')
+_VERSION_SUFFIX = re.compile(r'\s+-\s+(from\s.*|.*\b(remaster(ed)?|version|edit|mix|live|mono|stereo)\b.*)$')
+_NON_WORD = re.compile(r'[\W_]+')
+
+CANDIDATE_LIMIT = 10
+TITLE_WEIGHT = 0.65
+ARTIST_WEIGHT = 0.35
+
+
+def normalize(text):
+    """Lowercases, strips accents, bracketed/featuring/remaster suffixes and punctuation."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _BRACKETED.sub('', text)
+    text = _VERSION_SUFFIX.sub('', text)
+    text = _FEATURING.sub('', text)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def trigrams(text):
+    """Same trigram set pg_trgm builds: every word padded with two leading and one trailing space."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def similarity(a, b):
+    """Pure-Python equivalent of pg_trgm's similarity() for already normalized strings."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def _artist_similarity(query_artist, catalog_artist):
+    # Spotify lists every credited artist ("Mark Ronson, Bruno Mars") while the LLM usually
+    # names the main one, so the best match against any single credited artist counts.
+    credited = [normalize(name) for name in catalog_artist.split(',')] + [normalize(catalog_artist)]
+    return max(similarity(query_artist, name) for name in credited)
+
+
+def _candidates(normalized_title, market_code):
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        tracks = CatalogTrack.objects.filter(normalized_title__trigram_similar=normalized_title)
+        if market_code:
+            tracks = tracks.filter(markets__contains=[market_code])
+        return list(
+            tracks
+            .annotate(title_similarity=TrigramSimilarity('normalized_title', normalized_title))
+            .order_by('-title_similarity')[:CANDIDATE_LIMIT]
+        )
+
+    scored = []
+    for track in CatalogTrack.objects.all().iterator():
+        if market_code and market_code not in track.markets:
+            continue
+        score = similarity(normalized_title, track.normalized_title)
+        if score >= 0.3:
+            scored.append((score, track))
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return [track for _, track in scored[:CANDIDATE_LIMIT]]
+
+
+def _duration_ms(duration):
+    try:
+        minutes, seconds = duration.split(':')
+        return (int(minutes) * 60 + int(seconds)) * 1000
+    except (AttributeError, ValueError):
+        return 0
+
+
+class CatalogWrites:
+    """
+    Catalog writes gathered while resolving the songs of one playlist, applied in a few statements by
+    flush() instead of several round trips per song. Safe to fill from the resolver threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matched = Counter()
+        self._verified = {}
+
+    def add_match(self, track_pk):
+        with self._lock:
+            self._matched[track_pk] += 1
+
+    def add_verified(self, details, market_code=None):
+        if not details.get('spotify_uri'):
+            return
+        with self._lock:
+            _, markets = self._verified.get(details['spotify_uri'], (None, set()))
+            if market_code:
+                markets.add(market_code)
+            self._verified[details['spotify_uri']] = (details, markets)
+
+    def flush(self):
+        with self._lock:
+            matched, self._matched = self._matched, Counter()
+            verified, self._verified = self._verified, {}
+        by_increment = {}
+        for pk, increment in matched.items():
+            by_increment.setdefault(increment, []).append(pk)
+        for increment, pks in by_increment.items():
+            CatalogTrack.objects.filter(pk__in=pks).update(times_matched=F('times_matched') + increment)
+        if verified:
+            _write_verified(verified)
+
+
+def _write_verified(verified):
+    """
+    Upserts {spotify_uri: (details, markets)}. Missing rows are inserted first, then all rows are locked
+    and updated together, so the markets merge is a read-modify-write under the row lock and a resolve
+    in another market at the same time can't drop this one (or have this one dropped).
+    """
+    now = timezone.now()
+    fields = {
+        uri: {
+            'title': details['title'],
+            'artist': details['artist'],
+            'album': details.get('album'),
+            'duration': details.get('duration'),
+            'normalized_title': normalize(details['title']),
+            'normalized_artist': normalize(details['artist']),
+            'last_verified_at': now,
+        }
+        for uri, (details, _) in verified.items()
+    }
+    with transaction.atomic():
+        CatalogTrack.objects.bulk_create(
+            [CatalogTrack(spotify_uri=uri, **values) for uri, values in fields.items()], ignore_conflicts=True,
+        )
+        # Locked in a fixed order so two playlists verifying the same songs can't deadlock.
+        tracks = list(CatalogTrack.objects.select_for_update().filter(spotify_uri__in=fields).order_by('spotify_uri'))
+        for track in tracks:
+            for name, value in fields[track.spotify_uri].items():
+                setattr(track, name, value)
+            track.markets = sorted(set(track.markets) | verified[track.spotify_uri][1])
+        CatalogTrack.objects.bulk_update(tracks, [
+            'title', 'artist', 'album', 'duration', 'normalized_title', 'normalized_artist', 'last_verified_at', 'markets',
+        ])
+
+
+def resolve(title, artist, market_code=None, writes=None):
+    """
+    Looks up an LLM-suggested song in the local catalog of verified tracks; with a market, only
+    tracks Spotify found in that market count.
+    Returns the track details (same keys as the Spotify search result plus 'confidence')
+    when the best match reaches CATALOG_MATCH_THRESHOLD, otherwise None. The match is counted
+    in `writes` when given, otherwise right away.
+    """
+    normalized_title = normalize(title)
+    normalized_artist = normalize(artist)
+    if not normalized_title:
+        return None
+
+    best_track, best_confidence = None, 0.0
+    for track in _candidates(normalized_title, market_code):
+        confidence = (
+            TITLE_WEIGHT * similarity(normalized_title, track.normalized_title)
+            + ARTIST_WEIGHT * _artist_similarity(normalized_artist, track.artist)
+        )
+        if confidence > best_confidence:
+            best_track, best_confidence = track, confidence
+
+    if not best_track or best_confidence < settings.CATALOG_MATCH_THRESHOLD:
+        return None
+
+    if writes is None:
+        CatalogTrack.objects.filter(pk=best_track.pk).update(times_matched=F('times_matched') + 1)
+    else:
+        writes.add_match(best_track.pk)
+    logger.info(f"Catalog match for '{title}' by '{artist}' -> '{best_track.title}' by '{best_track.artist}' (confidence {best_confidence:.2f})")
+    return {
+        "title": best_track.title,
+        "artist": best_track.artist,
+        "album": best_track.album,
+        "duration_ms": _duration_ms(best_track.duration),
+        "duration": best_track.duration,
+        "spotify_uri": best_track.spotify_uri,
+        "confidence": round(best_confidence, 3),
+    }
+
+
+def record_verified_track(details, market_code=None):
+    """Adds or refreshes a Spotify-verified track in the catalog, noting the market it was found in."""
+    writes = CatalogWrites()
+    writes.add_verified(details, market_code)
+    writes.flush()
+
+
+def record_rating(spotify_uri, rating):
+    """Adds a 1-5 rating to a catalog track; a no-op for tracks that never resolved to the catalog."""
+    if spotify_uri:
+        CatalogTrack.objects.filter(spotify_uri=spotify_uri).update(
+            rating_sum=F('rating_sum') + rating, rating_count=F('rating_count') + 1,
+        )
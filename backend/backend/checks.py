@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core import checks
+
+
+def connections_per_worker():
+    """Most connections one gunicorn worker can hold at once: its request thread, the background pool and one request's resolve threads."""
+    return 1 + settings.BACKGROUND_WORKERS + settings.TRACK_RESOLVE_CONCURRENCY
+
+
+@checks.register()
+def connection_budget(app_configs, **kwargs):
+    peak = settings.GUNICORN_WORKERS * connections_per_worker()
+    if peak <= settings.DB_MAX_CONNECTIONS:
+        return []
+    return [
+        checks.Warning(
+            f"{settings.GUNICORN_WORKERS} gunicorn workers can open up to {peak} database connections, "
+            f"but DB_MAX_CONNECTIONS is {settings.DB_MAX_CONNECTIONS}.",
+            hint=(
+                "Lower GUNICORN_WORKERS, BACKGROUND_WORKERS or TRACK_RESOLVE_CONCURRENCY, raise max_connections, "
+                "or put PgBouncer in front (DB_POOLER=pgbouncer) and set DB_MAX_CONNECTIONS to its max_client_conn."
+            ),
+            id='backend.W001',
+        )
+    ]
@@ -0,0 +1,119 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from . import archive
+from .models import ArchivedHistoryMonth, MoodModel
+
+# One CSV row per track; moods without playlists and playlists without tracks get a row with the rest empty.
+CSV_COLUMNS = (
+    'mood_id', 'timestamp', 'mood_text', 'category', 'energy_level', 'season',
+    'playlist_id', 'playlist_name', 'playlist_created_at',
+    'track_id', 'position', 'title', 'artist', 'album', 'duration', 'spotify_uri',
+    'archived',
+)
+_MOOD_COLUMNS = ('id', 'timestamp', 'mood_text', 'category', 'energy_level', 'season')
+_PLAYLIST_COLUMNS = ('id', 'name', 'created_at')
+# order_in_playlist is the track's 0-based position, as in the archive; live rows read order_key there.
+_TRACK_COLUMNS = ('id', 'order_in_playlist', 'title', 'artist', 'album', 'duration', 'spotify_uri')
+_ROW_FIELDS = (
+    *_MOOD_COLUMNS,
+    *(f'playlists__{name}' for name in _PLAYLIST_COLUMNS),
+    *(f"playlists__tracks__{'order_key' if name == 'order_in_playlist' else name}" for name in _TRACK_COLUMNS),
+)
+_PLAYLIST_START = len(_MOOD_COLUMNS)
+_TRACK_START = _PLAYLIST_START + len(_PLAYLIST_COLUMNS)
+_POSITION = _TRACK_START + _TRACK_COLUMNS.index('order_in_playlist')
+
+
+def _in_range(timestamp, date_from, date_to):
+    day = timestamp.date()
+    return (date_from is None or day >= date_from) and (date_to is None or day <= date_to)
+
+
+def _archived_rows(user_id, date_from, date_to, using):
+    """Flat rows for the archived moods in range, oldest first, one month decompressed at a time."""
+    records = ArchivedHistoryMonth.objects.using(using).filter(user_id=user_id).order_by('month')
+    if date_from:
+        records = records.filter(month__gte=date_from.replace(day=1))
+    if date_to:
+        records = records.filter(month__lte=date_to)
+    for record in records.iterator(chunk_size=1):
+        for mood in reversed(archive.expand(record)):
+            mood['timestamp'] = parse_datetime(mood['timestamp'])
+            if not _in_range(mood['timestamp'], date_from, date_to):
+                continue
+            mood_values = [mood[name] for name in _MOOD_COLUMNS]
+            if not mood['playlists']:
+                yield (*mood_values, *[None] * (len(_ROW_FIELDS) - _PLAYLIST_START)), True
+            for playlist in mood['playlists']:
+                playlist_values = [playlist[name] for name in _PLAYLIST_COLUMNS]
+                if not playlist['tracks']:
+                    yield (*mood_values, *playlist_values, *[None] * len(_TRACK_COLUMNS)), True
+                for track in playlist['tracks']:
+                    yield (*mood_values, *playlist_values, *[track[name] for name in _TRACK_COLUMNS]), True
+
+
+def _live_rows(user_id, date_from, date_to, chunk_size, using):
+    """Flat rows for the live moods in range, oldest first, from one joined query read with a server-side cursor."""
+    moods = MoodModel.objects.using(using).filter(user_id=user_id)
+    if date_from:
+        moods = moods.filter(timestamp__date__gte=date_from)
+    if date_to:
+        moods = moods.filter(timestamp__date__lte=date_to)
+    rows = moods.order_by(
+        'timestamp', 'id', 'playlists__created_at', 'playlists__id', 'playlists__tracks__order_key', 'playlists__tracks__id',
+    ).values_list(*_ROW_FIELDS)
+    playlist_id, position = None, 0
+    for row in rows.iterator(chunk_size=chunk_size):
+        if row[_TRACK_START] is not None:
+            # Rows arrive in playlist order, so counting them gives each track's position.
+            position = position + 1 if row[_PLAYLIST_START] == playlist_id else 0
+            playlist_id = row[_PLAYLIST_START]
+            row = (*row[:_POSITION], position, *row[_POSITION + 1:])
+        yield row, False
+
+
+def history_rows(user_id, date_from=None, date_to=None, chunk_size=2000, using='default'):
+    """Every (row, archived) of the user's history in time order: archived months first, then the live tables."""
+    yield from _archived_rows(user_id, date_from, date_to, using)
+    yield from _live_rows(user_id, date_from, date_to, chunk_size, using)
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row, archived in rows:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (*row, archived)
+        ])
+
+
+def ndjson_lines(rows):
+    """One JSON object per mood with its playlists and tracks nested, shaped like the expanded mood history."""
+    mood = playlist = None
+    for row, archived in rows:
+        if mood is None or mood['id'] != row[0]:
+            if mood is not None:
+                yield json.dumps(mood, cls=DjangoJSONEncoder) + '\n'
+            mood = {**dict(zip(_MOOD_COLUMNS, row[:_PLAYLIST_START])), 'archived': archived, 'playlists': []}
+            playlist = None
+        if row[_PLAYLIST_START] is None:
+            continue
+        if playlist is None or playlist['id'] != row[_PLAYLIST_START]:
+            playlist = {**dict(zip(_PLAYLIST_COLUMNS, row[_PLAYLIST_START:_TRACK_START])), 'tracks': []}
+            mood['playlists'].append(playlist)
+        if row[_TRACK_START] is not None:
+            playlist['tracks'].append(dict(zip(_TRACK_COLUMNS, row[_TRACK_START:])))
+    if mood is not None:
+        yield json.dumps(mood, cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL_SECONDS = 0.25
+
+
+def request_fingerprint(request):
+    payload = json.dumps([request.method, request.path, request.data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(user, key, fingerprint):
+    """Creates the pending record for (user, key); returns (record, created)."""
+    now = timezone.now()
+    # Keys are per user and short-lived, so clearing the user's expired ones here keeps the table small.
+    IdempotencyRecord.objects.filter(user=user, expires_at__lte=now).exclude(key=key).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyRecord.objects.create(
+                user=user, key=key, request_hash=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY['TTL_SECONDS']),
+            ), True
+    except IntegrityError:
+        record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+        if record is None:
+            # Deleted (failed or expired) between our insert and this read; try again.
+            return _claim(user, key, fingerprint)
+        stale = now - timedelta(seconds=settings.IDEMPOTENCY['PENDING_TIMEOUT_SECONDS'])
+        if record.expires_at <= now or (record.response_status is None and record.created_at <= stale):
+            # Expired, or its request died without finishing: take the key over.
+            IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+            return _claim(user, key, fingerprint)
+        return record, False
+
+
+def _wait_for(record):
+    """Polls until the request that owns `record` stores its response; None if it fails or takes too long."""
+    give_up_at = time.monotonic() + settings.IDEMPOTENCY['WAIT_SECONDS']
+    while time.monotonic() < give_up_at:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        record = IdempotencyRecord.objects.filter(pk=record.pk).first()
+        if record is None or record.response_status is not None:
+            return record
+    return record
+
+
+def idempotent(view):
+    """
+    Makes an @api_view function safe to retry with an `Idempotency-Key` header. The first request
+    with a key runs the view and stores its response for IDEMPOTENCY['TTL_SECONDS']; later requests
+    from the same user with the same key and body get the stored response, and concurrent ones wait
+    for it instead of running the view again. Requests without the header are not affected.
+    Responses with a 5xx status are not stored, so the client can retry them.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record, created = _claim(request.user, key, fingerprint)
+        if not created:
+            if record.request_hash != fingerprint:
+                return Response(
+                    {"detail": f"This {HEADER} was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.response_status is None:
+                logger.info(f"Request with {HEADER} '{key}' is still in progress for user {request.user.pk}; waiting for it.")
+                record = _wait_for(record)
+            if record is None:
+                # The original request failed, so this one may run it again.
+                return wrapper(request, *args, **kwargs)
+            if record.response_status is None:
+                response = Response({"detail": "A request with this key is still in progress."}, status=status.HTTP_409_CONFLICT)
+                response['Retry-After'] = '5'
+                return response
+            return _replay(record)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['response_status', 'response_body'])
+        return response
+
+    return wrapper
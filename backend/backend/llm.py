@@ -0,0 +1,207 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from openai import APIStatusError, APITimeoutError, OpenAI
+
+from . import timing
+from .metrics import LLM_CALLS, LLM_TOKENS, OPENAI_CIRCUIT_STATE
+from .models import LLMCallRecord
+
+logger = logging.getLogger(__name__)
+
+client = OpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY"),
+    base_url=settings.OPENAI_BASE_URL,
+    timeout=settings.OPENAI_DEFAULT_TIMEOUT_SECONDS,
+    max_retries=0,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the request budget has no time left for another OpenAI call."""
+
+
+class Deadline:
+    """Tracks how much of a request's time budget is left for upstream calls."""
+
+    def __init__(self, budget_seconds):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout_for(self, call_site_cap):
+        """Returns the timeout for the next call: the call site's cap, clipped to what is left of the budget."""
+        remaining = self.remaining()
+        if remaining < settings.OPENAI_MIN_CALL_SECONDS:
+            raise DeadlineExceeded(f"Only {remaining:.2f}s left of the {self.budget_seconds}s request budget")
+        return min(call_site_cap, remaining)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. A call that succeeds but takes longer
+    than its latency threshold counts as a failure. After `reset_timeout` seconds one trial
+    call is let through (half-open); it closes the breaker on success and re-opens it on failure.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._publish_state()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def before_call(self):
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.OPEN:
+                raise CircuitOpenError(f"Circuit '{self.name}' is open")
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"Circuit '{self.name}' is half-open and a trial call is already in flight")
+                self._trial_in_flight = True
+
+    def record_success(self, latency, latency_threshold):
+        if latency > latency_threshold:
+            logger.warning(f"OpenAI call took {latency:.2f}s (threshold {latency_threshold:.2f}s), counting it as a failure for circuit '{self.name}'.")
+            self.record_failure()
+            return
+        with self._lock:
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after a successful trial call.")
+            self._state = self.CLOSED
+            self._opened_at = None
+            self._publish_state()
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.error(f"Circuit '{self.name}' opened after {self._consecutive_failures} consecutive failures.")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._publish_state()
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._publish_state()
+
+    def _publish_state(self):
+        OPENAI_CIRCUIT_STATE.labels(circuit=self.name).set(self.STATE_VALUES[self._state])
+
+
+breaker = CircuitBreaker(
+    'openai',
+    failure_threshold=settings.OPENAI_CIRCUIT_BREAKER['FAILURE_THRESHOLD'],
+    reset_timeout=settings.OPENAI_CIRCUIT_BREAKER['RESET_TIMEOUT_SECONDS'],
+)
+
+
+def _outcome(exc):
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+        return 'skipped'
+    if isinstance(exc, APITimeoutError):
+        return 'timeout'
+    if isinstance(exc, APIStatusError) and exc.status_code == 429:
+        return 'rate_limited'
+    return 'error'
+
+
+def record_call(call_site, model, user, outcome, latency, usage=None):
+    """Appends an LLMCallRecord and updates the LLM metrics. Never raises into the calling request."""
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    LLM_CALLS.labels(call_site=call_site, model=model, outcome=outcome).inc()
+    if prompt_tokens or completion_tokens:
+        LLM_TOKENS.labels(call_site=call_site, model=model, kind='prompt').inc(prompt_tokens)
+        LLM_TOKENS.labels(call_site=call_site, model=model, kind='completion').inc(completion_tokens)
+    try:
+        with transaction.atomic():
+            LLMCallRecord.objects.create(
+                call_site=call_site,
+                model=model,
+                user_id=user.pk if user is not None and user.is_authenticated else None,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                latency_ms=round(latency * 1000),
+                outcome=outcome,
+            )
+    except DatabaseError as e:
+        logger.error(f"Could not record LLM call for '{call_site}': {str(e)}")
+
+
+def chat_completion(call_site, deadline=None, user=None, **kwargs):
+    """
+    Wrapper around client.chat.completions.create for every call site.
+    The timeout is the call site's cap from OPENAI_CALL_TIMEOUTS, clipped to the remaining
+    request budget when a Deadline is given. Raises CircuitOpenError or DeadlineExceeded
+    without touching the network, so callers fall through to their fallback paths.
+    Every call, including skipped ones, is recorded with its tokens, latency and outcome.
+    """
+    model = kwargs.get('model', '')
+    cap = settings.OPENAI_CALL_TIMEOUTS.get(call_site, settings.OPENAI_DEFAULT_TIMEOUT_SECONDS)
+    started = time.monotonic()
+    try:
+        timeout = deadline.timeout_for(cap) if deadline else cap
+        breaker.before_call()
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        record_call(call_site, model, user, _outcome(e), 0.0)
+        raise
+
+    try:
+        with timing.span(f"openai_{call_site}", upstream='openai'):
+            response = client.with_options(timeout=timeout).chat.completions.create(**kwargs)
+    except APIStatusError as e:
+        latency = time.monotonic() - started
+        # 4xx other than rate limiting means OpenAI is up and rejected this particular request.
+        if e.status_code == 429 or e.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success(latency, latency_threshold=cap)
+        record_call(call_site, model, user, _outcome(e), latency)
+        raise
+    except Exception as e:
+        breaker.record_failure()
+        record_call(call_site, model, user, _outcome(e), time.monotonic() - started)
+        raise
+    latency = time.monotonic() - started
+    breaker.record_success(
+        latency,
+        latency_threshold=cap * settings.OPENAI_CIRCUIT_BREAKER['LATENCY_BREACH_RATIO'],
+    )
+    record_call(call_site, model, user, 'success', latency, getattr(response, 'usage', None))
+    return response
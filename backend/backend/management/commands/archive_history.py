@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from backend import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves moods older than --older-than-days, with their playlists and tracks, into compressed per-user monthly '
+        'archives that /api/mood-history/archive/ still serves. Analytics rollups are unaffected. Run it monthly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.HISTORY_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--username', help='Only archive this user.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the user months that would be archived.')
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 1:
+            raise CommandError('--older-than-days must be at least 1.')
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['username']}' does not exist.")
+
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        months = archive.archivable_months(cutoff, user=user)
+        totals = [0, 0, 0]
+        for user_id, month in months:
+            if options['dry_run']:
+                self.stdout.write(f"user {user_id}: {month:%Y-%m}")
+                continue
+            # One transaction per user month, so an interrupted run leaves every month either live or archived.
+            moved = archive.archive_month(user_id, month, cutoff)
+            totals = [total + count for total, count in zip(totals, moved)]
+            self.stdout.write(f"user {user_id}: {month:%Y-%m} archived {moved[0]} moods, {moved[1]} playlists, {moved[2]} tracks")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Archived {totals[0]} moods, {totals[1]} playlists and {totals[2]} tracks from {len(months)} user months."))
@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from backend.checks import connections_per_worker
+
+
+def simulate_requests(requests, queries, conn_max_age, health_checks):
+    """
+    Runs `requests` request cycles the way Django's handler does (request_started, the queries,
+    request_finished) with the given connection settings. Returns (per-request seconds, connections opened).
+    """
+    connection.close()
+    saved = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    connection.settings_dict.update(CONN_MAX_AGE=conn_max_age, CONN_HEALTH_CHECKS=health_checks)
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    connection_created.connect(count)
+    durations = []
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            request_started.send(sender=None)
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+            request_finished.send(sender=None)
+            durations.append(time.perf_counter() - started)
+    finally:
+        connection_created.disconnect(count)
+        connection.close()
+        connection.settings_dict.update(saved)
+    return durations, len(opened)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures per-request database connection overhead against the configured database: a new connection '
+        'per request (CONN_MAX_AGE=0) versus persistent connections with and without health checks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--queries', type=int, default=3, help='Trivial queries per simulated request.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        conn_max_age = settings.DATABASES['default']['CONN_MAX_AGE'] or 60
+        cases = [
+            ('new connection per request', 0, False),
+            (f'persistent ({conn_max_age}s)', conn_max_age, False),
+            (f'persistent ({conn_max_age}s) + health check', conn_max_age, True),
+        ]
+
+        self.stdout.write(f"{connection.vendor} at {connection.settings_dict.get('HOST') or connection.settings_dict['NAME']}, {options['requests']} requests x {options['queries']} queries")
+        self.stdout.write(f"{'case':<40}{'median ms':>11}{'p95 ms':>9}{'connections':>13}{'speedup':>9}")
+        baseline = None
+        for name, max_age, health_checks in cases:
+            simulate_requests(3, options['queries'], max_age, health_checks)
+            durations, opened = simulate_requests(options['requests'], options['queries'], max_age, health_checks)
+            durations.sort()
+            median = statistics.median(durations)
+            baseline = baseline or median
+            self.stdout.write(
+                f"{name:<40}{median * 1000:>11.3f}{durations[int(len(durations) * 0.95) - 1] * 1000:>9.3f}"
+                f"{opened:>13}{baseline / median:>8.1f}x"
+            )
+
+        self.stdout.write(
+            f"Peak connections: {settings.GUNICORN_WORKERS} workers x {connections_per_worker()} per worker = "
+            f"{settings.GUNICORN_WORKERS * connections_per_worker()} (DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS})"
+        )
@@ -0,0 +1,111 @@
+import base64
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from backend.models import MoodModel, Playlist, Track
+from backend.ordering import keys_between
+from backend.parsers import FastJSONParser, orjson
+from backend.renderers import FastJSONRenderer
+from backend.serializers import MoodSerializer
+
+
+def build_mood_history(mood_count, tracks_per_playlist):
+    """Unsaved MoodModel -> Playlist -> Track trees with the relations pre-populated, so no database is needed."""
+    user = User(id=1, username='benchmark')
+    order_keys = keys_between(None, None, tracks_per_playlist)
+    now = timezone.now()
+    moods = []
+    for mood_index in range(mood_count):
+        mood = MoodModel(
+            id=mood_index + 1, user=user, mood_text=f"Feeling a bit nostalgic and calm after a long day #{mood_index}",
+            energy_level=mood_index % 10 + 1, timestamp=now - timedelta(hours=mood_index), season='Fall', category='Nostalgic',
+        )
+        playlist = Playlist(
+            id=mood_index + 1, mood=mood, name=f"Evening Reflections {mood_index}", created_at=mood.timestamp,
+            llm_fallback_count=1, total_tracks_generated=tracks_per_playlist,
+        )
+        tracks = [
+            Track(
+                id=mood_index * tracks_per_playlist + track_index + 1, playlist=playlist,
+                title=f"Song Title Number {track_index} – Remastered", artist="Artist Name, Featured Artist",
+                album="Album Name (Deluxe Edition)", duration="3:45", spotify_uri=f"spotify:track:{track_index:022d}",
+                order_key=order_keys[track_index],
+            )
+            for track_index in range(tracks_per_playlist)
+        ]
+        playlist._prefetched_objects_cache = {'tracks': tracks}
+        mood._prefetched_objects_cache = {'playlists': [playlist]}
+        moods.append(mood)
+    return moods
+
+
+def measure(func, iterations):
+    """Returns (median seconds, p95 seconds, peak traced bytes) for calling func `iterations` times."""
+    func()
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durations.sort()
+    return statistics.median(durations), durations[int(len(durations) * 0.95) - 1], peak
+
+
+class Command(BaseCommand):
+    help = 'Compares the stock and orjson-backed DRF JSON renderer/parser on realistic MoodSerializer payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--moods', type=int, default=200, help='Moods in the rendered history payload.')
+        parser.add_argument('--tracks', type=int, default=10, help='Tracks per playlist.')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--image-kb', type=int, default=300, help='Size of the base64 face image in the parsed request.')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed; the fast renderer/parser use the stock fallback."))
+
+        data = MoodSerializer(build_mood_history(options['moods'], options['tracks']), many=True).data
+        stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        stock_bytes, fast_bytes = stock_renderer.render(data), fast_renderer.render(data)
+        if stock_bytes != fast_bytes:
+            self.stderr.write(self.style.ERROR("Fast renderer output differs from the stock renderer."))
+            return
+
+        image = base64.b64encode(os.urandom(options['image_kb'] * 1024)).decode()
+        request_body = fast_renderer.render({'images': [f"data:image/jpeg;base64,{image}"]})
+        stock_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        def parse_with(parser, body):
+            return lambda: parser.parse(BytesIO(body), parser_context={})
+
+        cases = [
+            ('render mood history', lambda: stock_renderer.render(data), lambda: fast_renderer.render(data), len(stock_bytes)),
+            ('parse mood history', parse_with(stock_parser, stock_bytes), parse_with(fast_parser, stock_bytes), len(stock_bytes)),
+            ('parse face image request', parse_with(stock_parser, request_body), parse_with(fast_parser, request_body), len(request_body)),
+        ]
+
+        self.stdout.write(f"{'case':<28}{'bytes':>10}{'stock ms':>11}{'fast ms':>10}{'p95 stock':>11}{'p95 fast':>10}{'peak KB stock':>15}{'peak KB fast':>14}{'speedup':>9}")
+        for name, stock, fast, size in cases:
+            stock_median, stock_p95, stock_peak = measure(stock, options['iterations'])
+            fast_median, fast_p95, fast_peak = measure(fast, options['iterations'])
+            self.stdout.write(
+                f"{name:<28}{size:>10}{stock_median * 1000:>11.2f}{fast_median * 1000:>10.2f}"
+                f"{stock_p95 * 1000:>11.2f}{fast_p95 * 1000:>10.2f}{stock_peak / 1024:>15.0f}{fast_peak / 1024:>14.0f}"
+                f"{stock_median / fast_median:>8.1f}x"
+            )
@@ -0,0 +1,64 @@
+import multiprocessing
+import types
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+def drive_throttle(throttle_path, limit, requests, user_id, barrier, results):
+    """Worker process: waits for the others, then asks the throttle `requests` times for one user."""
+    import django
+    django.setup()
+    from django.utils.module_loading import import_string
+
+    throttle_class = type('CheckedThrottle', (import_string(throttle_path),), {'rate': f'{limit}/hour'})
+    request = types.SimpleNamespace(user=types.SimpleNamespace(is_authenticated=True, pk=user_id))
+    barrier.wait()
+    results.put(sum(throttle_class().allow_request(request, None) for _ in range(requests)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Checks that the user rate limit holds across worker processes: starts several processes that share '
+        'the configured cache and sends a burst through UserRateThrottle from all of them at once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=50, help='Throttle checks per worker.')
+        parser.add_argument('--limit', type=int, default=20, help='Requests allowed per user and hour during the check.')
+
+    def handle(self, *args, **options):
+        workers, requests, limit = options['workers'], options['requests'], options['limit']
+        if workers < 2 or limit < 1 or workers * requests <= limit:
+            raise CommandError('Needs at least 2 workers, a positive --limit and more requests in total than --limit.')
+
+        self.stdout.write(f"{settings.CACHES['default']['BACKEND']}, {workers} workers x {requests} requests, limit {limit}")
+        self.stdout.write(f"{'throttle':<45}{'allowed':>9}")
+        allowed = {}
+        # spawn, so every worker sets Django up on its own like a gunicorn worker rather than inheriting this process.
+        context = multiprocessing.get_context('spawn')
+        for throttle_path in ('rest_framework.throttling.UserRateThrottle', 'backend.throttling.UserRateThrottle'):
+            # A fresh user id per run, so real counters are never touched and earlier runs don't count.
+            user_id = f'throttle-check-{uuid.uuid4().hex}'
+            barrier, results = context.Barrier(workers), context.Queue()
+            processes = [
+                context.Process(target=drive_throttle, args=(throttle_path, limit, requests, user_id, barrier, results))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            allowed[throttle_path] = sum(results.get(timeout=120) for _ in processes)
+            for process in processes:
+                process.join()
+            cache.delete(f'throttle_user_{user_id}')
+            self.stdout.write(f"{throttle_path:<45}{allowed[throttle_path]:>9}")
+
+        if allowed['backend.throttling.UserRateThrottle'] != limit:
+            raise CommandError(
+                f"{allowed['backend.throttling.UserRateThrottle']} requests got through a limit of {limit}; "
+                f"the cache is not shared between processes or the throttle update is not atomic."
+            )
+        self.stdout.write(self.style.SUCCESS(f"The limit of {limit} held across {workers} workers."))
@@ -3,12 +3,10 @@ import os
 from datetime import date, datetime
 from django.core.management.base import BaseCommand
 from backend.models import SpecializedPlaylist
-from openai import OpenAI
+from backend import llm, timing
 from django.conf import settings
 
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
 SEED_PLAYLIST_TEMPLATES = [
     {
         "name": "Morning Focus Flow",
@@ -119,7 +117,8 @@ def generate_tracks_for_specialized_playlist(playlist_name, prompt_keywords, son
     )
 
     try:
-        response = client.chat.completions.create(
+        response = llm.chat_completion(
+            'specialized_playlist',
             model="gpt-4o-mini", 
             messages=[
                 {"role": "system", "content": "You are an assistant that generates song lists in JSON format."},
@@ -168,6 +167,9 @@ def generate_tracks_for_specialized_playlist(playlist_name, prompt_keywords, son
             _stderr(f"Missing 'tracks' key in OpenAI JSON response for '{playlist_name}': {e}. Response text: {response_text}")
             return None
 
+    except llm.CircuitOpenError as e:
+        _stderr(f"Skipping OpenAI call for '{playlist_name}': {str(e)}")
+        return None
     except Exception as e:
         _stderr(f"Error calling OpenAI API for '{playlist_name}': {str(e)}")
         import traceback
@@ -190,22 +192,25 @@ class Command(BaseCommand):
         for playlist in specialized_playlists:
             self.stdout.write(f"Checking playlist for manual refresh: '{playlist.name}' (ID: {playlist.id})")
             self.stdout.write(f"Attempting manual refresh for '{playlist.name}'...")
-            new_tracks = generate_tracks_for_specialized_playlist(
-                playlist.name, 
-                playlist.generation_prompt_keywords,
-                playlist.target_song_count,
-                stdout_writer=self.stdout.write,
-                stderr_writer=self.stderr.write
-            )
-            
-            if new_tracks:
-                playlist.cached_tracks = new_tracks
-                playlist.last_refreshed_date = today
-                playlist.save()
-                self.stdout.write(self.style.SUCCESS(f"Successfully refreshed and saved playlist: '{playlist.name}'"))
-                refreshed_count += 1
-            else:
-                self.stderr.write(self.style.ERROR(f"Failed to generate tracks for playlist: '{playlist.name}' during manual refresh."))
+            with timing.recording() as recorder:
+                new_tracks = generate_tracks_for_specialized_playlist(
+                    playlist.name, 
+                    playlist.generation_prompt_keywords,
+                    playlist.target_song_count,
+                    stdout_writer=self.stdout.write,
+                    stderr_writer=self.stderr.write
+                )
+                
+                if new_tracks:
+                    playlist.cached_tracks = new_tracks
+                    playlist.last_refreshed_date = today
+                    with timing.span('db_specialized_playlist_write', upstream='db'):
+                        playlist.save()
+                    self.stdout.write(self.style.SUCCESS(f"Successfully refreshed and saved playlist: '{playlist.name}'"))
+                    refreshed_count += 1
+                else:
+                    self.stderr.write(self.style.ERROR(f"Failed to generate tracks for playlist: '{playlist.name}' during manual refresh."))
+            self.stdout.write(f"Timings for '{playlist.name}': {recorder.summary()} (total {recorder.elapsed():.2f}s)")
             
         self.stdout.write(self.style.SUCCESS(f"Manual specialized playlist refresh task finished. Refreshed {refreshed_count} playlists."))
 
@@ -252,7 +257,8 @@ def run_startup_playlist_generation(stdout_writer=None, stderr_writer=None):
             if new_tracks:
                 playlist.cached_tracks = new_tracks
                 playlist.last_refreshed_date = today
-                playlist.save(update_fields=['cached_tracks', 'last_refreshed_date'])
+                with timing.span('db_specialized_playlist_write', upstream='db'):
+                    playlist.save(update_fields=['cached_tracks', 'last_refreshed_date'])
                 _stdout(f"Successfully generated/refreshed tracks for '{playlist.name}'.")
                 refreshed_count +=1
             else:
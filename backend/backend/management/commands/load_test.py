@@ -0,0 +1,136 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+import requests
+import urllib3
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.benchmarks.runner import percentile
+
+MOOD_TEXTS = [
+    "Tired after a long week but hopeful about the weekend",
+    "Anxious about tomorrow's exam",
+    "Happy and full of energy after a morning run",
+    "A bit lonely on a rainy evening",
+    "Calm and focused, ready to get work done",
+    "Nostalgic, going through old photos",
+]
+GENRES = ['Pop', 'Indie', 'Rock', 'Electronic', 'Jazz', 'Lithuanian pop']
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives concurrent users through POST /api/mood-playlist/ on a running server and reports throughput, '
+        'latency percentiles and status codes. Pair with `run_simulators` to avoid real OpenAI/Spotify calls.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='https://localhost:8000')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users.')
+        parser.add_argument('--duration', type=float, default=60.0, help='Seconds to keep generating load.')
+        parser.add_argument('--ramp-up', type=float, default=5.0, help='Seconds over which users are started.')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between a user\'s requests.')
+        parser.add_argument('--timeout', type=float, default=35.0, help='Client timeout per request.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--insecure', action='store_true', help='Skip TLS verification (self-signed dev certificates).')
+        parser.add_argument('--output', help='Also write the raw summary as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1.')
+        if options['insecure']:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        # Tokens are minted locally, so the server under test must share this database and SECRET_KEY.
+        tokens = [str(AccessToken.for_user(self.load_test_user(index))) for index in range(options['users'])]
+        url = f"{options['base_url'].rstrip('/')}/api/mood-playlist/"
+        self.stdout.write(f"Running {options['users']} users against {url} for {options['duration']:.0f}s...")
+
+        samples = []
+        samples_lock = threading.Lock()
+        started = time.monotonic()
+        stop_at = started + options['ramp_up'] + options['duration']
+        threads = [
+            threading.Thread(
+                target=self.user_loop,
+                args=(index, token, url, started + options['ramp_up'] * index / options['users'], stop_at, options, samples, samples_lock),
+                daemon=True,
+            )
+            for index, token in enumerate(tokens)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        summary = self.summarize(samples, time.monotonic() - started)
+        self.report(summary)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(summary, f, indent=2)
+
+    def load_test_user(self, index):
+        user, created = User.objects.get_or_create(username=f"loadtest-{index}", defaults={'email': f"loadtest-{index}@example.com"})
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        return user
+
+    def user_loop(self, index, token, url, start_at, stop_at, options, samples, samples_lock):
+        rng = random.Random(options['seed'] * 1000 + index)
+        session = requests.Session()
+        session.headers['Authorization'] = f"Bearer {token}"
+        session.verify = not options['insecure']
+        time.sleep(max(0.0, start_at - time.monotonic()))
+
+        while time.monotonic() < stop_at:
+            payload = {
+                'mood_text': rng.choice(MOOD_TEXTS),
+                'energy_level': rng.randint(1, 10),
+                'favorite_genre': rng.choice(GENRES),
+                'song_count': rng.randint(5, 10),
+            }
+            sample = {'started': time.monotonic()}
+            try:
+                response = session.post(url, json=payload, timeout=options['timeout'])
+                sample['status'] = response.status_code
+                if response.status_code == 201:
+                    playlist = response.json()['playlist']
+                    sample['tracks'] = playlist['total_tracks_generated']
+                    sample['verified'] = playlist['total_tracks_generated'] - playlist['llm_fallback_count']
+            except requests.RequestException as e:
+                sample['status'] = type(e).__name__
+            sample['latency'] = time.monotonic() - sample['started']
+            with samples_lock:
+                samples.append(sample)
+            time.sleep(rng.expovariate(1 / options['think_time']) if options['think_time'] > 0 else 0)
+
+    def summarize(self, samples, elapsed):
+        latencies = sorted(sample['latency'] * 1000 for sample in samples)
+        succeeded = [sample for sample in samples if sample['status'] == 201]
+        tracks = sum(sample.get('tracks', 0) for sample in succeeded)
+        return {
+            'requests': len(samples),
+            'elapsed_seconds': round(elapsed, 2),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'success_rate': round(len(succeeded) / len(samples), 4) if samples else None,
+            'statuses': {str(status): count for status, count in Counter(sample['status'] for sample in samples).most_common()},
+            'latency_ms': {
+                f"p{pct}": round(percentile(latencies, pct), 1) if latencies else None for pct in (50, 90, 95, 99)
+            } | {'max': round(latencies[-1], 1) if latencies else None},
+            'verified_track_ratio': round(sum(sample['verified'] for sample in succeeded) / tracks, 3) if tracks else None,
+        }
+
+    def report(self, summary):
+        self.stdout.write(f"Requests: {summary['requests']} in {summary['elapsed_seconds']}s ({summary['throughput_rps']} req/s)")
+        self.stdout.write(f"Success rate: {summary['success_rate']}  Statuses: {summary['statuses']}")
+        latency = summary['latency_ms']
+        self.stdout.write(
+            f"Latency ms: p50={latency['p50']} p90={latency['p90']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}"
+        )
+        self.stdout.write(f"Spotify-verified track ratio: {summary['verified_track_ratio']}")
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import ordering
+
+
+class Command(BaseCommand):
+    help = (
+        'Gives short, evenly spread order keys to the tracks of every playlist that has a key longer than '
+        '--max-length. Track order is unchanged. Edits queue this for a single playlist on their own; '
+        'run it from cron to catch the rest.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-length', type=int, default=settings.TRACK_ORDER_KEY_MAX_LENGTH)
+        parser.add_argument('--dry-run', action='store_true', help='Only list the playlists that would be rebalanced.')
+
+    def handle(self, *args, **options):
+        if options['max_length'] < 1:
+            raise CommandError('--max-length must be at least 1.')
+        playlist_ids = ordering.playlists_to_rebalance(options['max_length'])
+        tracks = 0
+        for playlist_id in playlist_ids:
+            if options['dry_run']:
+                self.stdout.write(f"playlist {playlist_id}")
+                continue
+            tracks += ordering.rebalance_playlist(playlist_id)
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Rebalanced {tracks} tracks in {len(playlist_ids)} playlists."))
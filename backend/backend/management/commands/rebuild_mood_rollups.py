@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the mood analytics rollup table from MoodModel rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Only rebuild the rollups of this user.')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['username']}' does not exist.")
+
+        bucket_count = rebuild_rollups(user=user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {bucket_count} mood rollup buckets."))
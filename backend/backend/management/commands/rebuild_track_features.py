@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from backend.recommender import rebuild_features
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the recommender feature vectors of catalog tracks from the playlists they appeared in. Run it daily.'
+
+    def handle(self, *args, **options):
+        track_count = rebuild_features()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt feature vectors for {track_count} catalog tracks."))
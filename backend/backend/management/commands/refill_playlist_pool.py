@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import catalog, pool, prompts, timing
+from backend.views import FALLBACK_PLAYLIST_NAME, _resolve_track_details, call_openai_api
+
+
+def generate_pooled_playlist(context, song_count, min_verified_ratio):
+    """
+    Generates a playlist for `context` the same way a live request would and resolves every song.
+    Returns (name, verified tracks, template, params), or None when too few songs verified.
+    """
+    prompt_params = {
+        'feeling_description': f"is feeling {context.category.lower()}",
+        'mood_category': context.category,
+        'time_of_day': context.time_of_day,
+        'season': context.season,
+        'energy_level': pool.BUCKET_ENERGY[context.energy_bucket],
+        'favorite_genre': context.favorite_genre,
+        'market_code': context.market_code or None,
+        'playlist_goal': None,
+        'song_count': song_count,
+    }
+    prompt_template, prompt = prompts.playlist_generation_prompt(prompt_params)
+    playlist_data = call_openai_api(prompt)
+    if playlist_data.get('playlist_name') == FALLBACK_PLAYLIST_NAME:
+        return None
+
+    suggested = playlist_data.get('tracks', [])
+    tracks = []
+    catalog_writes = catalog.CatalogWrites()
+    for suggestion in suggested:
+        details = _resolve_track_details(
+            title=suggestion.get('title', 'Unknown Title'),
+            artist=suggestion.get('artist', 'Unknown Artist'),
+            market_code=context.market_code or None,
+            catalog_writes=catalog_writes,
+        )
+        if details:
+            tracks.append({key: details[key] for key in ('title', 'artist', 'album', 'duration', 'spotify_uri')})
+    catalog_writes.flush()
+
+    if not suggested or len(tracks) / len(suggested) < min_verified_ratio:
+        return None
+    return playlist_data['playlist_name'], tracks, prompt_template, prompt_params
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired pooled playlists and tops up the pool for the most common mood contexts of the '
+        'current season and time of day. Run it hourly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contexts', type=int, default=settings.PLAYLIST_POOL['CONTEXTS'], help='How many of the most common contexts to stock.')
+        parser.add_argument('--per-context', type=int, default=settings.PLAYLIST_POOL['PER_CONTEXT'], help='Playlists to keep in stock per context.')
+        parser.add_argument('--ttl-hours', type=float, default=settings.PLAYLIST_POOL['TTL_HOURS'], help='How long a pooled playlist may be served.')
+        parser.add_argument('--history-days', type=int, default=settings.PLAYLIST_POOL['HISTORY_DAYS'], help='Days of mood history used to rank contexts.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the contexts and their current stock.')
+
+    def handle(self, *args, **options):
+        if options['contexts'] < 1 or options['per_context'] < 1:
+            raise CommandError('--contexts and --per-context must be at least 1.')
+        if options['ttl_hours'] <= 0:
+            raise CommandError('--ttl-hours must be positive.')
+
+        if not options['dry_run']:
+            expired = pool.prune()
+            self.stdout.write(f"Deleted {expired} expired pooled playlists.")
+
+        ttl = timedelta(hours=options['ttl_hours'])
+        song_count = settings.PLAYLIST_POOL['SONG_COUNT']
+        min_verified_ratio = settings.PLAYLIST_POOL['MIN_VERIFIED_RATIO']
+        added = failed = 0
+
+        for context, mood_count in pool.frequent_contexts(options['contexts'], options['history_days']):
+            in_stock = pool.stock(context)
+            self.stdout.write(f"{'/'.join(value or '-' for value in context)}: {mood_count} moods, {in_stock} in stock")
+            if options['dry_run']:
+                continue
+
+            for _ in range(options['per_context'] - in_stock):
+                with timing.recording() as recorder:
+                    generated = generate_pooled_playlist(context, song_count, min_verified_ratio)
+                    if generated:
+                        name, tracks, prompt_template, prompt_params = generated
+                        pool.add(context, name, tracks, prompt_template, prompt_params, ttl)
+                if generated:
+                    added += 1
+                    self.stdout.write(f"  added '{name}' ({len(tracks)} tracks) in {recorder.elapsed():.2f}s: {recorder.summary()}")
+                else:
+                    # Most likely OpenAI is down or the context's songs don't resolve; move on to the next context.
+                    failed += 1
+                    self.stderr.write("  generation failed or too few tracks verified, skipping this context")
+                    break
+
+        self.stdout.write(self.style.SUCCESS(f"Added {added} pooled playlists ({failed} failed generations)."))
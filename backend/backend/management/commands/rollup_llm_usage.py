@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from backend.analytics import prune_llm_calls, rollup_llm_usage
+
+
+class Command(BaseCommand):
+    help = 'Rolls raw LLM call records up into daily totals per call site, model and user. Run it daily.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Days to (re)build, counting back from today.')
+        parser.add_argument(
+            '--retention-days', type=int, default=90,
+            help='Delete raw call records older than this many days after rolling up (0 keeps everything).',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+        if 0 < options['retention_days'] < options['days']:
+            raise CommandError('--retention-days must not be shorter than --days.')
+
+        today = timezone.localdate()
+        rollup_count = rollup_llm_usage(today - timedelta(days=options['days'] - 1), today)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rollup_count} LLM usage rollups for the last {options['days']} days."))
+
+        if options['retention_days']:
+            deleted = prune_llm_calls(options['retention_days'])
+            self.stdout.write(f"Deleted {deleted} call records older than {options['retention_days']} days.")
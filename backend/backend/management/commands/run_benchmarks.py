@@ -0,0 +1,131 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.benchmarks.runner import compare, run_scenario
+from backend.benchmarks.scenarios import SCENARIOS
+from backend.benchmarks.seeding import seed_specialized_playlists, seed_user
+from backend.benchmarks.stubs import stubbed_upstreams
+from backend.models import Playlist
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the API hot-path benchmarks against a seeded test database with OpenAI, Spotify and GeoIP stubbed out, '
+        'and writes latency percentiles, query counts and allocations as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='10,1000,100000', help='Comma-separated moods/playlists per user to seed.')
+        parser.add_argument('--scenarios', default='', help='Comma-separated scenario names (default: all).')
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Result file (default: benchmark-results/<timestamp>-<commit>.json).')
+        parser.add_argument('--compare', help='Earlier result file to compare against.')
+        parser.add_argument('--regression-threshold', type=float, default=10.0, help='Percent change that counts as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the seeded test database for the next run.')
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options['scales'].split(',') if scale]
+        selected = {name for name in options['scenarios'].split(',') if name}
+        scenarios = [scenario for scenario in SCENARIOS if not selected or scenario.name in selected]
+        if selected - {scenario.name for scenario in SCENARIOS}:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(selected - {s.name for s in SCENARIOS}))}")
+
+        old_config = setup_databases(verbosity=1, interactive=False, keepdb=options['keepdb'])
+        try:
+            results = self.run_suite(scales, scenarios, options)
+        finally:
+            teardown_databases(old_config, verbosity=1, keepdb=options['keepdb'])
+
+        commit = _git_commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'created_at': datetime.now(dt_timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+            },
+            'results': results,
+        }
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmark-results', f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote benchmark results to {output}"))
+
+        if options['compare']:
+            self.report_comparison(options['compare'], report, options)
+
+        over_budget = [r for r in results if r['over_budget']]
+        if over_budget and options['fail_on_regression']:
+            raise CommandError(f"{len(over_budget)} scenarios exceeded their QUERY_BUDGETS entry.")
+
+    def run_suite(self, scales, scenarios, options):
+        seed_specialized_playlists()
+        results = []
+        with stubbed_upstreams():
+            for scale in scales:
+                self.stdout.write(f"Seeding user with {scale} moods...")
+                user = seed_user(scale)
+                playlist = Playlist.objects.filter(mood__user=user).order_by('-created_at').first()
+                context = {
+                    'user': user,
+                    'playlist_id': playlist.id,
+                    'track_ids': list(playlist.tracks.values_list('id', flat=True)),
+                }
+                client = APIClient(HTTP_HOST='localhost')
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+                for scenario in scenarios:
+                    result = run_scenario(scenario, client, context, options['iterations'], options['warmup'])
+                    result.update({'scenario': scenario.name, 'scale': scale})
+                    results.append(result)
+                    line = (
+                        f"  {scenario.name:<28} scale={scale:<7} p50={result['p50_ms']:>9.2f}ms p99={result['p99_ms']:>9.2f}ms "
+                        f"queries={result['queries']:<4} peak={result['peak_alloc_kb']:>9.1f}KB"
+                    )
+                    if result['over_budget']:
+                        self.stdout.write(self.style.ERROR(f"{line} OVER QUERY BUDGET: {result['over_budget']}"))
+                    else:
+                        self.stdout.write(line)
+        return results
+
+    def report_comparison(self, path, report, options):
+        with open(path) as f:
+            previous = json.load(f)
+        self.stdout.write(f"Comparing against {path} (commit {previous['meta'].get('commit')}):")
+        regressions = 0
+        for scenario, scale, metric, before, after, change, regressed in compare(previous, report, options['regression_threshold']):
+            line = f"  {scenario:<28} scale={scale:<7} {metric:<14} {before:>10} -> {after:>10} ({change:+.1f}%)"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + " REGRESSION"))
+            else:
+                self.stdout.write(line)
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{regressions} benchmark regressions above {options['regression_threshold']}%.")
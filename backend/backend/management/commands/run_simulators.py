@@ -0,0 +1,79 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from backend.simulators.common import Behaviour, SimulatorServer
+from backend.simulators.openai_server import OpenAIHandler
+from backend.simulators.spotify_server import SpotifyHandler
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs local OpenAI and Spotify simulators with configurable latency, error and 429 rates, '
+        'for load testing the API without real keys or quotas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--openai-port', type=int, default=8100)
+        parser.add_argument('--spotify-port', type=int, default=8101)
+        parser.add_argument('--seed', type=int, default=0, help='Seeds the fixtures and the latency/error sequence.')
+        parser.add_argument('--catalog-size', type=int, default=500, help='Tracks in the shared fixture catalog.')
+        parser.add_argument('--hallucination-rate', type=float, default=0.1, help='Share of suggested songs missing from the catalog.')
+        parser.add_argument('--openai-latency-ms', type=float, default=600.0, help='Median time to first token.')
+        parser.add_argument('--openai-latency-sigma', type=float, default=0.4)
+        parser.add_argument('--openai-ms-per-token', type=float, default=5.0, help='Generation time per completion token.')
+        parser.add_argument('--openai-error-rate', type=float, default=0.0)
+        parser.add_argument('--openai-429-rate', type=float, default=0.0)
+        parser.add_argument('--spotify-latency-ms', type=float, default=80.0)
+        parser.add_argument('--spotify-latency-sigma', type=float, default=0.3)
+        parser.add_argument('--spotify-error-rate', type=float, default=0.0)
+        parser.add_argument('--spotify-429-rate', type=float, default=0.0)
+        parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429 responses.')
+        parser.add_argument('--verbose-requests', action='store_true', help='Log every simulated request.')
+
+    def handle(self, *args, **options):
+        shared = {
+            'seed': options['seed'],
+            'catalog_size': options['catalog_size'],
+        }
+        openai_server = SimulatorServer(
+            (options['host'], options['openai_port']), OpenAIHandler, 'openai',
+            Behaviour(
+                latency_ms=options['openai_latency_ms'], latency_sigma=options['openai_latency_sigma'],
+                error_rate=options['openai_error_rate'], rate_limit_rate=options['openai_429_rate'],
+                retry_after=options['retry_after'], seed=options['seed'],
+            ),
+            verbose=options['verbose_requests'],
+            ms_per_token=options['openai_ms_per_token'], hallucination_rate=options['hallucination_rate'], **shared,
+        )
+        spotify_server = SimulatorServer(
+            (options['host'], options['spotify_port']), SpotifyHandler, 'spotify',
+            Behaviour(
+                latency_ms=options['spotify_latency_ms'], latency_sigma=options['spotify_latency_sigma'],
+                error_rate=options['spotify_error_rate'], rate_limit_rate=options['spotify_429_rate'],
+                retry_after=options['retry_after'], seed=options['seed'] + 1,
+            ),
+            verbose=options['verbose_requests'],
+            **shared,
+        )
+
+        openai_url = f"http://{options['host']}:{options['openai_port']}"
+        spotify_url = f"http://{options['host']}:{options['spotify_port']}"
+        self.stdout.write(self.style.SUCCESS(f"OpenAI simulator listening on {openai_url}, Spotify simulator on {spotify_url}."))
+        self.stdout.write("Point the backend at them with:")
+        self.stdout.write(f"  export OPENAI_BASE_URL={openai_url}/v1")
+        self.stdout.write(f"  export SPOTIFY_API_URL={spotify_url}/v1/")
+        self.stdout.write(f"  export SPOTIFY_TOKEN_URL={spotify_url}/api/token")
+        self.stdout.write("  export OPENAI_API_KEY=simulated SPOTIPY_CLIENT_ID=simulated SPOTIPY_CLIENT_SECRET=simulated")
+
+        spotify_thread = threading.Thread(target=spotify_server.serve_forever, daemon=True)
+        spotify_thread.start()
+        try:
+            openai_server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Shutting down simulators.")
+        finally:
+            spotify_server.shutdown()
+            openai_server.server_close()
+            spotify_server.server_close()
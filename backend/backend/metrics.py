@@ -0,0 +1,62 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Buckets reach past gunicorn's 30s timeout, since OpenAI calls routinely take several seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+OPENAI_CIRCUIT_STATE = Gauge(
+    'moodmusic_openai_circuit_state',
+    'OpenAI circuit breaker state (0 = closed, 1 = half-open, 2 = open).',
+    ['circuit'],
+    multiprocess_mode='max',
+)
+
+TRACK_RESOLUTIONS = Counter(
+    'moodmusic_track_resolutions_total',
+    'Suggested songs resolved to track details, by source (catalog, spotify or unresolved).',
+    ['source'],
+)
+
+REQUEST_LATENCY = Histogram(
+    'moodmusic_request_duration_seconds',
+    'API request latency by URL name, method and status code.',
+    ['endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+
+UPSTREAM_LATENCY = Histogram(
+    'moodmusic_upstream_duration_seconds',
+    'Latency of timed spans around upstream calls (openai, spotify, geoip) and database phases (db).',
+    ['upstream', 'operation'],
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUEST_DB_QUERIES = Histogram(
+    'moodmusic_request_db_queries',
+    'Database queries per API request, by URL name.',
+    ['endpoint'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+
+QUERY_BUDGET_EXCEEDED = Counter(
+    'moodmusic_query_budget_exceeded_total',
+    'Requests that ran more queries than their QUERY_BUDGETS entry allows.',
+    ['endpoint'],
+)
+
+LLM_CALLS = Counter(
+    'moodmusic_llm_calls_total',
+    'OpenAI calls by call site, model and outcome (success, error, timeout, rate_limited, skipped).',
+    ['call_site', 'model', 'outcome'],
+)
+
+LLM_TOKENS = Counter(
+    'moodmusic_llm_tokens_total',
+    'OpenAI tokens used, by call site, model and kind (prompt or completion).',
+    ['call_site', 'model', 'kind'],
+)
+
+PLAYLIST_POOL_LOOKUPS = Counter(
+    'moodmusic_playlist_pool_lookups_total',
+    'Mood playlist requests served from the pre-generated pool (hit) or generated live (miss).',
+    ['result'],
+)
@@ -0,0 +1,88 @@
+import logging
+
+from django.conf import settings
+
+from . import routers, timing
+from .metrics import QUERY_BUDGET_EXCEEDED, REQUEST_DB_QUERIES, REQUEST_LATENCY
+from .query_budget import describe_duplicates, record_queries
+
+logger = logging.getLogger(__name__)
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.url_name or match.view_name if match else 'unmatched'
+
+
+class ServerTimingMiddleware:
+    """Records per-endpoint latency and adds the request's timing spans as a Server-Timing header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.recording() as recorder:
+            response = self.get_response(request)
+
+        REQUEST_LATENCY.labels(endpoint=_endpoint(request), method=request.method, status=response.status_code).observe(recorder.elapsed())
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = recorder.server_timing()
+            origin = request.headers.get('Origin')
+            if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+                # Lets the frontend's devtools and PerformanceObserver read the header cross-origin.
+                response['Timing-Allow-Origin'] = origin
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries and DB time of each request, adds them to Server-Timing as `db_queries`,
+    logs statements repeated QUERY_DUPLICATE_LOG_THRESHOLD times or more, and flags requests
+    that exceed their endpoint's entry in QUERY_BUDGETS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries(tuple(settings.DATABASES)) as queries:
+            response = self.get_response(request)
+
+        endpoint = _endpoint(request)
+        REQUEST_DB_QUERIES.labels(endpoint=endpoint).observe(queries.count)
+        recorder = timing.current()
+        if recorder is not None and queries.count:
+            recorder.add('db_queries', queries.total_time, calls=queries.count)
+
+        duplicates = queries.duplicates(min_count=settings.QUERY_DUPLICATE_LOG_THRESHOLD)
+        if duplicates:
+            logger.warning(f"{request.method} {request.path} ({endpoint}) repeated queries: {describe_duplicates(queries)}")
+
+        budget = settings.QUERY_BUDGETS.get(endpoint)
+        if budget is not None and queries.count > budget:
+            QUERY_BUDGET_EXCEEDED.labels(endpoint=endpoint).inc()
+            logger.error(
+                f"{request.method} {request.path} ran {queries.count} queries ({queries.total_time * 1000:.1f}ms), "
+                f"over the {budget} query budget for '{endpoint}'."
+            )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    After a successful write request, pins the user's replica reads to the primary for
+    DB_REPLICA_PIN_SECONDS, so e.g. the history fetched right after creating a playlist includes it.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the user it authenticated onto the underlying request.
+        user = getattr(request, 'user', None)
+        if request.method not in self.SAFE_METHODS and response.status_code < 400 and user is not None and user.is_authenticated:
+            routers.pin_to_primary(user.id)
+        return response
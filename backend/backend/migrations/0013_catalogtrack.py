@@ -0,0 +1,86 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:13
+
+import re
+import unicodedata
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.utils.timezone
+
+# Copy of backend.catalog.normalize as of this migration, so later changes to it can't change the backfill.
+_BRACKETED = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]')
+_FEATURING = re.compile(r'\s+(feat\.?|ft\.?|featuring)\s+.*$')
+_VERSION_SUFFIX = re.compile(r'\s+-\s+(from\s.*|.*\b(remaster(ed)?|version|edit|mix|live|mono|stereo)\b.*)$')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _BRACKETED.sub('', text)
+    text = _VERSION_SUFFIX.sub('', text)
+    text = _FEATURING.sub('', text)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN trigram indexes only exist on PostgreSQL; other backends use the pure-Python matcher.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX backend_catalogtrack_title_trgm ON backend_catalogtrack "
+        "USING gin (normalized_title gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS backend_catalogtrack_title_trgm")
+
+
+def backfill_catalog(apps, schema_editor):
+    Track = apps.get_model('backend', 'Track')
+    CatalogTrack = apps.get_model('backend', 'CatalogTrack')
+
+    catalog_tracks = {}
+    verified_tracks = Track.objects.exclude(spotify_uri__isnull=True).exclude(spotify_uri='').order_by('id')
+    for track in verified_tracks.iterator():
+        catalog_tracks[track.spotify_uri] = CatalogTrack(
+            title=track.title,
+            artist=track.artist,
+            album=track.album,
+            duration=track.duration,
+            spotify_uri=track.spotify_uri,
+            normalized_title=normalize(track.title),
+            normalized_artist=normalize(track.artist),
+        )
+    CatalogTrack.objects.bulk_create(catalog_tracks.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0012_remove_playlist_had_llm_fallbacks_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='CatalogTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('artist', models.CharField(max_length=255)),
+                ('album', models.CharField(blank=True, max_length=255, null=True)),
+                ('duration', models.CharField(blank=True, max_length=10, null=True)),
+                ('spotify_uri', models.CharField(max_length=255, unique=True)),
+                ('normalized_title', models.CharField(max_length=255)),
+                ('normalized_artist', models.CharField(max_length=255)),
+                ('times_matched', models.PositiveIntegerField(default=0)),
+                ('last_verified_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(backfill_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:14
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+TRACK_SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION backend_track_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.artist, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.album, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(
+            (SELECT name FROM backend_playlist WHERE id = NEW.playlist_id), ''
+        )), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_track_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, artist, album, playlist_id ON backend_track
+    FOR EACH ROW EXECUTE FUNCTION backend_track_search_vector_update();
+
+CREATE OR REPLACE FUNCTION backend_playlist_name_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE backend_track SET title = title WHERE playlist_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_playlist_name_search_vector_trigger
+    AFTER UPDATE OF name ON backend_playlist
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION backend_playlist_name_search_vector_update();
+
+CREATE INDEX backend_track_search_vector_gin ON backend_track USING gin (search_vector);
+
+UPDATE backend_track SET title = title;
+"""
+
+DROP_TRACK_SEARCH_VECTOR_SQL = """
+DROP INDEX IF EXISTS backend_track_search_vector_gin;
+DROP TRIGGER IF EXISTS backend_playlist_name_search_vector_trigger ON backend_playlist;
+DROP FUNCTION IF EXISTS backend_playlist_name_search_vector_update();
+DROP TRIGGER IF EXISTS backend_track_search_vector_trigger ON backend_track;
+DROP FUNCTION IF EXISTS backend_track_search_vector_update();
+"""
+
+
+def create_search_vector_trigger(apps, schema_editor):
+    # The trigger and GIN index are PostgreSQL-only; other backends fall back to icontains search.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(TRACK_SEARCH_VECTOR_SQL)
+
+
+def drop_search_vector_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRACK_SEARCH_VECTOR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0013_catalogtrack'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_vector_trigger, drop_search_vector_trigger),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:16
+
+from django.conf import settings
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+# Copies of backend.analytics.PERIODS and period_start as of this migration.
+PERIODS = ('day', 'week', 'month')
+
+
+def period_start(day, period):
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def backfill_mood_rollups(apps, schema_editor):
+    MoodModel = apps.get_model('backend', 'MoodModel')
+    MoodRollup = apps.get_model('backend', 'MoodRollup')
+
+    buckets = defaultdict(lambda: [0, 0, 0])
+    for mood in MoodModel.objects.all().iterator(chunk_size=2000):
+        day = timezone.localtime(mood.timestamp).date()
+        for period in PERIODS:
+            totals = buckets[(mood.user_id, period, period_start(day, period), mood.category or 'Other')]
+            totals[0] += 1
+            totals[1] += mood.energy_level
+            totals[2] += mood.energy_level * mood.energy_level
+
+    MoodRollup.objects.bulk_create(
+        [
+            MoodRollup(
+                user_id=user_id, period=period, period_start=start, category=category,
+                mood_count=count, energy_sum=energy_sum, energy_squares_sum=energy_squares_sum,
+            )
+            for (user_id, period, start, category), (count, energy_sum, energy_squares_sum) in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('backend', '0014_track_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('category', models.CharField(max_length=50)),
+                ('mood_count', models.PositiveIntegerField(default=0)),
+                ('energy_sum', models.IntegerField(default=0)),
+                ('energy_squares_sum', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mood_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='moodrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'period_start', 'category'), name='unique_mood_rollup_bucket'),
+        ),
+        migrations.RunPython(backfill_mood_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,169 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:34
+
+import hashlib
+import json
+import re
+from string import Formatter
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# The generation prompt as it was when prompt_used was a text column. Frozen here rather than
+# imported, so editing backend.prompts later can't change how old rows are parsed.
+PLAYLIST_GENERATION_BODY = (
+    "Create a music playlist for someone who {feeling_description} (overall mood categorized as {mood_category}). "
+    "It's currently {time_of_day} in {season}, their energy level is {energy_level}/10, "
+    "and they prefer {favorite_genre} music. "
+    "{market_section}"
+    "{goal_section}"
+    "Return ONLY a JSON object (no extra text before or after) with two keys: "
+    "1. 'playlist_name': A short, creative title for the playlist (max 5 words). "
+    "2. 'tracks': A JSON array of exactly {song_count} songs. "
+    "Each song in the array must have 'title', 'artist', and 'duration' fields. "
+    "For each track, please provide the most common and verifiable spelling for the title and artist. If suggesting regional or less common music, prioritize tracks that are likely to be found on major streaming platforms. "
+    "Make sure the songs match the mood, category, time of day, energy level, and playlist goal if provided."
+)
+PLAYLIST_GENERATION_SECTIONS = {
+    'market_section': [
+        'market_code',
+        "The user has indicated a preference for music from the region associated with market code '{market_code}'. "
+        "Please prioritize songs that are verifiably available on major streaming platforms within this market. "
+        "If possible, lean towards more recognizable tracks from this region to increase verification chances. ",
+    ],
+    'goal_section': ['playlist_goal', "The goal for this playlist is: '{playlist_goal}'. "],
+}
+
+# Catch-all for prompts that don't parse against the template; stores the text as its only param.
+LEGACY_BODY = '{text}'
+
+INTEGER_PARAMS = ('energy_level', 'song_count')
+
+
+def content_hash(name, body, sections):
+    # Copy of backend.prompts.content_hash as of this migration, so rows created here dedupe with the live templates.
+    payload = json.dumps([name, body, sections], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render(template, params):
+    values = dict(params)
+    for placeholder, (param, section) in template.sections.items():
+        values[placeholder] = section.format(**values) if values.get(param) else ''
+    return template.body.format(**values)
+
+
+def template_pattern(body, sections):
+    parts = []
+    for literal, field, _, _ in Formatter().parse(body):
+        parts.append(re.escape(literal))
+        if field is None:
+            continue
+        if field in sections:
+            parts.append(f"(?:{template_pattern(sections[field][1], {})})?")
+        else:
+            parts.append(f"(?P<{field}>.*?)")
+    return ''.join(parts)
+
+
+def get_or_create_template(PromptTemplate, name, body, sections):
+    template, _ = PromptTemplate.objects.get_or_create(
+        content_hash=content_hash(name, body, sections),
+        defaults={'name': name, 'version': 1, 'body': body, 'sections': sections},
+    )
+    return template
+
+
+def prompts_to_templates(apps, schema_editor):
+    Playlist = apps.get_model('backend', 'Playlist')
+    PromptTemplate = apps.get_model('backend', 'PromptTemplate')
+
+    pattern = re.compile(template_pattern(PLAYLIST_GENERATION_BODY, PLAYLIST_GENERATION_SECTIONS), re.DOTALL)
+    generation = get_or_create_template(PromptTemplate, 'playlist_generation', PLAYLIST_GENERATION_BODY, PLAYLIST_GENERATION_SECTIONS)
+    legacy = None
+
+    batch = []
+    for playlist in Playlist.objects.exclude(prompt_used='').only('id', 'prompt_used').iterator(chunk_size=2000):
+        match = pattern.fullmatch(playlist.prompt_used)
+        params = None
+        if match:
+            params = {key: value for key, value in match.groupdict().items() if value is not None}
+            for key in INTEGER_PARAMS:
+                if params.get(key, '').isdigit():
+                    params[key] = int(params[key])
+            # Only keep the parse if it renders back to exactly the stored text.
+            if render(generation, params) != playlist.prompt_used:
+                params = None
+        if params is not None:
+            playlist.prompt_template = generation
+            playlist.prompt_params = params
+        else:
+            if legacy is None:
+                legacy = get_or_create_template(PromptTemplate, 'legacy_prompt_text', LEGACY_BODY, {})
+            playlist.prompt_template = legacy
+            playlist.prompt_params = {'text': playlist.prompt_used}
+        batch.append(playlist)
+        if len(batch) >= 1000:
+            Playlist.objects.bulk_update(batch, ['prompt_template', 'prompt_params'])
+            batch = []
+    Playlist.objects.bulk_update(batch, ['prompt_template', 'prompt_params'])
+
+
+def templates_to_prompts(apps, schema_editor):
+    Playlist = apps.get_model('backend', 'Playlist')
+
+    batch = []
+    for playlist in Playlist.objects.filter(prompt_template__isnull=False).select_related('prompt_template').iterator(chunk_size=2000):
+        playlist.prompt_used = render(playlist.prompt_template, playlist.prompt_params or {})
+        batch.append(playlist)
+        if len(batch) >= 1000:
+            Playlist.objects.bulk_update(batch, ['prompt_used'])
+            batch = []
+    Playlist.objects.bulk_update(batch, ['prompt_used'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0016_llm_call_accounting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromptTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('version', models.PositiveIntegerField()),
+                ('body', models.TextField()),
+                ('sections', models.JSONField(blank=True, default=dict)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='prompttemplate',
+            constraint=models.UniqueConstraint(fields=('name', 'version'), name='unique_prompt_template_version'),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='prompt_template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='playlists', to='backend.prompttemplate'),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='prompt_params',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        # The default lets a rollback re-add the column on a populated table before it is backfilled.
+        migrations.AlterField(
+            model_name='playlist',
+            name='prompt_used',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(prompts_to_templates, templates_to_prompts),
+        migrations.RemoveField(
+            model_name='playlist',
+            name='prompt_used',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0017_prompt_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PooledPlaylist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50)),
+                ('favorite_genre', models.CharField(help_text='Lowercased', max_length=100)),
+                ('energy_bucket', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], max_length=6)),
+                ('time_of_day', models.CharField(max_length=10)),
+                ('season', models.CharField(max_length=10)),
+                ('market_code', models.CharField(blank=True, default='', max_length=2)),
+                ('name', models.CharField(max_length=200)),
+                ('tracks', models.JSONField(help_text='[{title, artist, album, duration, spotify_uri}], all verified on Spotify')),
+                ('prompt_params', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+                ('prompt_template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='backend.prompttemplate')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'favorite_genre', 'energy_bucket', 'time_of_day', 'season', 'market_code', 'expires_at'], name='pooled_playlist_context_idx')],
+            },
+        ),
+    ]
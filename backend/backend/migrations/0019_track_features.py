@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0018_playlist_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogtrack',
+            name='features',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogtrack',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='catalogtrack',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
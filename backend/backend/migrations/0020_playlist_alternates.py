@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0019_track_features'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='alternates',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# Rows are inserted in time order, so block-range indexes serve the archival scans over
+# "everything before <cutoff>" at a tiny fraction of a btree's size.
+CREATE_BRIN_INDEXES_SQL = """
+CREATE INDEX backend_moodmodel_timestamp_brin ON backend_moodmodel USING brin (timestamp);
+CREATE INDEX backend_playlist_created_at_brin ON backend_playlist USING brin (created_at);
+"""
+
+DROP_BRIN_INDEXES_SQL = """
+DROP INDEX IF EXISTS backend_playlist_created_at_brin;
+DROP INDEX IF EXISTS backend_moodmodel_timestamp_brin;
+"""
+
+
+def create_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_BRIN_INDEXES_SQL)
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_BRIN_INDEXES_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('backend', '0021_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedHistoryMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('mood_count', models.PositiveIntegerField(default=0)),
+                ('playlist_count', models.PositiveIntegerField(default=0)),
+                ('track_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='moodmodel',
+            index=models.Index(fields=['user', '-timestamp'], name='mood_user_timestamp_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedhistorymonth',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedhistorymonth',
+            constraint=models.UniqueConstraint(fields=('user', 'month'), name='unique_archived_history_month'),
+        ),
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0022_archived_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
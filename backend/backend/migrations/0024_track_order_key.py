@@ -0,0 +1,101 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:09
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+# Copy of the key generator in backend.ordering as of this migration; that module imports the
+# current models, and the keys written here only need to be valid, not to track later changes.
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def _midpoint(a, b):
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def keys_between(a, b, n):
+    if n <= 0:
+        return []
+    middle = _midpoint(a or '', b)
+    before = (n - 1) // 2
+    return keys_between(a, middle, before) + [middle] + keys_between(middle, b, n - 1 - before)
+
+
+def _playlist_batches(Track, order_by):
+    """Yields each playlist's tracks, in order, reading the table once."""
+    batch, playlist_id = [], None
+    for track in Track.objects.order_by('playlist_id', *order_by).only('id', 'playlist_id').iterator(chunk_size=BATCH_SIZE):
+        if track.playlist_id != playlist_id and batch:
+            yield batch
+            batch = []
+        playlist_id = track.playlist_id
+        batch.append(track)
+    if batch:
+        yield batch
+
+
+def integer_order_to_keys(apps, schema_editor):
+    Track = apps.get_model('backend', 'Track')
+    pending = []
+    for tracks in _playlist_batches(Track, ('order_in_playlist', 'id')):
+        for track, key in zip(tracks, keys_between(None, None, len(tracks))):
+            track.order_key = key
+        pending.extend(tracks)
+        if len(pending) >= BATCH_SIZE:
+            Track.objects.bulk_update(pending, ['order_key'])
+            pending = []
+    Track.objects.bulk_update(pending, ['order_key'])
+
+
+def keys_to_integer_order(apps, schema_editor):
+    Track = apps.get_model('backend', 'Track')
+    pending = []
+    for tracks in _playlist_batches(Track, ('order_key', 'id')):
+        for position, track in enumerate(tracks):
+            track.order_in_playlist = position
+        pending.extend(tracks)
+        if len(pending) >= BATCH_SIZE:
+            Track.objects.bulk_update(pending, ['order_in_playlist'])
+            pending = []
+    Track.objects.bulk_update(pending, ['order_in_playlist'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0023_playlist_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='order_key',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RunPython(integer_order_to_keys, keys_to_integer_order),
+        migrations.RemoveField(
+            model_name='track',
+            name='order_in_playlist',
+        ),
+        migrations.AlterModelOptions(
+            name='track',
+            options={'ordering': ['order_key', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['playlist', 'order_key'], name='track_playlist_order_idx'),
+        ),
+    ]
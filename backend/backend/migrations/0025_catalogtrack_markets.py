@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0024_track_order_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogtrack',
+            name='markets',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -1,7 +1,14 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+MOOD_CATEGORIES_LIST = [
+    "Happy", "Sad", "Angry", "Calm", "Excited", "Anxious", 
+    "Confident", "Lonely", "Nostalgic", "Romantic", "Other"
+]
+
 class MoodModel(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='moods')
     mood_text = models.TextField()
@@ -9,6 +16,9 @@ class MoodModel(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
     season = models.CharField(max_length=20)
     category = models.CharField(max_length=50, default='Other', blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', '-timestamp'], name='mood_user_timestamp_idx')]
     
     def __str__(self):
         return f"{self.user.username}'s mood: {self.mood_text[:20]}..."
@@ -20,13 +30,51 @@ class UserPreference(models.Model):
     def __str__(self):
         return f"Preference for {self.user.username}: {self.favorite_genre}"
 
+class PromptTemplate(models.Model):
+    """
+    A versioned prompt. `body` is a str.format template; each entry of `sections` maps a
+    placeholder in `body` to [param, template] and renders only when that param is set.
+    """
+    name = models.CharField(max_length=50)
+    version = models.PositiveIntegerField()
+    body = models.TextField()
+    sections = models.JSONField(default=dict, blank=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'version'], name='unique_prompt_template_version'),
+        ]
+
+    def render(self, params):
+        values = dict(params)
+        for placeholder, (param, template) in self.sections.items():
+            values[placeholder] = template.format(**values) if values.get(param) else ''
+        return self.body.format(**values)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
 class Playlist(models.Model):
     mood = models.ForeignKey(MoodModel, on_delete=models.CASCADE, related_name='playlists')
     name = models.CharField(max_length=200, default="My Mood Playlist")
     created_at = models.DateTimeField(default=timezone.now)
-    prompt_used = models.TextField()
+    prompt_template = models.ForeignKey(PromptTemplate, on_delete=models.PROTECT, null=True, blank=True, related_name='playlists')
+    prompt_params = models.JSONField(null=True, blank=True)
     llm_fallback_count = models.IntegerField(default=0)
     total_tracks_generated = models.IntegerField(default=0)
+    # Pre-verified replacement songs, generated in the background after creation; see backend/alternates.py.
+    alternates = models.JSONField(null=True, blank=True)
+    # Incremented by every track edit; batch edits can name the version they were based on (see backend/playlist_edits.py).
+    version = models.PositiveIntegerField(default=0)
+
+    @property
+    def prompt_used(self):
+        """The full generation prompt, rebuilt from the template and its parameters."""
+        if not self.prompt_template_id:
+            return ''
+        return self.prompt_template.render(self.prompt_params or {})
     
     def __str__(self):
         return f"{self.name} (User: {self.mood.user.username}) - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -38,10 +86,15 @@ class Track(models.Model):
     album = models.CharField(max_length=255, null=True, blank=True)
     duration = models.CharField(max_length=10, null=True, blank=True)
     spotify_uri = models.CharField(max_length=255, null=True, blank=True)
-    order_in_playlist = models.IntegerField(default=0)
+    # Fractional position in the playlist (see backend/ordering.py): placing a track between two others
+    # writes only its own key. Keys grow with repeated inserts and are shortened by rebalancing.
+    order_key = models.CharField(max_length=255, default='')
+    # Maintained by a PostgreSQL trigger (see migration 0014) from title, artist, album and the playlist name.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
-        ordering = ['order_in_playlist']
+        ordering = ['order_key', 'id']
+        indexes = [models.Index(fields=['playlist', 'order_key'], name='track_playlist_order_idx')]
 
     def __str__(self):
         return f"{self.title} by {self.artist}"
@@ -56,3 +109,158 @@ class SpecializedPlaylist(models.Model):
 
     def __str__(self):
         return self.name
+
+class PooledPlaylist(models.Model):
+    """
+    A verified playlist generated ahead of time for a common mood context, handed out once by
+    `/api/mood-playlist/` and deleted when claimed. Filled by `refill_playlist_pool`.
+    """
+    ENERGY_BUCKET_CHOICES = [('low', 'Low'), ('medium', 'Medium'), ('high', 'High')]
+
+    category = models.CharField(max_length=50)
+    favorite_genre = models.CharField(max_length=100, help_text="Lowercased")
+    energy_bucket = models.CharField(max_length=6, choices=ENERGY_BUCKET_CHOICES)
+    time_of_day = models.CharField(max_length=10)
+    season = models.CharField(max_length=10)
+    market_code = models.CharField(max_length=2, blank=True, default='')
+    name = models.CharField(max_length=200)
+    tracks = models.JSONField(help_text="[{title, artist, album, duration, spotify_uri}], all verified on Spotify")
+    prompt_template = models.ForeignKey(PromptTemplate, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    prompt_params = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['category', 'favorite_genre', 'energy_bucket', 'time_of_day', 'season', 'market_code', 'expires_at'],
+                name='pooled_playlist_context_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.category}/{self.favorite_genre}/{self.energy_bucket}/{self.time_of_day}/{self.season}/{self.market_code or '-'})"
+
+class CatalogTrack(models.Model):
+    title = models.CharField(max_length=255)
+    artist = models.CharField(max_length=255)
+    album = models.CharField(max_length=255, null=True, blank=True)
+    duration = models.CharField(max_length=10, null=True, blank=True)
+    spotify_uri = models.CharField(max_length=255, unique=True)
+    normalized_title = models.CharField(max_length=255)
+    normalized_artist = models.CharField(max_length=255)
+    times_matched = models.PositiveIntegerField(default=0)
+    last_verified_at = models.DateTimeField(default=timezone.now)
+    # Spotify markets the track was found in; a catalog match only stands in for a search in one of these.
+    markets = models.JSONField(default=list, blank=True)
+    # Ratings given when the track was replaced out of a playlist, for the local recommender.
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Feature vector built by `rebuild_track_features`; see backend/recommender.py for the layout.
+    features = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.title} by {self.artist} ({self.spotify_uri})"
+
+class MoodRollup(models.Model):
+    PERIOD_CHOICES = [('day', 'Day'), ('week', 'Week'), ('month', 'Month')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_rollups')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    category = models.CharField(max_length=50)
+    mood_count = models.PositiveIntegerField(default=0)
+    energy_sum = models.IntegerField(default=0)
+    energy_squares_sum = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'period_start', 'category'], name='unique_mood_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.period} {self.period_start} {self.category}: {self.mood_count}"
+
+class LLMCallRecord(models.Model):
+    """One row per OpenAI call (or call skipped by the circuit breaker/deadline). Append-only."""
+    OUTCOME_CHOICES = [
+        ('success', 'Success'),
+        ('error', 'Error'),
+        ('timeout', 'Timeout'),
+        ('rate_limited', 'Rate limited'),
+        ('skipped', 'Skipped'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    call_site = models.CharField(max_length=32)
+    model = models.CharField(max_length=64)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    outcome = models.CharField(max_length=12, choices=OUTCOME_CHOICES)
+
+    def __str__(self):
+        return f"{self.call_site} {self.model} {self.outcome} {self.latency_ms}ms"
+
+class LLMUsageRollup(models.Model):
+    """Daily totals per call site, model and user, rebuilt from LLMCallRecord by `rollup_llm_usage`. Skipped calls only count in skipped_calls."""
+    day = models.DateField()
+    call_site = models.CharField(max_length=32)
+    model = models.CharField(max_length=64)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    calls = models.PositiveIntegerField(default=0)
+    failed_calls = models.PositiveIntegerField(default=0)
+    skipped_calls = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    latency_ms_sum = models.PositiveBigIntegerField(default=0)
+    latency_ms_p95 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'call_site'])]
+
+    def __str__(self):
+        return f"{self.day} {self.call_site} {self.model}: {self.calls} calls"
+
+class IdempotencyRecord(models.Model):
+    """
+    The response to a request sent with an `Idempotency-Key` header, replayed to retries with the same
+    key; see backend/idempotency.py. response_status is null while the first request is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.response_status or 'pending'})"
+
+class ArchivedHistoryMonth(models.Model):
+    """
+    One user's moods, with their playlists and tracks, from one calendar month, moved out of the live
+    tables by `archive_history`. `data` is zlib-compressed JSON; see backend/archive.py for the layout.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    month = models.DateField(help_text="First day of the month")
+    mood_count = models.PositiveIntegerField(default=0)
+    playlist_count = models.PositiveIntegerField(default=0)
+    track_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='unique_archived_history_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m}: {self.mood_count} moods, {self.playlist_count} playlists"
@@ -0,0 +1,125 @@
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Length
+
+from . import background
+from .models import Playlist, Track
+
+# A track's order key is a base-36 fraction: "i" is 0.i, "i4" is 0.i4. Keys never end in "0", so comparing
+# them as strings compares the fractions, and there is always room for another key between two neighbours.
+# Digits and lowercase letters sort the same under the C, glibc and ICU collations.
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def _midpoint(a, b):
+    # a is '' for the start, b None for the end.
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a, b):
+    """A key that sorts after `a` and before `b`; None stands for the start or the end of the playlist."""
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Order key {a!r} is not before {b!r}.")
+    return _midpoint(a or '', b)
+
+
+def keys_between(a, b, n):
+    """`n` increasing keys between `a` and `b`, spread out so that they stay short."""
+    if n <= 0:
+        return []
+    middle = key_between(a, b)
+    before = (n - 1) // 2
+    return keys_between(a, middle, before) + [middle] + keys_between(middle, b, n - 1 - before)
+
+
+def _increasing_run(keys):
+    """Indexes of a longest strictly increasing subsequence of the keys that are not None."""
+    tails, tail_indexes, previous = [], [], {}
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        position = bisect_left(tails, key)
+        previous[index] = tail_indexes[position - 1] if position else None
+        if position == len(tails):
+            tails.append(key)
+            tail_indexes.append(index)
+        else:
+            tails[position] = key
+            tail_indexes[position] = index
+    kept = set()
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        kept.add(index)
+        index = previous[index]
+    return kept
+
+
+def assign_keys(keys):
+    """
+    Takes the current keys of items listed in their new order (None for new items) and returns keys that
+    put them in that order. The longest run of keys that is already in order is kept, so moving or adding
+    one item changes one key.
+    """
+    kept = _increasing_run(keys)
+    result = list(keys)
+    index, previous = 0, None
+    while index < len(keys):
+        if index in kept:
+            previous = keys[index]
+            index += 1
+            continue
+        end = index
+        while end < len(keys) and end not in kept:
+            end += 1
+        result[index:end] = keys_between(previous, keys[end] if end < len(keys) else None, end - index)
+        index = end
+    return result
+
+
+def key_after_last(playlist_id):
+    """The key that appends a track to the playlist: one lookup on the (playlist, order_key) index."""
+    last = Track.objects.filter(playlist_id=playlist_id).order_by('-order_key').values_list('order_key', flat=True).first()
+    return key_between(last, None)
+
+
+def rebalance_if_long(playlist_id, keys):
+    """Queues a background rebalance of the playlist once one of `keys` is longer than TRACK_ORDER_KEY_MAX_LENGTH."""
+    if any(len(key) > settings.TRACK_ORDER_KEY_MAX_LENGTH for key in keys):
+        background.submit(rebalance_playlist, playlist_id)
+
+
+def rebalance_playlist(playlist_id):
+    """Gives the playlist's tracks short, evenly spread keys in their current order. Returns the number of tracks."""
+    with transaction.atomic():
+        # Batch edits lock the same row, so they never interleave with a rebalance.
+        if not Playlist.objects.select_for_update().filter(pk=playlist_id).exists():
+            return 0
+        tracks = list(Track.objects.filter(playlist_id=playlist_id).order_by('order_key', 'id').only('id', 'order_key'))
+        for track, key in zip(tracks, keys_between(None, None, len(tracks))):
+            track.order_key = key
+        Track.objects.bulk_update(tracks, ['order_key'])
+    return len(tracks)
+
+
+def playlists_to_rebalance(max_length=None):
+    """Ids of playlists with a key longer than `max_length` (TRACK_ORDER_KEY_MAX_LENGTH by default)."""
+    max_length = settings.TRACK_ORDER_KEY_MAX_LENGTH if max_length is None else max_length
+    return list(
+        Track.objects.annotate(key_length=Length('order_key')).filter(key_length__gt=max_length)
+        .values_list('playlist_id', flat=True).distinct().order_by('playlist_id')
+    )
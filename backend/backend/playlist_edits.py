@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import F
+
+from . import ordering
+from .models import Playlist, Track
+
+MAX_OPERATIONS = 200
+SONG_FIELDS = ('title', 'artist', 'album', 'duration', 'spotify_uri')
+
+
+class PlaylistEditError(Exception):
+    """An operation that can't be applied to the playlist as it stands; `index` is its place in the batch."""
+
+    def __init__(self, index, message):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+
+class PlaylistVersionConflict(Exception):
+    def __init__(self, version):
+        super().__init__(f"Playlist is at version {version}.")
+        self.version = version
+
+
+def bump_version(playlist_pk):
+    """Marks the playlist as changed, so batch edits based on an older version are refused."""
+    Playlist.objects.filter(pk=playlist_pk).update(version=F('version') + 1)
+
+
+def _position(operation, index, upper):
+    position = operation.get('position', upper)
+    if position > upper:
+        raise PlaylistEditError(index, f"Position {position} is out of range (0-{upper}).")
+    return position
+
+
+def _existing_track(order, operation, index):
+    track_id = operation['track_id']
+    if track_id not in order:
+        raise PlaylistEditError(index, f"Track {track_id} is not in this playlist.")
+    return track_id
+
+
+def apply_operations(playlist_pk, user, operations, expected_version=None):
+    """
+    Applies add, remove, move and replace operations, in order, in one transaction. Positions are
+    0-based and refer to the playlist as left by the operations before. The operations are worked out
+    on the track order in memory; only added and moved tracks get new order keys. Deletes, inserts,
+    song changes and key changes are one statement each. Returns (new version, changed tracks in
+    playlist order, removed ids).
+    Raises Playlist.DoesNotExist, PlaylistVersionConflict or PlaylistEditError.
+    """
+    with transaction.atomic():
+        playlist = Playlist.objects.select_for_update(of=('self',)).only('id', 'version').get(pk=playlist_pk, mood__user=user)
+        if expected_version is not None and expected_version != playlist.version:
+            raise PlaylistVersionConflict(playlist.version)
+
+        tracks = {track.pk: track for track in Track.objects.filter(playlist=playlist).order_by('order_key', 'id').only('id', 'order_key', *SONG_FIELDS)}
+        # Track ids for existing tracks, unsaved Track instances for added ones.
+        order = list(tracks)
+        replaced = {}
+        removed = []
+
+        for index, operation in enumerate(operations):
+            op = operation['op']
+            if op == 'add':
+                song = {name: operation.get(name) for name in SONG_FIELDS}
+                order.insert(_position(operation, index, len(order)), Track(playlist=playlist, **song))
+            elif op == 'remove':
+                track_id = _existing_track(order, operation, index)
+                order.remove(track_id)
+                replaced.pop(track_id, None)
+                removed.append(track_id)
+            elif op == 'move':
+                track_id = _existing_track(order, operation, index)
+                order.remove(track_id)
+                order.insert(_position(operation, index, len(order)), track_id)
+            elif op == 'replace':
+                track_id = _existing_track(order, operation, index)
+                for name in SONG_FIELDS:
+                    setattr(tracks[track_id], name, operation.get(name))
+                replaced[track_id] = tracks[track_id]
+
+        order = [item if isinstance(item, Track) else tracks[item] for item in order]
+        keys = ordering.assign_keys([None if track.pk is None else track.order_key for track in order])
+        added, moved, changed = [], [], []
+        for track, key in zip(order, keys):
+            if track.pk is None:
+                added.append(track)
+            elif track.order_key != key:
+                moved.append(track)
+            elif track.pk not in replaced:
+                continue
+            track.order_key = key
+            changed.append(track)
+
+        if removed:
+            Track.objects.filter(playlist=playlist, pk__in=removed).delete()
+        if added:
+            Track.objects.bulk_create(added)
+        if replaced:
+            Track.objects.bulk_update(replaced.values(), SONG_FIELDS)
+        if moved:
+            Track.objects.bulk_update(moved, ['order_key'])
+        Playlist.objects.filter(pk=playlist.pk).update(version=F('version') + 1)
+        ordering.rebalance_if_long(playlist.pk, [track.order_key for track in added + moved])
+    return playlist.version + 1, changed, removed
@@ -0,0 +1,155 @@
+import logging
+import re
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .metrics import PLAYLIST_POOL_LOOKUPS
+from .models import MoodModel, PooledPlaylist
+
+logger = logging.getLogger(__name__)
+
+PoolContext = namedtuple('PoolContext', ['category', 'favorite_genre', 'energy_bucket', 'time_of_day', 'season', 'market_code'])
+
+# Energy level written into the generation prompt for each bucket.
+BUCKET_ENERGY = {'low': 2, 'medium': 5, 'high': 8}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def energy_bucket(energy_level):
+    level = int(energy_level)
+    if level <= 3:
+        return 'low'
+    if level <= 7:
+        return 'medium'
+    return 'high'
+
+
+def season_for(moment):
+    month = moment.month
+    if 3 <= month <= 5:
+        return 'Spring'
+    if 6 <= month <= 8:
+        return 'Summer'
+    if 9 <= month <= 11:
+        return 'Fall'
+    return 'Winter'
+
+
+def time_of_day_for(moment):
+    hour = moment.hour
+    if 5 <= hour < 12:
+        return 'Morning'
+    if 12 <= hour < 17:
+        return 'Afternoon'
+    if 17 <= hour < 21:
+        return 'Evening'
+    return 'Night'
+
+
+def genre_market(favorite_genre):
+    """Spotify market implied by the favorite genre, or None."""
+    if not favorite_genre or not isinstance(favorite_genre, str):
+        return None
+    genre_lower = favorite_genre.lower()
+    if "lithuanian" in genre_lower:
+        return "LT"
+    if "polish" in genre_lower:
+        return "PL"
+    if "japanese" in genre_lower or "j-pop" in genre_lower or "j-rock" in genre_lower:
+        return "JP"
+    return None
+
+
+def make_context(category, favorite_genre, energy_level, market_code, moment=None):
+    moment = timezone.localtime(moment)
+    return PoolContext(
+        category=category or 'Other',
+        favorite_genre=(favorite_genre or 'Pop').strip().lower(),
+        energy_bucket=energy_bucket(energy_level),
+        time_of_day=time_of_day_for(moment),
+        season=season_for(moment),
+        market_code=market_code or '',
+    )
+
+
+def frequent_contexts(limit, days, moment=None):
+    """
+    The `limit` most common contexts among the last `days` days of moods that fall in the time of day
+    of `moment` (default now), as (context, mood count). Moods are counted with their user's current
+    favorite genre; only genre-derived markets are known afterwards, so GeoIP-only markets pool as ''.
+    """
+    moment = timezone.localtime(moment)
+    time_of_day = time_of_day_for(moment)
+    counts = Counter()
+    moods = (
+        MoodModel.objects.filter(timestamp__gte=moment - timedelta(days=days))
+        .values_list('category', 'energy_level', 'timestamp', 'user__userpreference__favorite_genre')
+    )
+    for category, energy_level, timestamp, favorite_genre in moods.iterator(chunk_size=2000):
+        if time_of_day_for(timezone.localtime(timestamp)) != time_of_day:
+            continue
+        counts[make_context(category, favorite_genre, energy_level, genre_market(favorite_genre), moment)] += 1
+    return counts.most_common(limit)
+
+
+def stock(context, now=None):
+    return PooledPlaylist.objects.filter(**context._asdict(), expires_at__gt=now or timezone.now()).count()
+
+
+def add(context, name, tracks, prompt_template, prompt_params, ttl):
+    return PooledPlaylist.objects.create(
+        **context._asdict(),
+        name=name,
+        tracks=tracks,
+        prompt_template=prompt_template,
+        prompt_params=prompt_params,
+        expires_at=timezone.now() + ttl,
+    )
+
+
+def prune(now=None):
+    """Deletes expired pool entries; returns how many."""
+    deleted, _ = PooledPlaylist.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
+
+def _words(text):
+    return set(_WORD_RE.findall((text or '').lower()))
+
+
+def _overlap(mood_words, entry):
+    playlist_words = _words(entry.name)
+    for track in entry.tracks:
+        playlist_words |= _words(track.get('title'))
+    return len(mood_words & playlist_words)
+
+
+def claim(context, mood_text, song_count):
+    """
+    Takes an unexpired playlist with at least `song_count` tracks for `context` out of the pool, or
+    returns None. The mood text only ranks the candidates (by words shared with the playlist name
+    and track titles); ties go to the entry closest to expiry.
+    """
+    candidates = [
+        entry
+        for entry in PooledPlaylist.objects.filter(**context._asdict(), expires_at__gt=timezone.now())
+        .select_related('prompt_template')
+        .order_by('expires_at')[:settings.PLAYLIST_POOL['CANDIDATES']]
+        if len(entry.tracks) >= song_count
+    ]
+    mood_words = _words(mood_text)
+    candidates.sort(key=lambda entry: -_overlap(mood_words, entry))
+
+    for entry in candidates:
+        # Deleting the row is the claim; of two requests racing for one entry only one deletes it.
+        deleted, _ = PooledPlaylist.objects.filter(pk=entry.pk).delete()
+        if deleted:
+            PLAYLIST_POOL_LOOKUPS.labels(result='hit').inc()
+            return entry
+    PLAYLIST_POOL_LOOKUPS.labels(result='miss').inc()
+    logger.info(f"No pooled playlist for {context}.")
+    return None
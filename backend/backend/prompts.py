@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from .models import PromptTemplate
+
+# Editing the text below creates a new PromptTemplate version the next time it is used;
+# playlists keep pointing at the version they were generated with.
+PLAYLIST_GENERATION_BODY = (
+    "Create a music playlist for someone who {feeling_description} (overall mood categorized as {mood_category}). "
+    "It's currently {time_of_day} in {season}, their energy level is {energy_level}/10, "
+    "and they prefer {favorite_genre} music. "
+    "{market_section}"
+    "{goal_section}"
+    "Return ONLY a JSON object (no extra text before or after) with two keys: "
+    "1. 'playlist_name': A short, creative title for the playlist (max 5 words). "
+    "2. 'tracks': A JSON array of exactly {song_count} songs. "
+    "Each song in the array must have 'title', 'artist', and 'duration' fields. "
+    "For each track, please provide the most common and verifiable spelling for the title and artist. If suggesting regional or less common music, prioritize tracks that are likely to be found on major streaming platforms. "
+    "Make sure the songs match the mood, category, time of day, energy level, and playlist goal if provided."
+)
+PLAYLIST_GENERATION_SECTIONS = {
+    'market_section': [
+        'market_code',
+        "The user has indicated a preference for music from the region associated with market code '{market_code}'. "
+        "Please prioritize songs that are verifiably available on major streaming platforms within this market. "
+        "If possible, lean towards more recognizable tracks from this region to increase verification chances. ",
+    ],
+    'goal_section': ['playlist_goal', "The goal for this playlist is: '{playlist_goal}'. "],
+}
+
+_templates = {}
+
+
+def content_hash(name, body, sections):
+    payload = json.dumps([name, body, sections], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_template(name, body, sections):
+    """The PromptTemplate row for this exact text, created with the next version number if it is new."""
+    digest = content_hash(name, body, sections)
+    template = _templates.get(digest)
+    if template is not None:
+        return template
+
+    template = PromptTemplate.objects.filter(content_hash=digest).first()
+    if template is None:
+        try:
+            with transaction.atomic():
+                latest = PromptTemplate.objects.filter(name=name).aggregate(latest=Max('version'))['latest'] or 0
+                template = PromptTemplate.objects.create(
+                    name=name, version=latest + 1, body=body, sections=sections, content_hash=digest,
+                )
+        except IntegrityError:
+            # Another worker registered the same text first.
+            template = PromptTemplate.objects.get(content_hash=digest)
+    # Only cache rows that are committed, so a rolled back request can't leave a dangling template behind.
+    transaction.on_commit(lambda: _templates.setdefault(digest, template))
+    return template
+
+
+def playlist_generation_prompt(params):
+    """Returns (template, full prompt text) for the playlist generation call."""
+    template = get_template('playlist_generation', PLAYLIST_GENERATION_BODY, PLAYLIST_GENERATION_SECTIONS)
+    return template, template.render(params)
@@ -0,0 +1,86 @@
+import time
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget() when a block runs more queries than allowed."""
+
+
+class QueryRecorder:
+    """connection.execute_wrapper that keeps the SQL (with placeholders, not params) and duration of each query."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, top=3, min_count=2):
+        """The most repeated statements as (count, sql); the usual signature of an N+1."""
+        counts = Counter(sql for sql, _ in self.queries)
+        return [(count, sql) for sql, count in counts.most_common(top) if count >= min_count]
+
+
+@contextmanager
+def record_queries(using=DEFAULT_DB_ALIAS):
+    """Records the queries run on `using`, one alias or several (e.g. the primary and its replicas)."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in ([using] if isinstance(using, str) else using):
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+def describe_duplicates(recorder, top=3, sql_length=200):
+    return '; '.join(f"{count}x {sql[:sql_length]}" for count, sql in recorder.duplicates(top=top))
+
+
+class query_budget(ContextDecorator):
+    """
+    Fails with QueryBudgetExceeded when the wrapped block or function runs more queries than
+    `budget` allows, listing the most duplicated statements. `budget` is a number of queries or
+    an endpoint name, whose QUERY_BUDGETS entry is read when the block starts:
+
+        with query_budget('playlist_history'):
+            client.get('/api/playlists/history/')
+    """
+
+    def __init__(self, budget, using=DEFAULT_DB_ALIAS):
+        self.budget = budget
+        self.using = using
+
+    def __enter__(self):
+        if isinstance(self.budget, str):
+            if self.budget not in settings.QUERY_BUDGETS:
+                raise ValueError(f"No QUERY_BUDGETS entry for '{self.budget}'.")
+            self.max_queries = settings.QUERY_BUDGETS[self.budget]
+        else:
+            self.max_queries = self.budget
+        self._context = record_queries(self.using)
+        self.recorder = self._context.__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc, tb):
+        self._context.__exit__(exc_type, exc, tb)
+        if exc_type is None and self.recorder.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"{self.recorder.count} queries exceeds the budget of {self.max_queries}. "
+                f"Most repeated: {describe_duplicates(self.recorder) or 'none'}"
+            )
+        return False
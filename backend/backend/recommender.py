@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import MOOD_CATEGORIES_LIST, CatalogTrack, Track
+from .pool import energy_bucket
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Feature vector layout. Every group holds the share of the track's playlists that had each value,
+# so a track generated for Sad moods 3 times and Calm once has 0.75/0.25 in the category group.
+ENERGY_BUCKETS = ('low', 'medium', 'high')
+SEASONS = ('Spring', 'Summer', 'Fall', 'Winter')
+GENRE_BUCKETS = 16
+CATEGORY_OFFSET = 0
+ENERGY_OFFSET = CATEGORY_OFFSET + len(MOOD_CATEGORIES_LIST)
+SEASON_OFFSET = ENERGY_OFFSET + len(ENERGY_BUCKETS)
+GENRE_OFFSET = SEASON_OFFSET + len(SEASONS)
+# Average replacement rating mapped from 1..5 to -1..1; 0 when never rated.
+RATING_INDEX = GENRE_OFFSET + GENRE_BUCKETS
+FEATURE_SIZE = RATING_INDEX + 1
+
+GROUP_WEIGHTS = {'category': 3.0, 'energy': 1.5, 'season': 0.5, 'genre': 2.0, 'rating': 0.5}
+# Small random jitter so the same context doesn't always get the identical top-k.
+JITTER = 0.05
+
+_DETAIL_FIELDS = ('title', 'artist', 'album', 'duration', 'spotify_uri')
+_index_lock = threading.Lock()
+_index = None
+
+
+def available():
+    return np is not None
+
+
+def genre_bucket(favorite_genre):
+    return zlib.crc32((favorite_genre or '').strip().lower().encode()) % GENRE_BUCKETS
+
+
+def _season_slot(season):
+    return SEASONS.index(season) if season in SEASONS else None
+
+
+def rebuild_features(batch_size=1000):
+    """
+    Recomputes CatalogTrack.features from every playlist track that resolved to the catalog, using the
+    mood category, energy and season of its playlist and its owner's favorite genre. Returns how many
+    catalog tracks got a vector.
+    """
+    counts = defaultdict(lambda: [0.0] * FEATURE_SIZE)
+    totals = defaultdict(int)
+    rows = (
+        Track.objects.exclude(spotify_uri__isnull=True).exclude(spotify_uri='')
+        .values_list(
+            'spotify_uri', 'playlist__mood__category', 'playlist__mood__energy_level',
+            'playlist__mood__season', 'playlist__mood__user__userpreference__favorite_genre',
+        )
+    )
+    for spotify_uri, category, energy_level, season, favorite_genre in rows.iterator(chunk_size=5000):
+        vector = counts[spotify_uri]
+        totals[spotify_uri] += 1
+        if category in MOOD_CATEGORIES_LIST:
+            vector[CATEGORY_OFFSET + MOOD_CATEGORIES_LIST.index(category)] += 1
+        vector[ENERGY_OFFSET + ENERGY_BUCKETS.index(energy_bucket(energy_level))] += 1
+        season_slot = _season_slot(season)
+        if season_slot is not None:
+            vector[SEASON_OFFSET + season_slot] += 1
+        if favorite_genre:
+            vector[GENRE_OFFSET + genre_bucket(favorite_genre)] += 1
+
+    updated = []
+    for track in CatalogTrack.objects.filter(spotify_uri__in=counts.keys()).only('id', 'spotify_uri', 'rating_sum', 'rating_count').iterator(chunk_size=batch_size):
+        total = totals[track.spotify_uri]
+        vector = [round(value / total, 4) for value in counts[track.spotify_uri]]
+        if track.rating_count:
+            vector[RATING_INDEX] = round((track.rating_sum / track.rating_count - 3) / 2, 4)
+        track.features = vector
+        updated.append(track)
+    CatalogTrack.objects.bulk_update(updated, ['features'], batch_size=batch_size)
+    return len(updated)
+
+
+class _Index:
+    def __init__(self, details, matrix, popularity, markets):
+        self.loaded_at = time.monotonic()
+        self.details = details
+        self.matrix = matrix
+        self.popularity = popularity
+        self.markets = markets
+        self.positions = {track['spotify_uri']: position for position, track in enumerate(details)}
+        self._market_masks = {}
+
+    def in_market(self, market_code):
+        """Which tracks Spotify found in the market, computed once per loaded index."""
+        mask = self._market_masks.get(market_code)
+        if mask is None:
+            mask = np.fromiter((market_code in markets for markets in self.markets), dtype=bool, count=len(self.markets))
+            self._market_masks[market_code] = mask
+        return mask
+
+
+def _load_index():
+    details, vectors, popularity, markets = [], [], [], []
+    rows = CatalogTrack.objects.exclude(features__isnull=True).values_list(*_DETAIL_FIELDS, 'times_matched', 'markets', 'features')
+    for *fields, times_matched, track_markets, features in rows.iterator(chunk_size=5000):
+        if len(features) != FEATURE_SIZE:
+            continue
+        details.append(dict(zip(_DETAIL_FIELDS, fields)))
+        vectors.append(features)
+        popularity.append(times_matched)
+        markets.append(frozenset(track_markets))
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), FEATURE_SIZE)
+    # A mild prior towards tracks that keep getting suggested and verified.
+    prior = 0.1 * np.log1p(np.asarray(popularity, dtype=np.float32))
+    return _Index(details, matrix, prior, markets)
+
+
+def _get_index():
+    global _index
+    index = _index
+    if index is None or time.monotonic() - index.loaded_at > settings.RECOMMENDER_REFRESH_SECONDS:
+        with _index_lock:
+            if _index is index:
+                _index = _load_index()
+                logger.info(f"Loaded {len(_index.details)} catalog tracks into the recommender.")
+            index = _index
+    return index
+
+
+def query_vector(category, energy_level, season, favorite_genre):
+    query = np.zeros(FEATURE_SIZE, dtype=np.float32)
+    if category in MOOD_CATEGORIES_LIST:
+        query[CATEGORY_OFFSET + MOOD_CATEGORIES_LIST.index(category)] = GROUP_WEIGHTS['category']
+    query[ENERGY_OFFSET + ENERGY_BUCKETS.index(energy_bucket(energy_level))] = GROUP_WEIGHTS['energy']
+    season_slot = _season_slot(season)
+    if season_slot is not None:
+        query[SEASON_OFFSET + season_slot] = GROUP_WEIGHTS['season']
+    if favorite_genre:
+        query[GENRE_OFFSET + genre_bucket(favorite_genre)] = GROUP_WEIGHTS['genre']
+    query[RATING_INDEX] = GROUP_WEIGHTS['rating']
+    return query
+
+
+def recommend(category, energy_level, season, favorite_genre, count, exclude_uris=(), market_code=None):
+    """
+    Top `count` catalog tracks for the context as dicts with title, artist, album, duration and
+    spotify_uri, limited to tracks Spotify found in `market_code` when one is given. Returns []
+    when NumPy is missing or the catalog has no feature vectors yet.
+    """
+    if not available() or count <= 0:
+        return []
+    index = _get_index()
+    if not index.details:
+        return []
+
+    scores = index.matrix @ query_vector(category, energy_level, season, favorite_genre)
+    scores += index.popularity
+    scores += np.random.default_rng().random(len(scores), dtype=np.float32) * JITTER
+    for spotify_uri in exclude_uris:
+        position = index.positions.get(spotify_uri)
+        if position is not None:
+            scores[position] = -np.inf
+    if market_code:
+        scores[~index.in_market(market_code)] = -np.inf
+
+    k = min(count, len(scores))
+    top = np.argpartition(scores, -k)[-k:]
+    top = top[np.argsort(scores[top])[::-1]]
+    return [dict(index.details[position]) for position in top if np.isfinite(scores[position])]
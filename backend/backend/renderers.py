@@ -0,0 +1,52 @@
+import re
+
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+# Numbers orjson formats differently from json.dumps: exponent forms (1e16 vs 1e+16) and values
+# below 1e-4 (0.00001 vs 1e-05). In compact output a number starts the output or follows '":', ','
+# or '['; a match inside a string only costs a fallback.
+_DIFFERENT_FLOAT = re.compile(rb'(?:^|":|[,\[])-?(?:0\.0000|[0-9][0-9.]*e)')
+# Both forms contain one of these, and looking for them is several times cheaper than the scan above.
+_EXPONENT = re.compile(rb'e[-1-9]')
+
+
+def _has_different_float(ret):
+    return (b'.0000' in ret or _EXPONENT.search(ret) is not None) and _DIFFERENT_FLOAT.search(ret) is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. Produces the same bytes as the stock
+    renderer for compact output; indented output, non-strict mode, anything orjson cannot encode
+    and output with floats orjson formats differently fall back to the stock json.dumps path.
+    One difference remains: NaN and infinities are written as null instead of raising ValueError,
+    because finding them would mean walking every response in Python, which costs more than orjson saves.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.strict or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # Dates and times go through the DRF encoder so their formatting matches exactly.
+            ret = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if _has_different_float(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as the stock renderer, keeping the output a strict javascript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
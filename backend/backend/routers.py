@@ -0,0 +1,63 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# Alias reads go to in the current context; None (the default) leaves them on the primary.
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f"replica_pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Sends the user's replica reads to the primary for DB_REPLICA_PIN_SECONDS, so they see what they just wrote."""
+    if settings.DATABASE_REPLICAS and user_id is not None:
+        cache.set(_pin_key(user_id), True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def replica_for(user_id=None):
+    """A replica alias to read from, or None when there are none or the user wrote recently."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user_id is not None and cache.get(_pin_key(user_id)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def replica_reads(user_id=None):
+    """Routes the block's reads to a replica (see replica_for); writes still go to the primary."""
+    token = _read_alias.set(replica_for(user_id))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Reads inside `replica_reads()` go to one of DATABASE_REPLICAS; everything else, and every write,
+    uses the primary. Related objects are read from the database their instance came from.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db == DEFAULT_DB_ALIAS
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import MoodModel, Playlist, Track, UserPreference, SpecializedPlaylist
+from . import ordering
+from .playlist_edits import MAX_OPERATIONS
 from django.contrib.auth.forms import SetPasswordForm, PasswordResetForm
 from django.conf import settings
 from django.utils.http import urlsafe_base64_decode
@@ -9,18 +11,82 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth import update_session_auth_hash
 from django.db import transaction
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Prefetch
 
-class TrackSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Lets callers pick `fields` (top-level field names) and `expand` (nested relations to embed,
+    dotted for deeper levels, e.g. 'playlists.tracks'). Relations in Meta.expandable_fields are
+    left out unless expanded. Without either argument the full nested representation is kept.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+
+        if expand is not None:
+            expand = _with_parents(expand)
+            for name, nested_class in expandable.items():
+                if name not in expand:
+                    self.fields.pop(name, None)
+                    continue
+                self.fields[name] = nested_class(many=True, read_only=True, expand=_child_expand(expand, name))
+
+        if fields:
+            keep = set(fields) | set(expand or ())
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def plan_queryset(cls, queryset, fields=None, expand=(), parent_field=None):
+        """Restricts the queryset to the columns the serializer will read and prefetches only expanded relations."""
+        model = cls.Meta.model
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        concrete = {f.name for f in model._meta.concrete_fields}
+        columns = {name for name in cls.Meta.fields if name in concrete and (not fields or name in fields)}
+        columns.add('id')
+        if parent_field:
+            columns.add(parent_field)
+        queryset = queryset.only(*columns)
+
+        expand = _with_parents(expand)
+        for name, nested_class in expandable.items():
+            if name not in expand:
+                continue
+            relation = model._meta.get_field(name)
+            nested_queryset = nested_class.plan_queryset(
+                relation.related_model.objects.all(),
+                expand=_child_expand(expand, name),
+                parent_field=relation.field.name,
+            )
+            queryset = queryset.prefetch_related(Prefetch(name, queryset=nested_queryset))
+        return queryset
+
+def _with_parents(expand):
+    # 'playlists.tracks' implies 'playlists'.
+    paths = set()
+    for item in expand:
+        parts = item.split('.')
+        paths.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+    return paths
+
+def _child_expand(expand, name):
+    prefix = f"{name}."
+    return {item[len(prefix):] for item in expand if item.startswith(prefix)}
+
+class TrackSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Track
-        fields = ['id', 'title', 'artist', 'duration', 'order_in_playlist']
+        fields = ['id', 'title', 'artist', 'duration', 'order_key']
 
-class PlaylistSerializer(serializers.ModelSerializer):
+class PlaylistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     tracks = TrackSerializer(many=True, read_only=True)
     
     class Meta:
         model = Playlist
-        fields = ['id', 'name', 'created_at', 'tracks', 'llm_fallback_count', 'total_tracks_generated']
+        fields = ['id', 'name', 'created_at', 'tracks', 'llm_fallback_count', 'total_tracks_generated', 'version']
+        expandable_fields = {'tracks': TrackSerializer}
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,12 +102,13 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
 
-class MoodSerializer(serializers.ModelSerializer):
+class MoodSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     playlists = PlaylistSerializer(many=True, read_only=True)
     
     class Meta:
         model = MoodModel
         fields = ['id', 'mood_text', 'energy_level', 'timestamp', 'season', 'category', 'playlists']
+        expandable_fields = {'playlists': PlaylistSerializer}
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -172,16 +239,14 @@ class AddTrackSerializer(serializers.Serializer):
         playlist_id = self.context['playlist_pk']
         playlist = Playlist.objects.get(id=playlist_id)
         
-        last_track = Track.objects.filter(playlist=playlist).order_by('-order_in_playlist').first()
-        next_order = (last_track.order_in_playlist + 1) if last_track else 0
-        
         track = Track.objects.create(
             playlist=playlist,
             title=validated_data['title'],
             artist=validated_data['artist'],
             album=validated_data.get('album'),
-            order_in_playlist=next_order
+            order_key=ordering.key_after_last(playlist.pk)
         )
+        ordering.rebalance_if_long(playlist.pk, [track.order_key])
         return track
 
 class TrackOrderSerializer(serializers.Serializer):
@@ -195,10 +260,85 @@ class TrackOrderSerializer(serializers.Serializer):
         track_ids = self.validated_data['track_ids']
         
         with transaction.atomic():
-            for index, track_id in enumerate(track_ids):
-                Track.objects.filter(id=track_id, playlist=playlist).update(order_in_playlist=index)
+            tracks = {track.pk: track for track in Track.objects.filter(playlist=playlist).only('id', 'order_key')}
+            # Listed tracks first, in the given order, then any the client left out, where they were.
+            ordered = [tracks[track_id] for track_id in dict.fromkeys(track_ids) if track_id in tracks]
+            listed = {track.pk for track in ordered}
+            ordered += [track for track in sorted(tracks.values(), key=lambda t: (t.order_key, t.pk)) if track.pk not in listed]
+            keys = ordering.assign_keys([track.order_key for track in ordered])
+            changed = [track for track, key in zip(ordered, keys) if track.order_key != key]
+            for track, key in zip(ordered, keys):
+                track.order_key = key
+            Track.objects.bulk_update(changed, ['order_key'])
+        ordering.rebalance_if_long(playlist.pk, [track.order_key for track in changed])
         return playlist
 
+class PlaylistOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'remove', 'move', 'replace'])
+    track_id = serializers.IntegerField(required=False)
+    position = serializers.IntegerField(required=False, min_value=0)
+    title = serializers.CharField(max_length=255, required=False)
+    artist = serializers.CharField(max_length=255, required=False)
+    album = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    duration = serializers.CharField(max_length=10, required=False, allow_blank=True, allow_null=True)
+    spotify_uri = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    # Look the song up in the catalog / on Spotify and store what was found, like find-and-add.
+    resolve = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        op = attrs['op']
+        if op != 'add' and 'track_id' not in attrs:
+            raise serializers.ValidationError(f"'{op}' needs a track_id.")
+        if op == 'move' and 'position' not in attrs:
+            raise serializers.ValidationError("'move' needs a position.")
+        if op in ('add', 'replace') and not (attrs.get('title') and attrs.get('artist')):
+            raise serializers.ValidationError(f"'{op}' needs a title and an artist.")
+        return attrs
+
+class PlaylistEditSerializer(serializers.Serializer):
+    # The version the client last saw; the edit is refused with 409 if the playlist has changed since.
+    version = serializers.IntegerField(required=False, min_value=0)
+    operations = PlaylistOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        if len(value) > MAX_OPERATIONS:
+            raise serializers.ValidationError(f"At most {MAX_OPERATIONS} operations per request.")
+        return value
+
+class TrackSearchResultSerializer(serializers.ModelSerializer):
+    playlist_id = serializers.IntegerField(read_only=True)
+    playlist_name = serializers.CharField(source='playlist.name', read_only=True)
+    playlist_created_at = serializers.DateTimeField(source='playlist.created_at', read_only=True)
+
+    class Meta:
+        model = Track
+        fields = ['id', 'title', 'artist', 'album', 'duration', 'order_key', 'playlist_id', 'playlist_name', 'playlist_created_at']
+
+class MoodAnalyticsQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+class HistoryExportQuerySerializer(serializers.Serializer):
+    # Not `format`: DRF reserves that query parameter for picking a renderer.
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+class TrackFeedbackSerializer(serializers.Serializer):
+    track_id = serializers.IntegerField()
+    rating = serializers.IntegerField(min_value=1, max_value=5)
+    comment = serializers.CharField(required=False, allow_blank=True, default='', max_length=1000)
+
+class BatchReplaceSerializer(serializers.Serializer):
+    replacements = TrackFeedbackSerializer(many=True, allow_empty=False)
+
+    def validate_replacements(self, value):
+        track_ids = [entry['track_id'] for entry in value]
+        if len(set(track_ids)) != len(track_ids):
+            raise serializers.ValidationError("Each track can only be replaced once per request.")
+        return value
+
 class TrackDetailsRequestSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=255)
     artist = serializers.CharField(max_length=255)
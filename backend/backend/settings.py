@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -24,6 +25,8 @@ CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Retry-After']
 
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -35,12 +38,16 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'backend.apps.BackendAppConfig',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
 ]
 MIDDLEWARE = [
+    'backend.middleware.ServerTimingMiddleware',
+    'backend.middleware.QueryBudgetMiddleware',
+    'backend.middleware.ReplicaPinMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -51,6 +58,32 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 ROOT_URLCONF = 'backend.urls'
+# /metrics/ answers requests with `Authorization: Bearer <METRICS_TOKEN>` or from these networks. The network
+# is the peer address, not X-Forwarded-For; behind a proxy or Docker's port publishing that is the proxy's.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [network.strip() for network in os.environ.get('METRICS_ALLOWED_NETWORKS', '127.0.0.1/32,::1/128').split(',') if network.strip()]
+# Timing spans (OpenAI, Spotify, GeoIP, DB phases) are sent to clients in a Server-Timing header.
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'True').lower() == 'true'
+# A statement repeated this many times in one request is logged as a likely N+1.
+QUERY_DUPLICATE_LOG_THRESHOLD = int(os.environ.get('QUERY_DUPLICATE_LOG_THRESHOLD', '5'))
+# Maximum queries per request by URL name; requests over budget are logged and counted in /metrics/.
+QUERY_BUDGETS = {
+    'create_mood_and_playlist': 42,
+    'playlist_history': 4,
+    'playlist_search': 4,
+    'mood_history': 5,
+    'mood_analytics': 3,
+    'mood_history_archive': 1,
+    'mood_history_archive_month': 1,
+    'specialized_playlists': 2,
+    'replace_track': 16,
+    'replace_tracks': 20,
+    'playlist_track_add': 10,
+    'playlist_track_remove': 10,
+    'playlist_tracks_reorder': 12,
+    'playlist_track_find_and_add': 15,
+    'playlist_tracks_edit': 20,
+}
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -74,8 +107,38 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # Each worker thread keeps its connection for DB_CONN_MAX_AGE seconds (0 reconnects on every
+        # request) and pings it before reusing it in a new request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        # Transaction-mode PgBouncer hands each transaction a different server connection, which breaks
+        # server-side cursors (QuerySet.iterator()).
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_POOLER', '').lower() == 'pgbouncer',
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
+# Read replicas as comma-separated host[:port]; otherwise configured like the primary. Read-only list
+# endpoints read from a random one unless the user wrote within DB_REPLICA_PIN_SECONDS (see routers.py).
+DATABASE_REPLICAS = []
+for _index, _replica in enumerate(host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()):
+    _host, _, _port = _replica.strip().partition(':')
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+# Longer than the replicas' usual replication lag.
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '10'))
+# Connections DB_HOST accepts from this deployment: Postgres' max_connections minus what other clients
+# need, or PgBouncer's max_client_conn. The `connection_budget` system check compares it with
+# GUNICORN_WORKERS times the connections one worker can hold.
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', '100'))
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS') or (os.cpu_count() or 1) + 1)
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -101,24 +164,131 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+
+# Alternative upstream hosts, e.g. the local simulators from `manage.py run_simulators`. Unset means the real APIs.
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+SPOTIFY_API_URL = os.environ.get('SPOTIFY_API_URL') or None
+SPOTIFY_TOKEN_URL = os.environ.get('SPOTIFY_TOKEN_URL') or None
+
+# Total time a request may spend on OpenAI calls. Stays below gunicorn's 30s worker timeout
+# so the fallback response can still be built and sent.
+OPENAI_REQUEST_BUDGET_SECONDS = float(os.environ.get('OPENAI_REQUEST_BUDGET_SECONDS', '22'))
+OPENAI_DEFAULT_TIMEOUT_SECONDS = float(os.environ.get('OPENAI_DEFAULT_TIMEOUT_SECONDS', '20'))
+OPENAI_MIN_CALL_SECONDS = 1.0
+OPENAI_CALL_TIMEOUTS = {
+    'mood_category': 4.0,
+    'playlist_generation': 15.0,
+    'track_replacement': 10.0,
+    'track_alternates': 30.0,
+    'track_replacement_batch': 15.0,
+    'emotion_advice': 10.0,
+    'emotion_analysis': 15.0,
+    'specialized_playlist': 60.0,
+}
+# Minimum confidence for resolving an LLM suggestion from the local track catalog without asking Spotify.
+CATALOG_MATCH_THRESHOLD = float(os.environ.get('CATALOG_MATCH_THRESHOLD', '0.8'))
+# 'local' answers /api/mood-playlist/ from the catalog recommender without calling OpenAI; 'llm' only uses it as the fallback.
+PLAYLIST_GENERATION_MODE = os.environ.get('PLAYLIST_GENERATION_MODE', 'llm')
+# How often each worker reloads the recommender's catalog feature matrix.
+RECOMMENDER_REFRESH_SECONDS = int(os.environ.get('RECOMMENDER_REFRESH_SECONDS', '600'))
+# Replacement candidates generated for each new playlist, so most track replacements skip OpenAI.
+PLAYLIST_ALTERNATES = {
+    'ENABLED': os.environ.get('PLAYLIST_ALTERNATES_ENABLED', 'True').lower() == 'true',
+    'COUNT': int(os.environ.get('PLAYLIST_ALTERNATES_COUNT', '6')),
+}
+# Threads per request resolving a batch of suggested songs against the catalog and Spotify.
+TRACK_RESOLVE_CONCURRENCY = int(os.environ.get('TRACK_RESOLVE_CONCURRENCY', '6'))
+# Stored responses for requests sent with an Idempotency-Key header. Retries and concurrent duplicates wait
+# up to WAIT_SECONDS for the first request; one still unfinished after PENDING_TIMEOUT_SECONDS counts as dead.
+IDEMPOTENCY = {
+    'TTL_SECONDS': int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400')),
+    'WAIT_SECONDS': float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '25')),
+    'PENDING_TIMEOUT_SECONDS': int(os.environ.get('IDEMPOTENCY_PENDING_TIMEOUT_SECONDS', '120')),
+}
+# Moods (with their playlists and tracks) older than this are moved to compressed monthly archives by `archive_history`.
+HISTORY_ARCHIVE_AFTER_DAYS = int(os.environ.get('HISTORY_ARCHIVE_AFTER_DAYS', '365'))
+# Track order keys longer than this get their playlist rebalanced in the background (see backend/ordering.py).
+TRACK_ORDER_KEY_MAX_LENGTH = int(os.environ.get('TRACK_ORDER_KEY_MAX_LENGTH', '16'))
+# Threads per process for work queued with backend.background.submit().
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', '2'))
+# Pre-generated playlists for the most common mood contexts, kept stocked by `refill_playlist_pool`.
+PLAYLIST_POOL_ENABLED = os.environ.get('PLAYLIST_POOL_ENABLED', 'True').lower() == 'true'
+PLAYLIST_POOL = {
+    'CONTEXTS': int(os.environ.get('PLAYLIST_POOL_CONTEXTS', '20')),
+    'PER_CONTEXT': int(os.environ.get('PLAYLIST_POOL_PER_CONTEXT', '3')),
+    'TTL_HOURS': float(os.environ.get('PLAYLIST_POOL_TTL_HOURS', '3')),
+    'HISTORY_DAYS': int(os.environ.get('PLAYLIST_POOL_HISTORY_DAYS', '28')),
+    'SONG_COUNT': 10,
+    # Entries of a context ranked against the mood text per request.
+    'CANDIDATES': 10,
+    # Share of suggested songs that must resolve on Spotify; only the verified ones are pooled.
+    'MIN_VERIFIED_RATIO': float(os.environ.get('PLAYLIST_POOL_MIN_VERIFIED_RATIO', '0.8')),
+}
+OPENAI_CIRCUIT_BREAKER = {
+    'FAILURE_THRESHOLD': int(os.environ.get('OPENAI_CIRCUIT_FAILURE_THRESHOLD', '5')),
+    # A call that succeeds but uses more than this share of its call site's timeout counts as a failure.
+    'LATENCY_BREACH_RATIO': float(os.environ.get('OPENAI_CIRCUIT_LATENCY_BREACH_RATIO', '0.8')),
+    'RESET_TIMEOUT_SECONDS': float(os.environ.get('OPENAI_CIRCUIT_RESET_TIMEOUT_SECONDS', '30')),
+}
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Shared by all gunicorn workers, so throttle counters, the Spotify token and cached lookups aren't kept
+# once per process. 'file' needs no setup; 'db' needs `manage.py createcachetable` and adds queries to
+# every throttled request; 'memcached' (pymemcache) works with any memcached-compatible server.
+# The file cache holds pickles (cached users among them), so it lives in a directory only the app can write to.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+_CACHE_BACKENDS = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'var', 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    # Per process; only for tests and single-process runs.
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'moodmusic'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION') or _CACHE_BACKENDS[CACHE_BACKEND][1],
+        'KEY_PREFIX': 'moodmusic',
+    }
+}
+# Lock files that make throttle counter updates atomic across the workers on this host; see backend/throttling.py.
+THROTTLE_LOCK_DIR = os.environ.get('THROTTLE_LOCK_DIR') or os.path.join(BASE_DIR, 'var', 'throttle_locks')
+# How long CachedUserJWTAuthentication reuses a user row; 0 loads it on every request.
+AUTH_USER_CACHE_SECONDS = int(os.environ.get('AUTH_USER_CACHE_SECONDS', '60'))
+CACHE_TTLS = {
+    'SPECIALIZED_PLAYLISTS': int(os.environ.get('CACHE_TTL_SPECIALIZED_PLAYLISTS', '3600')),
+    # Songs that didn't resolve on Spotify, so repeated hallucinations don't cost two searches each time.
+    'SPOTIFY_MISS': int(os.environ.get('CACHE_TTL_SPOTIFY_MISS', '86400')),
+}
+
 REST_FRAMEWORK = {
+    # orjson-backed when installed; same output as the stock JSON renderer/parser except for NaN/Infinity (see renderers.py).
+    'DEFAULT_RENDERER_CLASSES': (
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'backend.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Caches the user row; read-only views that need just the id and the account views override this.
+        'backend.authentication.CachedUserJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'backend.throttling.AnonRateThrottle',
+        'backend.throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/day', 
-        'user': '1000/day',
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '100/day'),
+        'user': os.environ.get('THROTTLE_USER_RATE', '1000/day'),
         'auth_login': '5/minute',
-        'password_reset': '3/hour'
+        'password_reset': '3/hour',
+        'data_export': os.environ.get('THROTTLE_DATA_EXPORT_RATE', '10/hour'),
     }
 }
 
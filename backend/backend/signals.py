@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import archive
+from .analytics import apply_mood
+from .authentication import forget_user
+from .caching import SPECIALIZED_PLAYLISTS_KEY
+from .models import MoodModel, SpecializedPlaylist
+
+
+@receiver(post_save, sender=MoodModel)
+def add_mood_to_rollups(sender, instance, created, **kwargs):
+    if created:
+        apply_mood(instance, 1)
+
+
+@receiver(post_delete, sender=MoodModel)
+def remove_mood_from_rollups(sender, instance, **kwargs):
+    if not archive.is_archiving():
+        apply_mood(instance, -1)
+
+
+@receiver(post_save, sender=SpecializedPlaylist)
+@receiver(post_delete, sender=SpecializedPlaylist)
+def clear_specialized_playlists_cache(sender, **kwargs):
+    cache.delete(SPECIALIZED_PLAYLISTS_KEY)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
@@ -0,0 +1,5 @@
+"""
+Local stand-ins for the OpenAI and Spotify APIs, for load testing without real keys or rate limits.
+
+Start them with `python manage.py run_simulators` and drive load with `python manage.py load_test`.
+"""
@@ -0,0 +1,111 @@
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Behaviour:
+    """
+    How a simulator misbehaves. Latency is log-normally distributed around `latency_ms`
+    (sigma 0 gives a fixed delay); `error_rate` and `rate_limit_rate` are the shares of
+    requests answered with a 500 or a 429.
+    """
+
+    latency_ms: float = 100.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    seed: int = 0
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def draw(self):
+        """Returns (delay in seconds, outcome) for the next request; outcome is 'ok', 'error' or 'rate_limited'."""
+        with self._lock:
+            delay = self.latency_ms / 1000
+            if self.latency_sigma > 0:
+                delay *= self._rng.lognormvariate(0, self.latency_sigma)
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return delay, 'rate_limited'
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 'error'
+        return delay, 'ok'
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Shared JSON plumbing; subclasses implement `route(method)`."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MoodMusicSimulator/1.0'
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def route(self, method):
+        raise NotImplementedError
+
+    @property
+    def behaviour(self):
+        return self.server.behaviour
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def read_json(self):
+        body = self.read_body()
+        try:
+            return json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            return None
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate_upstream(self, error_payload, rate_limit_payload, extra_delay=0.0):
+        """Sleeps for the drawn latency and answers 500/429 when drawn. Returns True if the request may proceed."""
+        delay, outcome = self.behaviour.draw()
+        time.sleep(delay + extra_delay)
+        if outcome == 'rate_limited':
+            self.send_json(429, rate_limit_payload, headers={'Retry-After': str(self.behaviour.retry_after)})
+            return False
+        if outcome == 'error':
+            self.send_json(500, error_payload)
+            return False
+        return True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            logger.info(f"{self.server.name} {self.address_string()} {format % args}")
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, name, behaviour, verbose=False, **options):
+        super().__init__(address, handler_class)
+        self.name = name
+        self.behaviour = behaviour
+        self.verbose = verbose
+        self.options = options
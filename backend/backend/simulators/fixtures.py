@@ -0,0 +1,72 @@
+import hashlib
+import random
+from functools import lru_cache
+
+_ADJECTIVES = [
+    'Golden', 'Midnight', 'Electric', 'Silent', 'Burning', 'Velvet', 'Broken', 'Neon', 'Wild', 'Lonely',
+    'Crystal', 'Faded', 'Restless', 'Hollow', 'Summer', 'Paper', 'Silver', 'Endless', 'Quiet', 'Northern',
+]
+_NOUNS = [
+    'Heart', 'River', 'Skyline', 'Dream', 'Highway', 'Echo', 'Garden', 'Ocean', 'Shadow', 'Fire',
+    'Window', 'Letter', 'Horizon', 'Train', 'Mirror', 'Storm', 'Lights', 'Season', 'Road', 'Moon',
+]
+_FIRST_NAMES = ['Ava', 'Leo', 'Mia', 'Noah', 'Iris', 'Felix', 'Nora', 'Milo', 'Zoe', 'Ezra', 'Luna', 'Hugo']
+_LAST_NAMES = ['Hart', 'Stone', 'Vale', 'Rivers', 'Fox', 'Lane', 'Moss', 'Gray', 'Wolfe', 'Frost', 'Reed', 'Cole']
+_BASE62 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+def seeded_rng(*parts):
+    """A Random whose sequence depends only on `parts`, so the same request always gets the same answer."""
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def track_id(*parts):
+    """22 character base62 id, the same shape as a Spotify track id."""
+    number = int.from_bytes(hashlib.sha256('|'.join(str(part) for part in parts).encode()).digest(), 'big')
+    chars = []
+    for _ in range(22):
+        number, remainder = divmod(number, 62)
+        chars.append(_BASE62[remainder])
+    return ''.join(chars)
+
+
+def _artist_name(rng):
+    if rng.random() < 0.3:
+        return f"The {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}s"
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+
+@lru_cache(maxsize=8)
+def catalog(size=500, seed=0):
+    """Deterministic list of fake tracks shared by both simulators, so suggested songs can be found on search."""
+    rng = random.Random(seed)
+    tracks, seen = [], set()
+    while len(tracks) < size:
+        title = f"{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}"
+        artist = _artist_name(rng)
+        if (title, artist) in seen:
+            continue
+        seen.add((title, artist))
+        tracks.append({
+            'id': track_id(seed, title, artist),
+            'title': title,
+            'artist': artist,
+            'album': f"{rng.choice(_NOUNS)} {rng.choice(['Sessions', 'Stories', 'EP', 'Tapes', 'Nights'])}",
+            'duration_ms': rng.randint(150, 300) * 1000,
+        })
+    return tracks
+
+
+def invented_track(rng):
+    """A song that is deliberately missing from the catalog, like an LLM hallucination."""
+    return {
+        'title': f"{rng.choice(_NOUNS)} of {rng.choice(_NOUNS)} (Unreleased)",
+        'artist': f"{rng.choice(_FIRST_NAMES)} {rng.choice(_NOUNS)}",
+        'duration_ms': rng.randint(150, 300) * 1000,
+    }
+
+
+def format_duration(duration_ms):
+    seconds = duration_ms // 1000
+    return f"{seconds // 60}:{seconds % 60:02d}"
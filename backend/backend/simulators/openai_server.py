@@ -0,0 +1,173 @@
+import json
+import re
+import time
+
+from .common import SimulatorHandler
+from .fixtures import catalog, format_duration, invented_track, seeded_rng, track_id
+
+_SONG_COUNT = re.compile(r'exactly (\d+) songs')
+_TRACK_IDS = re.compile(r'track_id (\d+):')
+_CATEGORIES = re.compile(r'categories: (.*?)\. You only')
+_EMOTIONS = ['calm', 'happy', 'tired', 'focused', 'sad', 'surprised']
+_ADVICE = [
+    "Take five slow breaths and name what you are feeling without judging it.",
+    "Step outside for a ten minute walk and notice three things around you.",
+    "Write down the one thing that is weighing on you most and a first small step.",
+    "Reach out to someone you trust and tell them how your day is going.",
+    "Give yourself permission to rest before tackling the next task.",
+]
+
+
+def _text(content):
+    if isinstance(content, list):
+        return ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+    return content or ''
+
+
+def _has_image(messages):
+    return any(
+        isinstance(message.get('content'), list)
+        and any(isinstance(part, dict) and part.get('type') == 'image_url' for part in message['content'])
+        for message in messages
+    )
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class OpenAIHandler(SimulatorHandler):
+    """POST /v1/chat/completions, with JSON mode, vision and streaming responses."""
+
+    def route(self, method):
+        if method == 'POST' and self.path.rstrip('/').endswith('/chat/completions'):
+            return self.chat_completions()
+        self.read_body()
+        self.send_json(404, {'error': {'message': f"Unknown endpoint {method} {self.path}", 'type': 'invalid_request_error'}})
+
+    def chat_completions(self):
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self.read_body()
+            return self.send_json(401, {'error': {'message': 'Missing API key.', 'type': 'invalid_request_error', 'code': 'invalid_api_key'}})
+        body = self.read_json()
+        if not isinstance(body, dict) or not body.get('messages'):
+            return self.send_json(400, {'error': {'message': "'messages' is required.", 'type': 'invalid_request_error'}})
+
+        content = self.completion_content(body)
+        completion_tokens = _estimate_tokens(content)
+        extra_delay = completion_tokens * self.server.options['ms_per_token'] / 1000 if not body.get('stream') else 0.0
+        proceed = self.simulate_upstream(
+            error_payload={'error': {'message': 'The server had an error while processing your request.', 'type': 'server_error'}},
+            rate_limit_payload={'error': {'message': 'Rate limit reached for requests.', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+            extra_delay=extra_delay,
+        )
+        if not proceed:
+            return
+
+        usage = {
+            'prompt_tokens': _estimate_tokens(json.dumps(body['messages'])),
+            'completion_tokens': completion_tokens,
+        }
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        completion_id = f"chatcmpl-sim-{track_id(json.dumps(body, sort_keys=True))[:16]}"
+        model = body.get('model', 'gpt-4o-mini')
+
+        if body.get('stream'):
+            include_usage = (body.get('stream_options') or {}).get('include_usage')
+            return self.stream(completion_id, model, content, usage if include_usage else None)
+
+        self.send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content, 'refusal': None},
+                'logprobs': None,
+                'finish_reason': 'stop',
+            }],
+            'usage': usage,
+        })
+
+    def stream(self, completion_id, model, content, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'logprobs': None, 'finish_reason': finish_reason}] if delta is not None else [],
+            }
+            if chunk_usage:
+                payload['usage'] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        chunk({'role': 'assistant', 'content': ''})
+        pieces = re.findall(r'\S+\s*', content) or ['']
+        for piece in pieces:
+            time.sleep(self.server.options['ms_per_token'] * _estimate_tokens(piece) / 1000)
+            chunk({'content': piece})
+        chunk({}, finish_reason='stop')
+        if usage:
+            chunk(None, chunk_usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def completion_content(self, body):
+        """Picks a plausible answer from the prompt text; identical requests always get identical answers."""
+        messages = body['messages']
+        system = ' '.join(_text(m.get('content')) for m in messages if m.get('role') == 'system')
+        user = ' '.join(_text(m.get('content')) for m in messages if m.get('role') == 'user')
+        options = self.server.options
+        rng = seeded_rng(options['seed'], system, user)
+
+        if _has_image(messages):
+            emotion = rng.choice(_EMOTIONS)
+            return f"The person appears {emotion}, with a relaxed brow and a steady gaze supporting that impression."
+
+        json_mode = (body.get('response_format') or {}).get('type') == 'json_object'
+        if not json_mode:
+            categories = _CATEGORIES.search(system)
+            if categories:
+                return rng.choice([name.strip() for name in categories.group(1).split(',')])
+            return "This is a simulated response."
+
+        if 'advice_list' in system or 'advice_list' in user:
+            return json.dumps({'advice_list': rng.sample(_ADVICE, 3)})
+
+        track_ids = _TRACK_IDS.findall(user) if "'replacements'" in user else []
+        count_match = _SONG_COUNT.search(user)
+        count = len(track_ids) or (int(count_match.group(1)) if count_match else 1)
+        tracks = []
+        for fixture in self.suggest(rng, count):
+            track = {'title': fixture['title'], 'artist': fixture['artist'], 'duration': format_duration(fixture['duration_ms'])}
+            if 'spotify_track_id' in user:
+                track['spotify_track_id'] = fixture.get('id')
+            if "'energy'" in user:
+                track['energy'] = rng.randint(1, 10)
+            tracks.append(track)
+
+        if track_ids:
+            return json.dumps({'replacements': [dict(track, track_id=int(tid)) for tid, track in zip(track_ids, tracks)]})
+        if 'playlist_name' in user:
+            return json.dumps({'playlist_name': f"Simulated Mix {rng.randint(1, 999)}", 'tracks': tracks})
+        if "'tracks'" in user:
+            return json.dumps({'tracks': tracks})
+        return json.dumps(tracks[0])
+
+    def suggest(self, rng, count):
+        options = self.server.options
+        tracks = catalog(options['catalog_size'], options['seed'])
+        return [
+            invented_track(rng) if rng.random() < options['hallucination_rate'] else rng.choice(tracks)
+            for _ in range(count)
+        ]
@@ -0,0 +1,97 @@
+import re
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+from .common import SimulatorHandler
+from .fixtures import catalog
+
+_FIELD_QUERY = re.compile(r'track:(?P<title>.*?)(?:\s+artist:(?P<artist>.*))?$')
+
+
+@lru_cache(maxsize=8)
+def _indexes(size, seed):
+    tracks = catalog(size, seed)
+    by_id = {track['id']: track for track in tracks}
+    by_title = {}
+    for track in tracks:
+        by_title.setdefault(track['title'].lower(), []).append(track)
+    return by_id, by_title
+
+
+def _track_object(track):
+    return {
+        'id': track['id'],
+        'name': track['title'],
+        'type': 'track',
+        'uri': f"spotify:track:{track['id']}",
+        'duration_ms': track['duration_ms'],
+        'explicit': False,
+        'artists': [{'name': name.strip(), 'type': 'artist'} for name in track['artist'].split(',')],
+        'album': {'name': track['album'], 'type': 'album'},
+        'external_urls': {'spotify': f"https://open.spotify.com/track/{track['id']}"},
+    }
+
+
+class SpotifyHandler(SimulatorHandler):
+    """POST /api/token (client credentials), GET /v1/search and GET /v1/tracks/<id>."""
+
+    def route(self, method):
+        url = urlsplit(self.path)
+        if method == 'POST' and url.path.rstrip('/') == '/api/token':
+            return self.token()
+        self.read_body()
+        if method == 'GET' and url.path.rstrip('/') == '/v1/search':
+            return self.guarded(self.search, parse_qs(url.query))
+        if method == 'GET' and url.path.startswith('/v1/tracks/'):
+            return self.guarded(self.track, url.path.rsplit('/', 1)[-1])
+        self.send_json(404, {'error': {'status': 404, 'message': 'Service not found'}})
+
+    def token(self):
+        form = parse_qs(self.read_body().decode())
+        if form.get('grant_type') != ['client_credentials'] or not self.headers.get('Authorization', '').startswith('Basic '):
+            return self.send_json(400, {'error': 'invalid_client', 'error_description': 'Invalid client'})
+        self.send_json(200, {'access_token': 'simulated-access-token', 'token_type': 'Bearer', 'expires_in': 3600})
+
+    def guarded(self, handler, argument):
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self.send_json(401, {'error': {'status': 401, 'message': 'No token provided'}})
+        proceed = self.simulate_upstream(
+            error_payload={'error': {'status': 500, 'message': 'Server error.'}},
+            rate_limit_payload={'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+        )
+        if proceed:
+            handler(argument)
+
+    def search(self, params):
+        query = (params.get('q') or [''])[0].strip()
+        limit = min(int((params.get('limit') or ['10'])[0]), 50)
+        by_id, by_title = _indexes(self.server.options['catalog_size'], self.server.options['seed'])
+
+        match = _FIELD_QUERY.match(query)
+        if match:
+            candidates = by_title.get(match.group('title').strip().lower(), [])
+            if match.group('artist'):
+                artist = match.group('artist').strip().lower()
+                candidates = [track for track in candidates if artist in track['artist'].lower()]
+        else:
+            candidates = [track for track in by_id.values() if query.lower() in track['title'].lower()]
+
+        items = [_track_object(track) for track in candidates[:limit]]
+        self.send_json(200, {
+            'tracks': {
+                'href': f"{self.path}",
+                'items': items,
+                'limit': limit,
+                'offset': 0,
+                'total': len(candidates),
+                'next': None,
+                'previous': None,
+            }
+        })
+
+    def track(self, spotify_id):
+        by_id, _ = _indexes(self.server.options['catalog_size'], self.server.options['seed'])
+        track = by_id.get(spotify_id)
+        if not track:
+            return self.send_json(404, {'error': {'status': 404, 'message': 'Non existing id'}})
+        self.send_json(200, _track_object(track))
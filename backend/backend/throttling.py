@@ -0,0 +1,66 @@
+import hashlib
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import throttling
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# DRF's throttles read a client's request history from the cache, append to it and write it back. Workers
+# doing that at the same time each see the old history and all but one append is lost, so a burst spread over
+# several workers got well past the limit (see `check_throttle_sharing`). Holding a host-wide file lock per
+# cache key around the update makes it one step for all workers on the machine.
+LOCK_STRIPES = 256
+_lock_dir_ready = False
+
+
+def _ensure_lock_dir():
+    global _lock_dir_ready
+    if not _lock_dir_ready:
+        # gunicorn runs with umask 0 and makedirs doesn't apply the mode to parents, so set it like FileBasedCache does.
+        old_umask = os.umask(0o077)
+        try:
+            os.makedirs(settings.THROTTLE_LOCK_DIR, 0o700, exist_ok=True)
+        finally:
+            os.umask(old_umask)
+        _lock_dir_ready = True
+
+
+@contextmanager
+def key_lock(key):
+    """Exclusive lock on `key` shared by every process on this host; a no-op where fcntl is missing."""
+    if fcntl is None:
+        yield
+        return
+    _ensure_lock_dir()
+    stripe = int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % LOCK_STRIPES
+    fd = os.open(os.path.join(settings.THROTTLE_LOCK_DIR, f"{stripe:02x}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock.
+        os.close(fd)
+
+
+class LockedHistoryMixin:
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        with key_lock(key):
+            return super().allow_request(request, view)
+
+
+class AnonRateThrottle(LockedHistoryMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(LockedHistoryMixin, throttling.UserRateThrottle):
+    pass
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .metrics import UPSTREAM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+_recorder = ContextVar('timing_recorder', default=None)
+
+
+class SpanRecorder:
+    """
+    Collects the spans of one request (or command run); repeated span names are summed. Worker
+    threads can report into it when run in a copy of the request's context.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration, calls=1):
+        with self._lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + duration, count + calls)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for the Server-Timing header, durations in milliseconds."""
+        entries = []
+        for name, (total, count) in self.spans.items():
+            entry = f"{name};dur={total * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ', '.join(entries)
+
+    def summary(self):
+        return ', '.join(f"{name}={total * 1000:.0f}ms" + (f" x{count}" if count > 1 else '') for name, (total, count) in self.spans.items())
+
+
+def current():
+    """The active SpanRecorder, or None outside `recording()`."""
+    return _recorder.get()
+
+
+@contextmanager
+def recording():
+    """Makes spans opened inside the block (in this thread/context) report to a fresh SpanRecorder."""
+    recorder = SpanRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def span(name, upstream):
+    """
+    Times the block. Every span feeds the upstream latency histogram; inside `recording()`
+    it also shows up in that request's Server-Timing header.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        UPSTREAM_LATENCY.labels(upstream=upstream, operation=name).observe(duration)
+        recorder = current()
+        if recorder is not None:
+            recorder.add(name, duration)
+        logger.debug(f"span {name} ({upstream}) took {duration * 1000:.1f}ms")
@@ -8,6 +8,7 @@ from rest_framework_simplejwt.views import (
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('api/register/', views.UserCreate.as_view(), name='user_create'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -17,11 +18,18 @@ urlpatterns = [
     path('api/password-reset/confirm/', views.PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('api/mood-playlist/', views.create_mood_and_playlist, name='create_mood_and_playlist'),
     path('api/playlists/history/', views.PlaylistHistoryView.as_view(), name='playlist_history'),
+    path('api/playlists/search/', views.PlaylistSearchView.as_view(), name='playlist_search'),
     path('api/playlists/<int:playlist_pk>/tracks/<int:track_pk>/replace/', views.replace_track_view, name='replace_track'),
+    path('api/playlists/<int:playlist_pk>/tracks/replace/', views.replace_tracks_view, name='replace_tracks'),
     path('api/specialized-playlists/', views.SpecializedPlaylistListView.as_view(), name='specialized_playlists'),
     path('api/mood-history/', views.MoodHistoryView.as_view(), name='mood_history'),
+    path('api/mood-history/archive/', views.mood_history_archive, name='mood_history_archive'),
+    path('api/mood-history/archive/<int:year>/<int:month>/', views.mood_history_archive_month, name='mood_history_archive_month'),
+    path('api/mood-history/export/', views.export_history, name='export_history'),
+    path('api/mood-analytics/', views.mood_analytics, name='mood_analytics'),
     path('api/emotion-recommendation/', views.get_emotion_recommendation, name='emotion_recommendation'),
     path('api/analyze-emotion-openai/', views.AnalyzeEmotionOpenAIView.as_view(), name='analyze_emotion_openai'),
+    path('api/playlists/<int:playlist_pk>/tracks/', views.edit_playlist_tracks, name='playlist_tracks_edit'),
     path('api/playlists/<int:playlist_pk>/tracks/<int:track_pk>/remove/', views.remove_track_from_playlist, name='playlist_track_remove'),
     path('api/playlists/<int:playlist_pk>/tracks/add/', views.add_track_to_playlist, name='playlist_track_add'),
     path('api/playlists/<int:playlist_pk>/tracks/reorder/', views.reorder_playlist_tracks, name='playlist_tracks_reorder'),
@@ -1,28 +1,48 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.pagination import PageNumberPagination
 import json 
 import os
 import base64
+import hmac
+import ipaddress
+import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from .models import MoodModel, Playlist, Track, UserPreference, SpecializedPlaylist
+from functools import partial
+from django.utils import timezone
+from .models import MOOD_CATEGORIES_LIST, ArchivedHistoryMonth, MoodModel, Playlist, Track, UserPreference, SpecializedPlaylist
 from .serializers import (
     MoodSerializer, PlaylistSerializer, TrackSerializer, UserSerializer,
     PasswordResetRequestSerializer, PasswordResetConfirmSerializer,
     UserProfileSerializer, ChangePasswordSerializer, SpecializedPlaylistSerializer,
-    AddTrackSerializer, TrackOrderSerializer, TrackDetailsRequestSerializer
+    AddTrackSerializer, TrackOrderSerializer, TrackDetailsRequestSerializer,
+    TrackSearchResultSerializer, MoodAnalyticsQuerySerializer, BatchReplaceSerializer,
+    HistoryExportQuerySerializer, PlaylistEditSerializer
 )
-from openai import OpenAI
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 import traceback
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.contrib.postgres.search import SearchQuery, SearchRank
 import logging
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 import geoip2.database
 from geoip2.errors import AddressNotFoundError
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+from . import alternates, analytics, archive, background, caching, catalog, export, llm, ordering, playlist_edits, pool, prompts, recommender, routers, timing
+from .idempotency import idempotent
+from .metrics import TRACK_RESOLUTIONS
+from .throttling import UserRateThrottle
 
 logger = logging.getLogger(__name__)
 
@@ -35,14 +55,7 @@ except FileNotFoundError:
 except Exception as e:
     logger.error(f"Error loading GeoIP2 database: {e}", exc_info=True)
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
-MOOD_CATEGORIES_LIST = [
-    "Happy", "Sad", "Angry", "Calm", "Excited", "Anxious", 
-    "Confident", "Lonely", "Nostalgic", "Romantic", "Other"
-]
-
-def get_mood_category_from_openai(mood_text):
+def get_mood_category_from_openai(mood_text, deadline=None, user=None):
     """Calls OpenAI to classify mood_text into one of the predefined categories."""
     if not mood_text:
         return "Other"
@@ -56,7 +69,10 @@ def get_mood_category_from_openai(mood_text):
     )
     
     try:
-        response = client.chat.completions.create(
+        response = llm.chat_completion(
+            'mood_category',
+            deadline=deadline,
+            user=user,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": f"You are an assistant that classifies user mood descriptions into one of these categories: {categories_str}. You only output the single category name."},
@@ -74,6 +90,9 @@ def get_mood_category_from_openai(mood_text):
             logger.warning(f"OpenAI returned unexpected category '{category}' for mood '{mood_text}'. Defaulting to Other.")
             return "Other"
             
+    except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+        logger.warning(f"Skipping OpenAI mood categorization: {str(e)}. Defaulting to Other.")
+        return "Other"
     except Exception as e:
         logger.error(f"Error calling OpenAI for mood categorization: {str(e)}", exc_info=True)
         return "Other"
@@ -85,6 +104,7 @@ class UserCreate(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def create_mood_and_playlist(request):
     user = request.user
     mood_text = request.data.get('mood_text', '') 
@@ -94,21 +114,19 @@ def create_mood_and_playlist(request):
     song_count = request.data.get('song_count', 7) 
     song_count = max(5, min(int(song_count), 15)) 
     playlist_goal = request.data.get('playlist_goal')
+    deadline = llm.Deadline(settings.OPENAI_REQUEST_BUDGET_SECONDS)
 
     text_for_mood_tracking = mood_text if mood_text else detected_emotion_text
 
-    mood_category = get_mood_category_from_openai(text_for_mood_tracking)
+    use_llm = settings.PLAYLIST_GENERATION_MODE != 'local'
+
+    if use_llm:
+        mood_category = get_mood_category_from_openai(text_for_mood_tracking, deadline=deadline, user=user)
+    else:
+        mood_category = category_from_keywords(text_for_mood_tracking)
     logger.info(f"Using text for categorization: '{text_for_mood_tracking}'. Categorized as: {mood_category}")
 
-    market_code_for_spotify = None
-    if favorite_genre and isinstance(favorite_genre, str):
-        genre_lower = favorite_genre.lower()
-        if "lithuanian" in genre_lower:
-            market_code_for_spotify = "LT"
-        elif "polish" in genre_lower:
-            market_code_for_spotify = "PL"
-        elif "japanese" in genre_lower or "j-pop" in genre_lower or "j-rock" in genre_lower:
-            market_code_for_spotify = "JP"
+    market_code_for_spotify = pool.genre_market(favorite_genre)
 
     if not market_code_for_spotify and geoip_reader:
         try:
@@ -120,7 +138,8 @@ def create_mood_and_playlist(request):
             
             if ip_address:
                 logger.info(f"Attempting GeoIP lookup for IP: {ip_address}")
-                response = geoip_reader.country(ip_address)
+                with timing.span('geoip', upstream='geoip'):
+                    response = geoip_reader.country(ip_address)
                 market_code_for_spotify = response.country.iso_code
                 logger.info(f"GeoIP lookup successful: IP {ip_address} mapped to market {market_code_for_spotify}")
             else:
@@ -135,38 +154,23 @@ def create_mood_and_playlist(request):
     else:
         logger.info("No specific market code determined for Spotify. Using Spotify's default.")
 
-    current_month = datetime.now().month
-    if 3 <= current_month <= 5:
-        season = 'Spring'
-    elif 6 <= current_month <= 8:
-        season = 'Summer'
-    elif 9 <= current_month <= 11:
-        season = 'Fall'
-    else:
-        season = 'Winter'
-    
-    current_hour = datetime.now().hour
-    if 5 <= current_hour < 12:
-        time_of_day = 'Morning'
-    elif 12 <= current_hour < 17:
-        time_of_day = 'Afternoon'
-    elif 17 <= current_hour < 21:
-        time_of_day = 'Evening'
-    else:
-        time_of_day = 'Night'
+    now = timezone.localtime()
+    season = pool.season_for(now)
+    time_of_day = pool.time_of_day_for(now)
 
-    pref, created = UserPreference.objects.update_or_create(
-        user=user,
-        defaults={'favorite_genre': favorite_genre}
-    )
+    with timing.span('db_mood_write', upstream='db'):
+        pref, created = UserPreference.objects.update_or_create(
+            user=user,
+            defaults={'favorite_genre': favorite_genre}
+        )
 
-    mood_instance = MoodModel.objects.create(
-        user=user,
-        mood_text=text_for_mood_tracking,
-        energy_level=energy_level,
-        season=season,
-        category=mood_category
-    )
+        mood_instance = MoodModel.objects.create(
+            user=user,
+            mood_text=text_for_mood_tracking,
+            energy_level=energy_level,
+            season=season,
+            category=mood_category
+        )
     
     feeling_description = ""
     if detected_emotion_text:
@@ -176,107 +180,130 @@ def create_mood_and_playlist(request):
     else: 
         feeling_description = "is in an unspecified mood"
 
-    prompt_parts = [
-        f"Create a music playlist for someone who {feeling_description} (overall mood categorized as {mood_category}). ",
-        f"It's currently {time_of_day} in {season}, their energy level is {energy_level}/10, ",
-        f"and they prefer {favorite_genre} music. "
-    ]
-
-    if market_code_for_spotify:
-        prompt_parts.append(
-            f"The user has indicated a preference for music from the region associated with market code '{market_code_for_spotify}'. "
-            f"Please prioritize songs that are verifiably available on major streaming platforms within this market. "
-            f"If possible, lean towards more recognizable tracks from this region to increase verification chances. "
-        )
-
-    if playlist_goal:
-        prompt_parts.append(f"The goal for this playlist is: '{playlist_goal}'. ")
-
-    prompt_parts.extend([
-        f"Return ONLY a JSON object (no extra text before or after) with two keys: ",
-        f"1. 'playlist_name': A short, creative title for the playlist (max 5 words). ",
-        f"2. 'tracks': A JSON array of exactly {song_count} songs. ",
-        f"Each song in the array must have 'title', 'artist', and 'duration' fields. ",
-        f"For each track, please provide the most common and verifiable spelling for the title and artist. If suggesting regional or less common music, prioritize tracks that are likely to be found on major streaming platforms. ",
-        f"Make sure the songs match the mood, category, time of day, energy level, and playlist goal if provided."
-    ])
-    
-    prompt = "".join(prompt_parts)
+    prompt_params = {
+        'feeling_description': feeling_description,
+        'mood_category': mood_category,
+        'time_of_day': time_of_day,
+        'season': season,
+        'energy_level': energy_level,
+        'favorite_genre': favorite_genre,
+        'market_code': market_code_for_spotify,
+        'playlist_goal': playlist_goal,
+        'song_count': song_count,
+    }
+    pooled = None
+    if settings.PLAYLIST_POOL_ENABLED and not playlist_goal:
+        # Goals are free-form, so only requests without one can take a pre-generated playlist.
+        with timing.span('pool_claim', upstream='db'):
+            pooled = pool.claim(
+                pool.make_context(mood_category, favorite_genre, energy_level, market_code_for_spotify, now),
+                text_for_mood_tracking,
+                song_count,
+            )
 
     try:
-        playlist_data = call_openai_api(prompt)
-
-        playlist_name = playlist_data.get('playlist_name', f"Mood Playlist ({text_for_mood_tracking[:20]}...)") 
-        tracks_data = playlist_data.get('tracks', []) 
-
         processed_tracks_data = []
         verified_on_spotify_count = 0
         llm_fallback_count = 0
 
-        for i, track_data_from_llm in enumerate(tracks_data):
-            original_title = track_data_from_llm.get('title', 'Unknown Title')
-            original_artist = track_data_from_llm.get('artist', 'Unknown Artist')
-            original_duration = track_data_from_llm.get('duration')
-
-            spotify_track_details = _search_spotify_for_track_details(
-                title=original_title, 
-                artist=original_artist, 
-                market_code=market_code_for_spotify
-            )
-
-            track_info_to_save = {
-                'title': original_title,
-                'artist': original_artist,
-                'album': None,
-                'duration': original_duration,
-                'spotify_uri': None,
-                'order_in_playlist': i
-            }
-
-            if spotify_track_details:
-                logger.info(f"Successfully found Spotify details for: {original_title} - {original_artist}")
-                track_info_to_save['title'] = spotify_track_details['title']
-                track_info_to_save['artist'] = spotify_track_details['artist']
-                track_info_to_save['album'] = spotify_track_details['album']
-                track_info_to_save['duration'] = spotify_track_details['duration']
-                track_info_to_save['spotify_uri'] = spotify_track_details['spotify_uri']
+        if pooled is not None:
+            logger.info(f"Serving pooled playlist '{pooled.name}' to user {user.username}.")
+            playlist_name = pooled.name
+            prompt_template, prompt_params = pooled.prompt_template, pooled.prompt_params
+            for pooled_track in pooled.tracks[:song_count]:
+                processed_tracks_data.append(pooled_track)
                 verified_on_spotify_count += 1
+        else:
+            recommend = partial(recommended_playlist_data, mood_category, energy_level, season, favorite_genre, song_count, market_code_for_spotify)
+            if use_llm:
+                prompt_template, prompt = prompts.playlist_generation_prompt(prompt_params)
+                playlist_data = call_openai_api(prompt, deadline=deadline, user=user, fallback=recommend)
             else:
-                logger.warning(f"Could not find Spotify details for: {original_title} - {original_artist}. Using LLM provided data.")
-                llm_fallback_count += 1
-                if track_info_to_save['duration'] and isinstance(track_info_to_save['duration'], str) and ':' not in track_info_to_save['duration']:
-                    try:
-                        total_seconds = int(track_info_to_save['duration'])
-                        minutes = total_seconds // 60
-                        seconds = total_seconds % 60
-                        track_info_to_save['duration'] = f"{minutes}:{seconds:02d}"
-                    except ValueError:
-                        logger.warning(f"Could not parse LLM duration '{track_info_to_save['duration']}' for '{original_title}'. Leaving as null.")
-                        track_info_to_save['duration'] = None
+                prompt_template = prompt_params = None
+                playlist_data = recommend()
+
+            playlist_name = playlist_data.get('playlist_name', f"Mood Playlist ({text_for_mood_tracking[:20]}...)") 
+            tracks_data = playlist_data.get('tracks', []) 
+
+            catalog_writes = catalog.CatalogWrites()
+            for track_data_from_llm in tracks_data:
+                original_title = track_data_from_llm.get('title', 'Unknown Title')
+                original_artist = track_data_from_llm.get('artist', 'Unknown Artist')
+                original_duration = track_data_from_llm.get('duration')
+
+                spotify_track_details = None
+                if track_data_from_llm.get('spotify_uri'):
+                    # Recommended from the catalog, already verified.
+                    spotify_track_details = track_data_from_llm
+                elif not deadline.expired():
+                    spotify_track_details = _resolve_track_details(
+                        title=original_title, 
+                        artist=original_artist, 
+                        market_code=market_code_for_spotify,
+                        catalog_writes=catalog_writes,
+                    )
+
+                track_info_to_save = {
+                    'title': original_title,
+                    'artist': original_artist,
+                    'album': None,
+                    'duration': original_duration,
+                    'spotify_uri': None,
+                }
+
+                if spotify_track_details:
+                    logger.info(f"Successfully found Spotify details for: {original_title} - {original_artist}")
+                    track_info_to_save['title'] = spotify_track_details['title']
+                    track_info_to_save['artist'] = spotify_track_details['artist']
+                    track_info_to_save['album'] = spotify_track_details['album']
+                    track_info_to_save['duration'] = spotify_track_details['duration']
+                    track_info_to_save['spotify_uri'] = spotify_track_details['spotify_uri']
+                    verified_on_spotify_count += 1
+                else:
+                    logger.warning(f"Could not find Spotify details for: {original_title} - {original_artist}. Using LLM provided data.")
+                    llm_fallback_count += 1
+                    if track_info_to_save['duration'] and isinstance(track_info_to_save['duration'], str) and ':' not in track_info_to_save['duration']:
+                        try:
+                            total_seconds = int(track_info_to_save['duration'])
+                            minutes = total_seconds // 60
+                            seconds = total_seconds % 60
+                            track_info_to_save['duration'] = f"{minutes}:{seconds:02d}"
+                        except ValueError:
+                            logger.warning(f"Could not parse LLM duration '{track_info_to_save['duration']}' for '{original_title}'. Leaving as null.")
+                            track_info_to_save['duration'] = None
             
-            processed_tracks_data.append(track_info_to_save)
+                processed_tracks_data.append(track_info_to_save)
+
+            with timing.span('catalog_write', upstream='db'):
+                catalog_writes.flush()
 
         total_tracks_count = len(processed_tracks_data)
-        playlist_instance = Playlist.objects.create(
-            mood=mood_instance, 
-            prompt_used=prompt, 
-            name=playlist_name,
-            llm_fallback_count=llm_fallback_count,
-            total_tracks_generated=total_tracks_count
-        )
-        
-        created_tracks_instances = []
-        for track_info in processed_tracks_data:
-            track = Track.objects.create(
-                playlist=playlist_instance,
-                title=track_info['title'],
-                artist=track_info['artist'],
-                album=track_info['album'],
-                duration=track_info['duration'],
-                spotify_uri=track_info['spotify_uri'],
-                order_in_playlist=track_info['order_in_playlist']
+        with timing.span('db_playlist_write', upstream='db'):
+            playlist_instance = Playlist.objects.create(
+                mood=mood_instance, 
+                prompt_template=prompt_template,
+                prompt_params=prompt_params,
+                name=playlist_name,
+                llm_fallback_count=llm_fallback_count,
+                total_tracks_generated=total_tracks_count
             )
-            created_tracks_instances.append(track)
+        
+            order_keys = ordering.keys_between(None, None, len(processed_tracks_data))
+            Track.objects.bulk_create([
+                Track(
+                    playlist=playlist_instance,
+                    title=track_info['title'],
+                    artist=track_info['artist'],
+                    album=track_info['album'],
+                    duration=track_info['duration'],
+                    spotify_uri=track_info['spotify_uri'],
+                    order_key=order_key
+                )
+                for track_info, order_key in zip(processed_tracks_data, order_keys)
+            ])
+
+        if settings.PLAYLIST_ALTERNATES['ENABLED']:
+            background.submit(generate_playlist_alternates, playlist_instance.pk)
 
         mood_serializer = MoodSerializer(mood_instance) 
         playlist_serializer = PlaylistSerializer(playlist_instance) 
@@ -298,9 +325,13 @@ def create_mood_and_playlist(request):
             'error': f"Failed to generate playlist. Please try again later."
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-def call_openai_api(prompt):
+def call_openai_api(prompt, deadline=None, user=None, fallback=None):
+    fallback = fallback or fallback_playlist_data
     try:
-        response = client.chat.completions.create(
+        response = llm.chat_completion(
+            'playlist_generation',
+            deadline=deadline,
+            user=user,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are an assistant that generates playlist names and song lists in JSON format."}, 
@@ -327,17 +358,39 @@ def call_openai_api(prompt):
             
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Failed to parse JSON response or validate structure: {response_text} Error: {str(e)}")
-            return fallback_playlist_data()
+            return fallback()
             
+    except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+        logger.warning(f"Skipping OpenAI playlist generation: {str(e)}")
+        return fallback()
     except Exception as e:
         logger.error(f"Error calling OpenAI API in call_openai_api: {str(e)}", exc_info=True)
-        return fallback_playlist_data()
+        return fallback()
+
+FALLBACK_PLAYLIST_NAME = "Default Fallback Playlist"
+
+def recommended_playlist_data(mood_category, energy_level, season, favorite_genre, song_count, market_code=None):
+    """Playlist from the local recommender over verified catalog tracks; the static fallback if it has too few."""
+    with timing.span('recommend', upstream='local'):
+        tracks = recommender.recommend(mood_category, energy_level, season, favorite_genre, song_count, market_code=market_code)
+    if len(tracks) < min(song_count, 5):
+        return fallback_playlist_data(f"The recommender found only {len(tracks)} catalog tracks")
+    logger.info(f"Recommended {len(tracks)} catalog tracks for {mood_category}/{favorite_genre}/{energy_level}.")
+    return {"playlist_name": f"{mood_category} {season} Picks", "tracks": tracks}
+
+def category_from_keywords(mood_text):
+    """First mood category named in the text, for when the LLM is not used."""
+    words = set(re.findall(r"[a-z]+", (mood_text or '').lower()))
+    for category in MOOD_CATEGORIES_LIST:
+        if category.lower() in words:
+            return category
+    return "Other"
 
-def fallback_playlist_data():
-    """Provide a fallback playlist structure in case the API call fails"""
-    logger.warning("OpenAI call failed, returning fallback playlist data.")
+def fallback_playlist_data(reason="OpenAI call failed"):
+    """Provide a fallback playlist structure in case the API call fails or the recommender has too few tracks"""
+    logger.warning(f"{reason}, returning fallback playlist data.")
     return {
-        "playlist_name": "Default Fallback Playlist",
+        "playlist_name": FALLBACK_PLAYLIST_NAME,
         "tracks": [
             {"id": 1, "title": "Happy", "artist": "Pharrell Williams", "duration": "3:53"},
             {"id": 2, "title": "Good Feeling", "artist": "Flo Rida", "duration": "4:08"},
@@ -367,18 +420,85 @@ class PasswordResetConfirmView(generics.GenericAPIView):
         serializer.save() 
         return Response({"detail": "Password has been reset successfully."}, status=status.HTTP_200_OK)
 
-class PlaylistHistoryView(generics.ListAPIView):
+class SparseFieldsetListMixin:
+    """
+    ?fields=a,b limits the top-level fields and ?expand=rel,rel.child embeds nested relations.
+    Without ?expand= the list uses the compact summary representation (no nested relations).
+    """
+
+    def get_fieldset(self):
+        params = self.request.query_params
+        fields = [name for name in params.get('fields', '').split(',') if name] or None
+        expand = [name for name in params.get('expand', '').split(',') if name]
+        return fields, expand
+
+    def plan_queryset(self, queryset):
+        fields, expand = self.get_fieldset()
+        return self.get_serializer_class().plan_queryset(queryset, fields=fields, expand=expand)
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_fieldset()
+        return super().get_serializer(*args, fields=fields, expand=expand, **kwargs)
+
+# Views that only read the user's own rows by id authenticate with JWTStatelessUserAuthentication:
+# request.user is a TokenUser built from the signed claims, with no user query. A deactivated user keeps
+# read access to their own data until the access token expires.
+class ReplicaReadMixin:
+    """Runs the list's queries on a read replica unless the user wrote recently; see backend/routers.py."""
+
+    def list(self, request, *args, **kwargs):
+        with routers.replica_reads(request.user.id):
+            return super().list(request, *args, **kwargs)
+
+class PlaylistHistoryView(ReplicaReadMixin, SparseFieldsetListMixin, generics.ListAPIView):
     serializer_class = PlaylistSerializer
+    authentication_classes = [JWTStatelessUserAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return Playlist.objects.filter(mood__user=user).order_by('-created_at')
+        return self.plan_queryset(Playlist.objects.filter(mood__user_id=self.request.user.id).order_by('-created_at'))
 
-def call_openai_for_replacement(prompt):
+class SearchResultsPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class PlaylistSearchView(generics.ListAPIView):
+    """Ranked search over the user's own tracks by title, artist, album and playlist name (?q=)."""
+    serializer_class = TrackSearchResultSerializer
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SearchResultsPagination
+
+    def get_queryset(self):
+        terms = re.findall(r'\w+', self.request.query_params.get('q', ''))
+        tracks = Track.objects.filter(playlist__mood__user_id=self.request.user.id).select_related('playlist')
+        if not terms:
+            return tracks.none()
+
+        if connection.vendor == 'postgresql':
+            # Prefix match on every term, served by the GIN index on Track.search_vector.
+            query = SearchQuery(' & '.join(f"{term}:*" for term in terms), config='simple', search_type='raw')
+            return (
+                tracks.filter(search_vector=query)
+                .annotate(rank=SearchRank(F('search_vector'), query))
+                .order_by('-rank', '-playlist__created_at', 'order_key')
+            )
+
+        for term in terms:
+            tracks = tracks.filter(
+                Q(title__icontains=term) | Q(artist__icontains=term) |
+                Q(album__icontains=term) | Q(playlist__name__icontains=term)
+            )
+        return tracks.order_by('-playlist__created_at', 'order_key')
+
+def call_openai_for_replacement(prompt, user=None):
     """Calls OpenAI specifically for replacing one track, expecting a single track JSON object."""
     try:
-        response = client.chat.completions.create(
+        response = llm.chat_completion(
+            'track_replacement',
+            deadline=llm.Deadline(settings.OPENAI_REQUEST_BUDGET_SECONDS),
+            user=user,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are an assistant that suggests a single replacement song based on feedback and playlist context. Output ONLY the JSON for the single song with keys 'title', 'artist', 'duration'."}, 
@@ -395,10 +515,123 @@ def call_openai_for_replacement(prompt):
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Failed to parse replacement track JSON: {response_text}. Error: {str(e)}")
             return None 
+    except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+        logger.warning(f"Skipping OpenAI replacement call: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Error calling OpenAI API for replacement: {str(e)}", exc_info=True)
         return None
 
+def call_openai_for_alternates(prompt, user=None):
+    """Calls OpenAI for a list of replacement candidates; returns the parsed track dicts or []."""
+    try:
+        response = llm.chat_completion(
+            'track_alternates',
+            user=user,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are an assistant that suggests alternative songs for a playlist in JSON format."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"}
+        )
+        response_text = response.choices[0].message.content
+        try:
+            tracks = json.loads(response_text).get('tracks')
+            if not isinstance(tracks, list):
+                raise ValueError("'tracks' key is missing or not a list.")
+            return [track for track in tracks if isinstance(track, dict) and track.get('title') and track.get('artist')]
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            logger.error(f"Failed to parse alternates JSON: {response_text}. Error: {str(e)}")
+            return []
+    except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+        logger.warning(f"Skipping OpenAI alternates call: {str(e)}")
+        return []
+    except Exception as e:
+        logger.error(f"Error calling OpenAI API for alternates: {str(e)}", exc_info=True)
+        return []
+
+def _playlist_genre_and_market(playlist, current_genre):
+    """
+    The favorite genre and Spotify market the playlist was generated with, from its prompt params; the
+    market may have come from GeoIP. Local-mode playlists store none, so the current genre and its market stand in.
+    """
+    params = playlist.prompt_params
+    if params is None:
+        return current_genre, pool.genre_market(current_genre)
+    return params.get('favorite_genre') or current_genre, params.get('market_code') or None
+
+def generate_playlist_alternates(playlist_pk):
+    """
+    Background task run after a playlist is created: asks for a spread of calmer and more energetic
+    songs in the same context, keeps the ones that verify on Spotify and stores them compactly on
+    the playlist for replace_track_view. Uses the catalog recommender in local mode or when OpenAI fails.
+    """
+    playlist = Playlist.objects.select_related('mood__user', 'mood__user__userpreference').filter(pk=playlist_pk).first()
+    if playlist is None:
+        return
+    mood = playlist.mood
+    genre, market_code = _playlist_genre_and_market(
+        playlist, getattr(getattr(mood.user, 'userpreference', None), 'favorite_genre', None) or "Pop",
+    )
+    count = settings.PLAYLIST_ALTERNATES['COUNT']
+    tracks = list(playlist.tracks.all())
+    playlist_uris = {t.spotify_uri for t in tracks if t.spotify_uri}
+
+    entries = []
+    if settings.PLAYLIST_GENERATION_MODE != 'local':
+        playlist_songs = "\n".join(f"- {t.title} by {t.artist}" for t in tracks)
+        prompt = (
+            f"Context: A playlist was generated for a user feeling '{mood.mood_text}' (mood category {mood.category}) "
+            f"with an energy level of {mood.energy_level}/10. The preferred genre is '{genre}'. It is {mood.season}.\n"
+            f"Songs already in the playlist:\n{playlist_songs}\n\n"
+            f"Task: Suggest exactly {count} songs in the '{genre}' genre, not already in the playlist, that could replace any of them while keeping the vibe. "
+            f"Spread their energy: some calmer and some more energetic than {mood.energy_level}/10. "
+            f"Prefer well-known tracks that are available on major streaming platforms. "
+            f"Return ONLY a JSON object with a key 'tracks': an array of objects with 'title', 'artist', 'duration' "
+            f"and 'energy' (1-10) fields."
+        )
+        catalog_writes = catalog.CatalogWrites()
+        for suggestion in call_openai_for_alternates(prompt, user=mood.user):
+            details = _resolve_track_details(suggestion['title'], suggestion['artist'], market_code, catalog_writes)
+            if not details or details['spotify_uri'] in playlist_uris:
+                continue
+            try:
+                energy = min(max(int(suggestion.get('energy')), 1), 10)
+            except (TypeError, ValueError):
+                energy = None
+            entries.append(alternates.encode(details, energy))
+            playlist_uris.add(details['spotify_uri'])
+        catalog_writes.flush()
+
+    if not entries:
+        for details in recommender.recommend(mood.category, mood.energy_level, mood.season, genre, count, exclude_uris=playlist_uris, market_code=market_code):
+            entries.append(alternates.encode(details))
+
+    Playlist.objects.filter(pk=playlist_pk).update(alternates=entries)
+    logger.info(f"Stored {len(entries)} alternates for playlist {playlist_pk}.")
+
+def _take_alternates(playlist_pk, mood, wanted, playlist_uris):
+    """
+    Pops the best-fitting stored alternate for each (key, rating, feedback) in `wanted`, skipping
+    `playlist_uris` and each other's picks. Returns {key: track dict} for the ones that got one.
+    """
+    taken = {}
+    exclude_uris = set(playlist_uris)
+    with transaction.atomic():
+        locked = Playlist.objects.select_for_update().only('id', 'alternates').get(pk=playlist_pk)
+        for key, rating, feedback in wanted:
+            target = alternates.target_energy(mood.energy_level, rating, feedback)
+            index = alternates.pick(locked.alternates, mood.energy_level, target, exclude_uris=exclude_uris)
+            if index is None:
+                continue
+            taken[key] = alternates.decode(locked.alternates)[index]._asdict()
+            exclude_uris.add(taken[key]['spotify_uri'])
+            del locked.alternates[index]
+        if taken:
+            locked.save(update_fields=['alternates'])
+    return taken
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def replace_track_view(request, playlist_pk, track_pk):
@@ -422,51 +655,241 @@ def replace_track_view(request, playlist_pk, track_pk):
     except ValueError as e:
          return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    catalog.record_rating(track_to_replace.spotify_uri, rating)
+
     mood = playlist.mood
     try:
         user_pref = UserPreference.objects.get(user=request.user)
         genre = user_pref.favorite_genre
     except UserPreference.DoesNotExist:
         genre = "Unknown" 
+    genre, market_code = _playlist_genre_and_market(playlist, genre)
+
+    other_tracks = list(playlist.tracks.exclude(pk=track_pk))
+    feedback = alternates.parse_feedback(comment)
+
+    replacement = None
+    if not feedback.specific:
+        playlist_uris = {t.spotify_uri for t in other_tracks if t.spotify_uri} | {track_to_replace.spotify_uri}
+        replacement = _take_alternates(playlist.pk, mood, [(track_pk, rating, feedback)], playlist_uris).get(track_pk)
+        if replacement:
+            logger.info(f"Replacing '{track_to_replace.title}' in playlist {playlist.pk} with pre-verified alternate '{replacement['title']}'.")
+
+    if replacement is None:
+        other_tracks_formatted = "\n".join([f"- {t.title} by {t.artist}" for t in other_tracks])
+        if not other_tracks_formatted:
+            other_tracks_formatted = "(This is the only song)"
+
+        prompt = (
+            f"Context: A playlist was generated for a user feeling '{mood.mood_text}' "
+            f"with an energy level of {mood.energy_level}/10. The preferred genre is '{genre}'. "
+            f"It was {mood.season} during the {datetime.fromtimestamp(mood.timestamp.timestamp()).strftime('%H:%M')} when generated.\n"
+            f"Current playlist songs (excluding the one being replaced):\n{other_tracks_formatted}\n\n"
+            f"Feedback on Song: '{track_to_replace.title}' by '{track_to_replace.artist}'\n"
+            f"- User Rating: {rating}/5\n"
+            f"- User Comment: {comment}\n\n"
+            f"Task: Suggest ONE replacement song (title, artist, duration) that fits the original mood/energy context "
+            f"AND addresses the user's feedback. **Crucially, the replacement song MUST strictly be in the '{genre}' genre.** "
+            f"The replacement should maintain the overall vibe while respecting the genre constraint. "
+            f"Return ONLY the JSON object for the single replacement song with keys 'title', 'artist', 'duration'."
+        )
 
-    other_tracks = playlist.tracks.exclude(pk=track_pk)
-    other_tracks_formatted = "\n".join([f"- {t.title} by {t.artist}" for t in other_tracks])
-    if not other_tracks_formatted:
-        other_tracks_formatted = "(This is the only song)"
-
-    prompt = (
-        f"Context: A playlist was generated for a user feeling '{mood.mood_text}' "
-        f"with an energy level of {mood.energy_level}/10. The preferred genre is '{genre}'. "
-        f"It was {mood.season} during the {datetime.fromtimestamp(mood.timestamp.timestamp()).strftime('%H:%M')} when generated.\n"
-        f"Current playlist songs (excluding the one being replaced):\n{other_tracks_formatted}\n\n"
-        f"Feedback on Song: '{track_to_replace.title}' by '{track_to_replace.artist}'\n"
-        f"- User Rating: {rating}/5\n"
-        f"- User Comment: {comment}\n\n"
-        f"Task: Suggest ONE replacement song (title, artist, duration) that fits the original mood/energy context "
-        f"AND addresses the user's feedback. **Crucially, the replacement song MUST strictly be in the '{genre}' genre.** "
-        f"The replacement should maintain the overall vibe while respecting the genre constraint. "
-        f"Return ONLY the JSON object for the single replacement song with keys 'title', 'artist', 'duration'."
-    )
+        logger.debug("--- Replacement Prompt ---")
+        logger.debug(prompt)
+        logger.debug("--------------------------")
 
-    logger.debug("--- Replacement Prompt ---")
-    logger.debug(prompt)
-    logger.debug("--------------------------")
+        new_track_data = call_openai_for_replacement(prompt, user=request.user)
 
-    new_track_data = call_openai_for_replacement(prompt)
+        if not new_track_data:
+            return Response({"detail": "Failed to generate replacement song from AI."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    if not new_track_data:
-        return Response({"detail": "Failed to generate replacement song from AI."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        replacement = {
+            'title': new_track_data.get('title', 'Unknown Title'),
+            'artist': new_track_data.get('artist', 'Unknown Artist'),
+            'album': None,
+            'duration': new_track_data.get('duration', ''),
+            'spotify_uri': None,
+        }
+        spotify_track_details = _resolve_track_details(replacement['title'], replacement['artist'], market_code)
+        if spotify_track_details:
+            replacement.update({key: spotify_track_details[key] for key in ('title', 'artist', 'album', 'duration', 'spotify_uri')})
 
-    track_to_replace.title = new_track_data.get('title', 'Unknown Title')
-    track_to_replace.artist = new_track_data.get('artist', 'Unknown Artist')
-    track_to_replace.duration = new_track_data.get('duration', '')
-    track_to_replace.save()
+    track_to_replace.title = replacement['title']
+    track_to_replace.artist = replacement['artist']
+    track_to_replace.album = replacement['album']
+    track_to_replace.duration = replacement['duration']
+    track_to_replace.spotify_uri = replacement['spotify_uri']
+    with timing.span('db_track_write', upstream='db'):
+        track_to_replace.save()
+        playlist_edits.bump_version(playlist.pk)
 
     serializer = TrackSerializer(track_to_replace)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+def call_openai_for_batch_replacement(prompt, user=None):
+    """Calls OpenAI for several replacements at once; returns {track_id: track dict} for the valid entries."""
+    try:
+        response = llm.chat_completion(
+            'track_replacement_batch',
+            deadline=llm.Deadline(settings.OPENAI_REQUEST_BUDGET_SECONDS),
+            user=user,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are an assistant that suggests replacement songs based on feedback and playlist context. Output ONLY JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"}
+        )
+        response_text = response.choices[0].message.content
+        try:
+            entries = json.loads(response_text).get('replacements')
+            if not isinstance(entries, list):
+                raise ValueError("'replacements' key is missing or not a list.")
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            logger.error(f"Failed to parse batch replacement JSON: {response_text}. Error: {str(e)}")
+            return {}
+    except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+        logger.warning(f"Skipping OpenAI batch replacement call: {str(e)}")
+        return {}
+    except Exception as e:
+        logger.error(f"Error calling OpenAI API for batch replacement: {str(e)}", exc_info=True)
+        return {}
+
+    suggestions = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('title') or not entry.get('artist'):
+            continue
+        try:
+            suggestions.setdefault(int(entry.get('track_id')), entry)
+        except (TypeError, ValueError):
+            continue
+    return suggestions
+
+def _resolve_concurrently(suggestions, market_code=None):
+    """Resolves a list of {title, artist} dicts on a few threads; returns their details (or None) in order."""
+    def resolve(suggestion):
+        try:
+            return _resolve_track_details(suggestion['title'], suggestion['artist'], market_code, catalog_writes)
+        finally:
+            connections.close_all()
+
+    if not suggestions:
+        return []
+    catalog_writes = catalog.CatalogWrites()
+    with ThreadPoolExecutor(max_workers=min(len(suggestions), settings.TRACK_RESOLVE_CONCURRENCY)) as executor:
+        # Each task runs in a copy of this request's context so its spans reach the request's recorder.
+        futures = [executor.submit(contextvars.copy_context().run, resolve, suggestion) for suggestion in suggestions]
+        resolved = [future.result() for future in futures]
+    with timing.span('catalog_write', upstream='db'):
+        catalog_writes.flush()
+    return resolved
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def replace_tracks_view(request, playlist_pk):
+    """
+    Replaces several tracks in one request. Feedback that the stored alternates can answer uses
+    them; the rest is sent to OpenAI in a single call, verified concurrently and saved with one
+    bulk_update. Tracks that could not be replaced are listed in `failed`.
+    """
+    playlist = get_object_or_404(Playlist.objects.select_related('mood'), pk=playlist_pk, mood__user=request.user)
+    serializer = BatchReplaceSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    entries = serializer.validated_data['replacements']
+
+    tracks = {track.pk: track for track in playlist.tracks.all()}
+    missing = [entry['track_id'] for entry in entries if entry['track_id'] not in tracks]
+    if missing:
+        return Response({"detail": f"Tracks not found in this playlist: {missing}."}, status=status.HTTP_404_NOT_FOUND)
+
+    for entry in entries:
+        catalog.record_rating(tracks[entry['track_id']].spotify_uri, entry['rating'])
+
+    mood = playlist.mood
+    user_pref = UserPreference.objects.filter(user=request.user).first()
+    genre, market_code = _playlist_genre_and_market(playlist, user_pref.favorite_genre if user_pref else "Unknown")
+    playlist_uris = {track.spotify_uri for track in tracks.values() if track.spotify_uri}
+
+    feedback = {entry['track_id']: alternates.parse_feedback(entry['comment']) for entry in entries}
+    replacements = _take_alternates(
+        playlist.pk, mood,
+        [(entry['track_id'], entry['rating'], feedback[entry['track_id']]) for entry in entries if not feedback[entry['track_id']].specific],
+        playlist_uris,
+    )
+    playlist_uris |= {replacement['spotify_uri'] for replacement in replacements.values()}
+
+    remaining = [entry for entry in entries if entry['track_id'] not in replacements]
+    if remaining:
+        replaced_ids = {entry['track_id'] for entry in remaining}
+        kept_tracks = "\n".join(f"- {t.title} by {t.artist}" for t in tracks.values() if t.pk not in replaced_ids) or "(none)"
+        feedback_lines = "\n".join(
+            f"- track_id {entry['track_id']}: '{tracks[entry['track_id']].title}' by '{tracks[entry['track_id']].artist}', "
+            f"rating {entry['rating']}/5, comment: {entry['comment'] or '(none)'}"
+            for entry in remaining
+        )
+        prompt = (
+            f"Context: A playlist was generated for a user feeling '{mood.mood_text}' "
+            f"with an energy level of {mood.energy_level}/10. The preferred genre is '{genre}'. "
+            f"It was {mood.season} during the {datetime.fromtimestamp(mood.timestamp.timestamp()).strftime('%H:%M')} when generated.\n"
+            f"Songs staying in the playlist:\n{kept_tracks}\n\n"
+            f"Feedback on the songs to replace:\n{feedback_lines}\n\n"
+            f"Task: Suggest ONE replacement song for each track_id that fits the original mood/energy context "
+            f"AND addresses its feedback. **Crucially, every replacement MUST strictly be in the '{genre}' genre.** "
+            f"All replacements must be different songs, and none may already be in the playlist. "
+            f"Return ONLY a JSON object with a key 'replacements': an array of objects with 'track_id', 'title', 'artist' and 'duration'."
+        )
+        suggestions = call_openai_for_batch_replacement(prompt, user=request.user)
+        suggested = [(entry['track_id'], suggestions[entry['track_id']]) for entry in remaining if entry['track_id'] in suggestions]
+        resolved = _resolve_concurrently([suggestion for _, suggestion in suggested], market_code)
+
+        seen = {(t.title.lower(), t.artist.lower()) for t in tracks.values() if t.pk not in replaced_ids}
+        for (track_id, suggestion), details in zip(suggested, resolved):
+            replacement = {
+                'title': suggestion['title'],
+                'artist': suggestion['artist'],
+                'album': None,
+                'duration': suggestion.get('duration', ''),
+                'spotify_uri': None,
+            }
+            if details:
+                replacement.update({key: details[key] for key in ('title', 'artist', 'album', 'duration', 'spotify_uri')})
+            # The LLM is asked for distinct songs, but check: two suggestions can also resolve to the same track.
+            song = (replacement['title'].lower(), replacement['artist'].lower())
+            if song in seen or (replacement['spotify_uri'] and replacement['spotify_uri'] in playlist_uris):
+                logger.warning(f"Dropping duplicate replacement '{replacement['title']}' for track {track_id}.")
+                continue
+            seen.add(song)
+            if replacement['spotify_uri']:
+                playlist_uris.add(replacement['spotify_uri'])
+            replacements[track_id] = replacement
+
+    updated = []
+    for entry in entries:
+        replacement = replacements.get(entry['track_id'])
+        if replacement is None:
+            continue
+        track = tracks[entry['track_id']]
+        track.title = replacement['title']
+        track.artist = replacement['artist']
+        track.album = replacement['album']
+        track.duration = replacement['duration']
+        track.spotify_uri = replacement['spotify_uri']
+        updated.append(track)
+    with timing.span('db_track_write', upstream='db'):
+        Track.objects.bulk_update(updated, ['title', 'artist', 'album', 'duration', 'spotify_uri'])
+        if updated:
+            playlist_edits.bump_version(playlist.pk)
+
+    failed = [entry['track_id'] for entry in entries if entry['track_id'] not in replacements]
+    if not updated:
+        return Response({"detail": "Failed to generate replacement songs.", "failed": failed}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({"tracks": TrackSerializer(updated, many=True).data, "failed": failed}, status=status.HTTP_200_OK)
+
+# Account views always load a fresh user row rather than the cached one.
 class UserProfileView(generics.RetrieveAPIView):
     serializer_class = UserProfileSerializer
+    authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -474,6 +897,7 @@ class UserProfileView(generics.RetrieveAPIView):
 
 class ChangePasswordView(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
+    authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -492,15 +916,105 @@ class ChangePasswordView(generics.UpdateAPIView):
 class SpecializedPlaylistListView(generics.ListAPIView):
     queryset = SpecializedPlaylist.objects.all()
     serializer_class = SpecializedPlaylistSerializer
+    authentication_classes = [JWTStatelessUserAuthentication]
     permission_classes = [permissions.IsAuthenticated] 
 
-class MoodHistoryView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        # Same for every user and only changes when the daily job refreshes it; signals clear the entry on writes.
+        data = cache.get(caching.SPECIALIZED_PLAYLISTS_KEY)
+        if data is None:
+            # Only the daily job writes these, so there is nothing for the user to read back.
+            with routers.replica_reads():
+                data = self.get_serializer(self.get_queryset(), many=True).data
+            cache.set(caching.SPECIALIZED_PLAYLISTS_KEY, data, settings.CACHE_TTLS['SPECIALIZED_PLAYLISTS'])
+        return Response(data)
+
+class MoodHistoryView(ReplicaReadMixin, SparseFieldsetListMixin, generics.ListAPIView):
     serializer_class = MoodSerializer
+    authentication_classes = [JWTStatelessUserAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return MoodModel.objects.filter(user=user).order_by('-timestamp')
+        return self.plan_queryset(MoodModel.objects.filter(user_id=self.request.user.id).order_by('-timestamp'))
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def mood_history_archive(request):
+    """The months of the user's history that `archive_history` moved to cold storage, newest first."""
+    with routers.replica_reads(request.user.id):
+        months = list(
+            ArchivedHistoryMonth.objects.filter(user_id=request.user.id).order_by('-month')
+            .values('month', 'mood_count', 'playlist_count', 'track_count')
+        )
+    for month in months:
+        month['month'] = f"{month['month']:%Y-%m}"
+    return Response(months, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def mood_history_archive_month(request, year, month):
+    """One archived month of the user's moods, newest first, with playlists and tracks expanded."""
+    try:
+        first_day = datetime(year, month, 1).date()
+    except ValueError:
+        return Response({"detail": "Invalid year or month."}, status=status.HTTP_400_BAD_REQUEST)
+    with routers.replica_reads(request.user.id):
+        record = ArchivedHistoryMonth.objects.filter(user_id=request.user.id, month=first_day).first()
+    if record is None:
+        return Response({"detail": "No archived history for this month."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(archive.expand(record), status=status.HTTP_200_OK)
+
+class DataExportThrottle(UserRateThrottle):
+    scope = 'data_export'
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UserRateThrottle, DataExportThrottle])
+def export_history(request):
+    """
+    Streams the user's whole history, archived months included, oldest first: NDJSON with one mood
+    (playlists and tracks nested) per line, or CSV with one row per track. Rows are read with a
+    server-side cursor, so memory use doesn't grow with the history.
+    """
+    query = HistoryExportQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    output = query.validated_data['output']
+    rows = export.history_rows(
+        request.user.id,
+        date_from=query.validated_data.get('date_from'),
+        date_to=query.validated_data.get('date_to'),
+        using=routers.replica_for(request.user.id) or 'default',
+    )
+    if output == 'csv':
+        response = StreamingHttpResponse(export.csv_lines(rows), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(export.ndjson_lines(rows), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="mood_history_{timezone.now():%Y-%m-%d}.{output}"'
+    # Lets a buffering reverse proxy (nginx) pass the first rows on right away.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def mood_analytics(request):
+    query = MoodAnalyticsQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    with routers.replica_reads(request.user.id):
+        report = analytics.mood_report(
+            request.user.id,
+            query.validated_data['period'],
+            date_from=query.validated_data.get('date_from'),
+            date_to=query.validated_data.get('date_to'),
+        )
+    return Response(report, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -524,7 +1038,10 @@ def get_emotion_recommendation(request):
 
     try:
         system_message = "You are an assistant that provides general well-being advice for emotions. Output ONLY a JSON object with the key 'advice_list' containing an array of advice strings."
-        response = client.chat.completions.create(
+        response = llm.chat_completion(
+            'emotion_advice',
+            deadline=llm.Deadline(settings.OPENAI_REQUEST_BUDGET_SECONDS),
+            user=user,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_message},
@@ -542,6 +1059,11 @@ def get_emotion_recommendation(request):
 
         return Response(advice_data, status=status.HTTP_200_OK)
 
+    except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+        logger.warning(f"Skipping OpenAI emotion recommendation: {str(e)}")
+        return Response({
+            'error': "Recommendations are temporarily unavailable. Please try again later."
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         logger.error(f"Error getting emotion recommendation for '{text_for_recommendation}' for user {user.username}: {str(e)}", exc_info=True)
         return Response({
@@ -556,6 +1078,7 @@ def remove_track_from_playlist(request, playlist_pk, track_pk):
     
     track_title = track.title 
     track.delete()
+    playlist_edits.bump_version(playlist.pk)
             
     return Response({"message": f"Track '{track_title}' removed successfully."}, status=status.HTTP_204_NO_CONTENT)
 
@@ -567,6 +1090,7 @@ def add_track_to_playlist(request, playlist_pk):
     serializer = AddTrackSerializer(data=request.data, context={'request': request, 'playlist_pk': playlist_pk})
     if serializer.is_valid():
         new_track = serializer.save() 
+        playlist_edits.bump_version(playlist.pk)
         track_data = TrackSerializer(new_track).data 
         return Response(track_data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -579,10 +1103,26 @@ def reorder_playlist_tracks(request, playlist_pk):
     serializer = TrackOrderSerializer(data=request.data, context={'request': request, 'playlist_pk': playlist_pk})
     if serializer.is_valid():
         serializer.save() 
+        playlist_edits.bump_version(playlist.pk)
+        playlist.refresh_from_db(fields=['version'])
         updated_playlist_data = PlaylistSerializer(playlist).data
         return Response(updated_playlist_data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _spotify_client(client_id, client_secret):
+    """spotipy client, pointed at SPOTIFY_API_URL / SPOTIFY_TOKEN_URL when those are set."""
+    # The token lives in the shared cache, keyed by token URL so simulator tokens never reach the real API.
+    client_credentials_manager = SpotifyClientCredentials(
+        client_id=client_id, client_secret=client_secret,
+        cache_handler=caching.SpotifyTokenCacheHandler(client_id, settings.SPOTIFY_TOKEN_URL or SpotifyClientCredentials.OAUTH_TOKEN_URL),
+    )
+    if settings.SPOTIFY_TOKEN_URL:
+        client_credentials_manager.OAUTH_TOKEN_URL = settings.SPOTIFY_TOKEN_URL
+    sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+    if settings.SPOTIFY_API_URL:
+        sp.prefix = settings.SPOTIFY_API_URL
+    return sp
+
 def _search_spotify_for_track_details(title: str, artist: str, market_code: str | None = None):
     client_id = os.environ.get('SPOTIPY_CLIENT_ID')
     client_secret = os.environ.get('SPOTIPY_CLIENT_SECRET')
@@ -590,14 +1130,17 @@ def _search_spotify_for_track_details(title: str, artist: str, market_code: str
     if not client_id or not client_secret:
         logger.error("Spotify API credentials (SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET) not found in environment variables.")
         return None
+    if caching.is_known_spotify_miss(title, artist, market_code):
+        logger.info(f"Spotify search skipped: title='{title}', artist='{artist}' had no results recently with market '{market_code}'")
+        return None
 
     try:
-        client_credentials_manager = SpotifyClientCredentials(client_id=client_id, client_secret=client_secret)
-        sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        sp = _spotify_client(client_id, client_secret)
 
         query = f"track:{title} artist:{artist}"
         logger.info(f"Searching Spotify with query: '{query}', market: '{market_code if market_code else 'None (default behavior)'}'")
-        results = sp.search(q=query, type='track', limit=1, market=market_code)
+        with timing.span('spotify_search', upstream='spotify'):
+            results = sp.search(q=query, type='track', limit=1, market=market_code)
 
         if results and results['tracks']['items']:
             track_item = results['tracks']['items'][0]
@@ -619,7 +1162,8 @@ def _search_spotify_for_track_details(title: str, artist: str, market_code: str
         else:
             logger.warning(f"Spotify search: No results found for title='{title}', artist='{artist}' with market '{market_code}'")
             logger.info(f"Attempting Spotify search with title only: '{title}' with market '{market_code}'")
-            results_title_only = sp.search(q=f"track:{title}", type='track', limit=5, market=market_code)
+            with timing.span('spotify_search', upstream='spotify'):
+                results_title_only = sp.search(q=f"track:{title}", type='track', limit=5, market=market_code)
             if results_title_only and results_title_only['tracks']['items']:
                 for item in results_title_only['tracks']['items']:
                     spotify_artists = [a['name'].lower() for a in item['artists']]
@@ -640,6 +1184,7 @@ def _search_spotify_for_track_details(title: str, artist: str, market_code: str
                             "spotify_uri": track_item.get('uri')
                         }
             logger.warning(f"Spotify search (title only fallback): Still no results for title='{title}' with market '{market_code}'")
+            caching.remember_spotify_miss(title, artist, market_code)
             return None
     except spotipy.SpotifyException as se:
         logger.error(f"Spotify API error for title='{title}', artist='{artist}', market='{market_code}': {str(se)}. Status: {se.http_status}, Reason: {se.msg}")
@@ -648,6 +1193,28 @@ def _search_spotify_for_track_details(title: str, artist: str, market_code: str
         logger.error(f"General Spotify search error for title='{title}', artist='{artist}': {str(e)}", exc_info=True)
         return None
 
+def _resolve_track_details(title: str, artist: str, market_code: str | None = None, catalog_writes=None):
+    """
+    Resolves a song from the local catalog of verified tracks, searching Spotify only when no confident match exists.
+    With `catalog_writes` (a catalog.CatalogWrites) the catalog updates wait for its flush() instead of running per song.
+    """
+    with timing.span('catalog_lookup', upstream='db'):
+        catalog_match = catalog.resolve(title, artist, market_code, catalog_writes)
+    if catalog_match:
+        TRACK_RESOLUTIONS.labels(source='catalog').inc()
+        return catalog_match
+
+    spotify_track_details = _search_spotify_for_track_details(title, artist, market_code)
+    if spotify_track_details:
+        TRACK_RESOLUTIONS.labels(source='spotify').inc()
+        if catalog_writes is None:
+            catalog.record_verified_track(spotify_track_details, market_code)
+        else:
+            catalog_writes.add_verified(spotify_track_details, market_code)
+    else:
+        TRACK_RESOLUTIONS.labels(source='unresolved').inc()
+    return spotify_track_details
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def find_and_add_spotify_track(request, playlist_pk):
@@ -658,41 +1225,79 @@ def find_and_add_spotify_track(request, playlist_pk):
         
         playlist = get_object_or_404(Playlist, pk=playlist_pk, mood__user=request.user)
 
-        spotify_track_details = _search_spotify_for_track_details(title, artist)
+        spotify_track_details = _resolve_track_details(title, artist)
 
         if spotify_track_details:
             duration_ms = spotify_track_details.get('duration_ms', 0)
             duration_seconds = duration_ms // 1000
             duration_formatted = f"{duration_seconds // 60:02d}:{duration_seconds % 60:02d}"
 
-            last_track = Track.objects.filter(playlist=playlist).order_by('-order_in_playlist').first()
-            next_order = (last_track.order_in_playlist + 1) if last_track else 0
-
-            new_track = Track.objects.create(
-                playlist=playlist,
-                title=spotify_track_details['title'],
-                artist=spotify_track_details['artist'],
-                album=spotify_track_details.get('album', 'N/A'),
-                duration=duration_formatted, 
-                spotify_uri=spotify_track_details.get('spotify_uri'),
-                order_in_playlist=next_order
-            )
+            with timing.span('db_track_write', upstream='db'):
+                new_track = Track.objects.create(
+                    playlist=playlist,
+                    title=spotify_track_details['title'],
+                    artist=spotify_track_details['artist'],
+                    album=spotify_track_details.get('album', 'N/A'),
+                    duration=duration_formatted, 
+                    spotify_uri=spotify_track_details.get('spotify_uri'),
+                    order_key=ordering.key_after_last(playlist.pk)
+                )
+                playlist_edits.bump_version(playlist.pk)
+            ordering.rebalance_if_long(playlist.pk, [new_track.order_key])
             return Response(TrackSerializer(new_track).data, status=status.HTTP_201_CREATED)
         else:
             return Response({'error': 'Track not found on Spotify or error in search.'}, status=status.HTTP_404_NOT_FOUND)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['PATCH'])
+@permission_classes([permissions.IsAuthenticated])
+def edit_playlist_tracks(request, playlist_pk):
+    """
+    Applies an ordered batch of add, remove, move and replace operations in one transaction (see
+    playlist_edits.apply_operations) and returns only the changed tracks with the new playlist version.
+    Songs marked `resolve` are looked up before the transaction, so no lock is held during searches.
+    """
+    serializer = PlaylistEditSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    operations = serializer.validated_data['operations']
+
+    to_resolve = [(index, operation) for index, operation in enumerate(operations) if operation['resolve']]
+    if to_resolve:
+        if not Playlist.objects.filter(pk=playlist_pk, mood__user=request.user).exists():
+            return Response({"detail": "Playlist not found or access denied."}, status=status.HTTP_404_NOT_FOUND)
+        resolved = _resolve_concurrently([operation for _, operation in to_resolve])
+        for (index, operation), details in zip(to_resolve, resolved):
+            if not details:
+                return Response(
+                    {"detail": f"'{operation['title']}' by {operation['artist']} was not found on Spotify.", "operation": index},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            operation.update({key: details[key] for key in playlist_edits.SONG_FIELDS})
+
+    try:
+        with timing.span('db_track_write', upstream='db'):
+            version, changed, removed = playlist_edits.apply_operations(
+                playlist_pk, request.user, operations, serializer.validated_data.get('version'),
+            )
+    except Playlist.DoesNotExist:
+        return Response({"detail": "Playlist not found or access denied."}, status=status.HTTP_404_NOT_FOUND)
+    except playlist_edits.PlaylistVersionConflict as e:
+        return Response({"detail": "The playlist was changed by another request.", "version": e.version}, status=status.HTTP_409_CONFLICT)
+    except playlist_edits.PlaylistEditError as e:
+        return Response({"detail": e.message, "operation": e.index}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"version": version, "tracks": TrackSerializer(changed, many=True).data, "removed": removed}, status=status.HTTP_200_OK)
+
 class AnalyzeEmotionOpenAIView(APIView):
     permission_classes = [] 
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.client = OpenAI()
-        if not self.client.api_key:
+        if not llm.client.api_key:
              logger.error("OpenAI API key not found in environment variables for AnalyzeEmotionOpenAIView.")
 
     def post(self, request, *args, **kwargs):
-        if not self.client.api_key: 
+        if not llm.client.api_key: 
              return Response({"error": "OpenAI API key not configured on server for emotion analysis."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         image_data_list = request.data.get('images')
@@ -712,7 +1317,10 @@ class AnalyzeEmotionOpenAIView(APIView):
             logger.info("Sending image to OpenAI for emotion analysis...")
             model_name = "gpt-4o" 
             
-            response = self.client.chat.completions.create(
+            response = llm.chat_completion(
+                'emotion_analysis',
+                deadline=llm.Deadline(settings.OPENAI_REQUEST_BUDGET_SECONDS),
+                user=request.user,
                 model=model_name,
                 messages=[
                     {
@@ -742,6 +1350,30 @@ class AnalyzeEmotionOpenAIView(APIView):
                 logger.error("OpenAI response was empty or malformed.") 
                 return Response({"error": "Failed to get analysis from OpenAI."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        except (llm.CircuitOpenError, llm.DeadlineExceeded) as e:
+            logger.warning(f"Skipping OpenAI emotion analysis: {str(e)}")
+            return Response({"error": "Emotion analysis is temporarily unavailable. Please try again later."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
             logger.exception(f"Error during OpenAI API call in AnalyzeEmotionOpenAIView: {str(e)}") 
-            return Response({"error": f"An error occurred during OpenAI analysis: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": f"An error occurred during OpenAI analysis: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _metrics_allowed(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if settings.METRICS_TOKEN and hmac.compare_digest(authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+def metrics_view(request):
+    """Prometheus metrics, including per-model LLM usage; only for METRICS_TOKEN or METRICS_ALLOWED_NETWORKS."""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Each gunicorn worker writes its samples to PROMETHEUS_MULTIPROC_DIR; aggregate all of them.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
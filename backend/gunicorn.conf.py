@@ -3,7 +3,8 @@ import os
 
 bind = "0.0.0.0:8000"
 backlog = 2048
-workers = multiprocessing.cpu_count() + 1
+# Keep in sync with GUNICORN_WORKERS in settings.py, which sizes database connections against it.
+workers = int(os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count() + 1)
 worker_class = 'sync'
 worker_connections = 1000
 timeout = 30
@@ -20,4 +21,20 @@ umask = 0
 user = None
 group = None
 tmp_upload_dir = None
-wsgi_app = "backend.wsgi:application" 
\ No newline at end of file
+wsgi_app = "backend.wsgi:application"
+
+
+# Prometheus metrics are shared between workers through files in PROMETHEUS_MULTIPROC_DIR;
+# /metrics/ aggregates them. The directory is emptied on start so stale samples don't survive restarts.
+def on_starting(server):
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
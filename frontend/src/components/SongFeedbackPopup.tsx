@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React from 'react';
 import { Button } from "@/components/ui/button";
 import { Label } from "@/components/ui/label";
 import { Textarea } from "@/components/ui/textarea";
@@ -10,92 +10,120 @@ import {
   DialogHeader,
   DialogTitle,
 } from "@/components/ui/dialog";
-import { Star } from 'lucide-react';
+import { Star, X } from 'lucide-react';
 import { cn } from "@/lib/utils";
+import { Track } from '../types';
+
+export interface SongFeedback {
+  track: Track;
+  rating: number;
+  comment: string;
+}
 
 interface SongFeedbackPopupProps {
   open: boolean;
-  trackTitle: string;
-  trackArtist: string;
-  onSubmit: (rating: number, comment: string) => void;
+  // Songs picked for replacement in one playlist; they are all replaced with one request.
+  feedback: SongFeedback[];
+  onChange: (feedback: SongFeedback[]) => void;
+  onRateAnother: () => void;
+  onSubmit: (feedback: SongFeedback[]) => void;
   onCancel: () => void;
+  isSubmitting: boolean;
 }
 
 const SongFeedbackPopup: React.FC<SongFeedbackPopupProps> = ({ 
     open, 
-    trackTitle, 
-    trackArtist, 
+    feedback, 
+    onChange, 
+    onRateAnother, 
     onSubmit, 
-    onCancel 
+    onCancel,
+    isSubmitting
 }) => {
-  const [rating, setRating] = useState<number>(0);
-  const [comment, setComment] = useState<string>("");
+  const updateEntry = (index: number, changes: Partial<SongFeedback>) => {
+    onChange(feedback.map((entry, i) => (i === index ? { ...entry, ...changes } : entry)));
+  };
 
-  useEffect(() => {
-    if (open) {
-        setRating(0);
-        setComment("");
+  const removeEntry = (index: number) => {
+    const remaining = feedback.filter((_, i) => i !== index);
+    if (remaining.length === 0) {
+        onCancel();
+        return;
     }
-  }, [open]);
-
-  const handleRating = (rateValue: number) => {
-    setRating(rateValue);
+    onChange(remaining);
   };
 
+  const allRated = feedback.length > 0 && feedback.every(entry => entry.rating > 0);
+
   const handleSubmit = () => {
-    if (rating === 0) {
+    if (!allRated || isSubmitting) {
         return; 
     }
-    onSubmit(rating, comment);
+    onSubmit(feedback);
   };
 
   return (
     <Dialog open={open} onOpenChange={(isOpen) => !isOpen && onCancel()}>
-      <DialogContent className="sm:max-w-[425px] glass-card text-card-foreground">
+      <DialogContent className="sm:max-w-[480px] glass-card text-card-foreground">
         <DialogHeader>
-          <DialogTitle>Feedback for "{trackTitle}"</DialogTitle>
+          <DialogTitle>
+            {feedback.length === 1 ? `Feedback for "${feedback[0].track.title}"` : `Feedback for ${feedback.length} songs`}
+          </DialogTitle>
           <DialogDescription className="text-card-foreground/80">
-            By {trackArtist}. Please rate the song and leave an optional comment.
+            Rate each song and leave an optional comment. Use "Rate another song" to replace several songs of this playlist at once.
           </DialogDescription>
         </DialogHeader>
         
-        <div className="grid gap-4 py-4">
-          <div className="grid grid-cols-4 items-center gap-4">
-            <Label htmlFor="rating" className="text-right">
-              Rating
-            </Label>
-            <div className="col-span-3 flex space-x-1">
-                {[1, 2, 3, 4, 5].map((starValue) => (
-                    <Star 
-                        key={starValue}
-                        className={cn(
-                            "h-6 w-6 cursor-pointer transition-colors",
-                            starValue <= rating ? "text-yellow-400 fill-yellow-400" : "text-muted-foreground hover:text-yellow-300"
-                        )}
-                        onClick={() => handleRating(starValue)}
-                    />
-                ))}
+        <div className="grid gap-6 py-4 max-h-[60vh] overflow-y-auto">
+          {feedback.map((entry, index) => (
+            <div key={entry.track.id ?? index} className="grid gap-3">
+              <div className="flex items-center justify-between">
+                <span className="font-medium truncate">{entry.track.title} <span className="text-card-foreground/70">by {entry.track.artist}</span></span>
+                {feedback.length > 1 && (
+                  <Button type="button" variant="ghost" size="icon" onClick={() => removeEntry(index)} className="cursor-pointer" aria-label={`Remove "${entry.track.title}"`}>
+                    <X size={16} />
+                  </Button>
+                )}
+              </div>
+              <div className="grid grid-cols-4 items-center gap-4">
+                <Label htmlFor={`rating-${index}`} className="text-right">
+                  Rating
+                </Label>
+                <div id={`rating-${index}`} className="col-span-3 flex space-x-1">
+                    {[1, 2, 3, 4, 5].map((starValue) => (
+                        <Star 
+                            key={starValue}
+                            className={cn(
+                                "h-6 w-6 cursor-pointer transition-colors",
+                                starValue <= entry.rating ? "text-yellow-400 fill-yellow-400" : "text-muted-foreground hover:text-yellow-300"
+                            )}
+                            onClick={() => updateEntry(index, { rating: starValue })}
+                        />
+                    ))}
+                </div>
+              </div>
+              <div className="grid grid-cols-4 items-center gap-4">
+                <Label htmlFor={`comment-${index}`} className="text-right">
+                  Comment
+                </Label>
+                <Textarea
+                  id={`comment-${index}`}
+                  placeholder="Why this rating? (e.g., doesn't fit mood, too slow...)"
+                  className="col-span-3 bg-input/50"
+                  rows={2}
+                  value={entry.comment}
+                  onChange={(e) => updateEntry(index, { comment: e.target.value })}
+                />
+              </div>
             </div>
-          </div>
-          <div className="grid grid-cols-4 items-center gap-4">
-            <Label htmlFor="comment" className="text-right">
-              Comment
-            </Label>
-            <Textarea
-              id="comment"
-              placeholder="Why this rating? (e.g., doesn't fit mood, too slow...)"
-              className="col-span-3 bg-input/50"
-              rows={3}
-              value={comment}
-              onChange={(e) => setComment(e.target.value)}
-            />
-          </div>
+          ))}
         </div>
         <DialogFooter>
-            <Button type="button" onClick={handleSubmit} disabled={rating === 0} className="cursor-pointer hover:scale-105 transition-transform border border-input">
-                Submit Feedback
+            <Button type="button" onClick={handleSubmit} disabled={!allRated || isSubmitting} className="cursor-pointer hover:scale-105 transition-transform border border-input">
+                {feedback.length === 1 ? "Replace Song" : `Replace ${feedback.length} Songs`}
             </Button>
-            <Button type="button" variant="outline" onClick={onCancel} className="cursor-pointer hover:scale-105 transition-transform">Cancel</Button>
+            <Button type="button" variant="outline" onClick={onRateAnother} disabled={isSubmitting} className="cursor-pointer hover:scale-105 transition-transform">Rate Another Song</Button>
+            <Button type="button" variant="outline" onClick={onCancel} disabled={isSubmitting} className="cursor-pointer hover:scale-105 transition-transform">Cancel</Button>
         </DialogFooter>
       </DialogContent>
     </Dialog>
@@ -66,11 +66,11 @@ const ReportActionsSection: React.FC<ReportActionsSectionProps> = ({
         }
     };
 
-    const handleExportCSV = () => {
+    const handleExportCSV = async () => {
         if (filteredMoods.length === 0 && !isLoadingHistory) {
             return;
         }
-        exportMoodsToCSV(filteredMoods, dateRange);
+        await exportMoodsToCSV(dateRange);
     }
 
     return (
@@ -47,8 +47,6 @@ const PlaylistTracksTable: React.FC<PlaylistTracksTableProps> = ({
         );
     }
 
-    const sortedTracksToDisplay = [...tracksToDisplay].sort((a, b) => a.order_in_playlist - b.order_in_playlist);
-
     return (
         <Table className="table-fixed">
             <TableHeader>
@@ -64,7 +62,7 @@ const PlaylistTracksTable: React.FC<PlaylistTracksTableProps> = ({
                 </TableRow>
             </TableHeader>
             <TableBody>
-                {sortedTracksToDisplay.map((track, trackIndex, arr) => {
+                {tracksToDisplay.map((track, trackIndex, arr) => {
                         const trackKey = String(track.id);
                         const playlistKey = String(playlist.id);
                         const previewState = trackPreviewStates[playlistKey]?.[trackKey] || { uri: null, loading: false };
@@ -1,12 +1,8 @@
 import { useState, useCallback, useEffect } from 'react';
 import { toast } from 'sonner';
-import { Playlist, Track } from '../../../types';
-import { 
-    getPlaylistHistory, 
-    removeTrackFromPlaylistAPI, 
-    findAndAddSpotifyTrackAPI,
-    reorderPlaylistTracks 
-} from '../../../services/api';
+import { Playlist, PlaylistEditResult, PlaylistOperation, Track } from '../../../types';
+import { getPlaylistHistory, editPlaylistTracks } from '../../../services/api';
+import { byOrderKey } from '../../../utils/trackOrder';
 
 export interface UsePlaylistsDataReturn {
     playlistHistory: Playlist[];
@@ -69,26 +65,48 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
         fetchHistory();
     }, [fetchHistory]);
 
+    // Sends the operations as one batch against the version we last saw and merges the changed tracks.
+    const applyPlaylistEdit = async (playlistId: string, operations: PlaylistOperation[]): Promise<PlaylistEditResult> => {
+        const version = playlistHistory.find(p => String(p.id) === playlistId)?.version;
+        const result = await editPlaylistTracks(playlistId, operations, version);
+        setPlaylistHistory(currentHistory =>
+            currentHistory.map(p => {
+                if (String(p.id) !== playlistId) {
+                    return p;
+                }
+                const changed = new Map(result.tracks.map(t => [t.id, t]));
+                const kept = p.tracks
+                    .filter(t => !result.removed.includes(t.id as number))
+                    .map(t => changed.get(t.id) ?? t);
+                const added = result.tracks.filter(t => !p.tracks.some(existing => existing.id === t.id));
+                return {
+                    ...p,
+                    version: result.version,
+                    tracks: [...kept, ...added].sort(byOrderKey),
+                };
+            })
+        );
+        return result;
+    };
+
+    // A 409 means the playlist was edited elsewhere (another tab or device): reload it rather than guess.
+    const editErrorMessage = (err: any, fallback: string): string => {
+        if (err.response?.status === 409) {
+            fetchHistory();
+            return "The playlist was changed elsewhere and has been reloaded. Please try again.";
+        }
+        return err.response?.data?.detail || err.message || fallback;
+    };
+
     const handleRemoveTrack = async (playlistId: string, trackId: string, trackTitle: string) => {
         const toastId = toast.loading(`Removing "${trackTitle}"...`);
         try {
-            await removeTrackFromPlaylistAPI(playlistId, trackId);
-            setPlaylistHistory(currentHistory =>
-                currentHistory.map(p => {
-                    if (String(p.id) === playlistId) {
-                        return {
-                            ...p,
-                            tracks: p.tracks.filter(t => String(t.id) !== trackId),
-                        };
-                    }
-                    return p;
-                })
-            );
+            await applyPlaylistEdit(playlistId, [{ op: 'remove', track_id: Number(trackId) }]);
             toast.success(`"${trackTitle}" removed successfully.`, { id: toastId });
         } catch (err: any) {
             toast.error(`Failed to remove "${trackTitle}"`, {
                 id: toastId,
-                description: err.message || "Please try again later."
+                description: editErrorMessage(err, "Please try again later.")
             });
         }
     };
@@ -116,25 +134,16 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
         const toastId = toast.loading(`Finding and adding "${addSongTitle}" by ${addSongArtist}...`);
 
         try {
-            const newTrack = await findAndAddSpotifyTrackAPI(currentPlaylistForAdding, addSongTitle, addSongArtist);
-            setPlaylistHistory(currentHistory =>
-                currentHistory.map(p => {
-                    if (String(p.id) === currentPlaylistForAdding) {
-                        const updatedTracks = [...p.tracks, newTrack].sort((a, b) => a.order_in_playlist - b.order_in_playlist);
-                        return {
-                            ...p,
-                            tracks: updatedTracks,
-                        };
-                    }
-                    return p;
-                })
-            );
+            const result = await applyPlaylistEdit(currentPlaylistForAdding, [
+                { op: 'add', title: addSongTitle, artist: addSongArtist, resolve: true }
+            ]);
+            const newTrack = result.tracks[result.tracks.length - 1];
             toast.success(`"${newTrack.title}" by ${newTrack.artist} added successfully.`, { id: toastId });
             closeAddSongDialog();
         } catch (err: any) {
             const errorMessage = err.response?.status === 404 
                 ? `Could not find "${addSongTitle}" by ${addSongArtist} on Spotify.`
-                : err.response?.data?.detail || err.message || "Please try again.";
+                : editErrorMessage(err, "Please try again.");
             
             toast.error("Failed to add song", {
                 id: toastId,
@@ -153,7 +162,7 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
                         ...p,
                         tracks: p.tracks.map(t =>
                             String(t.id) === trackId ? updatedTrack : t
-                        ).sort((a,b) => a.order_in_playlist - b.order_in_playlist)
+                        ).sort(byOrderKey)
                     };
                 }
                 return p;
@@ -171,7 +180,7 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
                  setPlaylistHistory(currentHistory =>
                     currentHistory.map(p => {
                         if (String(p.id) === reorderModeActive) {
-                            return { ...p, tracks: originalTracksForRevert.sort((a,b) => a.order_in_playlist - b.order_in_playlist) };
+                            return { ...p, tracks: originalTracksForRevert.sort(byOrderKey) };
                         }
                         return p;
                     })
@@ -193,7 +202,7 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
             setPlaylistHistory(currentHistory =>
                 currentHistory.map(p => {
                     if (String(p.id) === playlistId) {
-                        return { ...p, tracks: originalTracksForRevert.sort((a,b) => a.order_in_playlist - b.order_in_playlist) };
+                        return { ...p, tracks: originalTracksForRevert.sort(byOrderKey) };
                     }
                     return p;
                 })
@@ -221,8 +230,8 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
         tracks[currentIndex] = tracks[targetIndex];
         tracks[targetIndex] = temp;
 
-        const updatedTracksWithOrder = tracks.map((track, index) => ({ ...track, order_in_playlist: index }));
-        setPlaylistTracksBeingReordered(updatedTracksWithOrder);
+        // Only the array order changes here; the server assigns order keys when the reorder is saved.
+        setPlaylistTracksBeingReordered(tracks);
     };
 
     const handleSaveReorderedTracks = async () => {
@@ -239,21 +248,16 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
         setPlaylistHistory(currentHistory =>
             currentHistory.map(p => {
                 if (String(p.id) === playlistId) {
-                    return { ...p, tracks: orderedTracks.map((track, index) => ({ ...track, order_in_playlist: index })) };
+                    return { ...p, tracks: orderedTracks };
                 }
                 return p;
             })
         );
 
         try {
-            const updatedPlaylistFromServer = await reorderPlaylistTracks(playlistId, orderedTrackIds);
-            setPlaylistHistory(currentHistory =>
-                currentHistory.map(p => {
-                    if (String(p.id) === playlistId) {
-                        return updatedPlaylistFromServer;
-                    }
-                    return p;
-                })
+            await applyPlaylistEdit(
+                playlistId,
+                orderedTrackIds.map((trackId, position) => ({ op: 'move' as const, track_id: Number(trackId), position }))
             );
             toast.success("Playlist order updated successfully.", { id: toastId });
             setReorderModeActive(null);
@@ -262,13 +266,13 @@ export const usePlaylistsData = (): UsePlaylistsDataReturn => {
         } catch (err: any) {
             toast.error("Failed to update playlist order.", {
                 id: toastId,
-                description: err.message || "Please try again later."
+                description: editErrorMessage(err, "Please try again later.")
             });
             if (originalTracksForRevert) {
                  setPlaylistHistory(currentHistory =>
                     currentHistory.map(p => {
                         if (String(p.id) === playlistId) {
-                            return { ...p, tracks: originalTracksForRevert.sort((a,b) => a.order_in_playlist - b.order_in_playlist) };
+                            return { ...p, tracks: originalTracksForRevert.sort(byOrderKey) };
                         }
                         return p;
                     })
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import SongFeedbackPopup from '../components/SongFeedbackPopup';
+import SongFeedbackPopup, { SongFeedback } from '../components/SongFeedbackPopup';
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import {
@@ -17,7 +17,7 @@ import { useTrackPreview, TrackPreviewStates } from '../features/playlists/hooks
 import { formatPlaylistDate } from '../features/playlists/utils/dateUtils';
 import AddSongDialog from '../features/playlists/components/AddSongDialog';
 import PlaylistTracksTable from '../features/playlists/components/PlaylistTracksTable';
-import { replacePlaylistTrack } from '../services/api';
+import { replacePlaylistTracks } from '../services/api';
 
 
 const revisedDisclaimerText = "Song suggestions for niche or highly regional genres may sometimes be inaccurate or difficult to verify. We do our best, but some tracks in this playlist might not exist due to the complexity of the LLM's suggestions. For more consistently verifiable results, try using broader genre terms or selecting more mainstream music styles.";
@@ -50,7 +50,9 @@ const PlaylistsPage: React.FC = () => {
   const { initializePreviewStatesForPlaylists, setTrackPreviewStates } = trackPreviewHook;
 
   const [showFeedbackPopup, setShowFeedbackPopup] = useState(false);
-  const [editingTrackInfo, setEditingTrackInfo] = useState<{ playlistId: string, track: Track } | null>(null);
+  // Feedback collected for one playlist until it is submitted; picking a song in another playlist starts over.
+  const [pendingFeedback, setPendingFeedback] = useState<{ playlistId: string, entries: SongFeedback[] } | null>(null);
+  const [isReplacing, setIsReplacing] = useState(false);
 
   useEffect(() => {
     if (playlistHistory && playlistHistory.length > 0) {
@@ -59,44 +61,74 @@ const PlaylistsPage: React.FC = () => {
   }, [playlistHistory, initializePreviewStatesForPlaylists]);
 
   const handleFeedbackClick = (playlistId: string, track: Track) => {
-    setEditingTrackInfo({ playlistId, track });
+    setPendingFeedback(prev => {
+      if (!prev || prev.playlistId !== playlistId) {
+        return { playlistId, entries: [{ track, rating: 0, comment: "" }] };
+      }
+      if (prev.entries.some(entry => entry.track.id === track.id)) {
+        return prev;
+      }
+      return { playlistId, entries: [...prev.entries, { track, rating: 0, comment: "" }] };
+    });
     setShowFeedbackPopup(true);
   };
 
   const handleCloseFeedbackPopup = () => {
     setShowFeedbackPopup(false);
-    setEditingTrackInfo(null);
+    setPendingFeedback(null);
   };
 
-  const handleFeedbackSubmit = async (rating: number, comment: string) => {
-    if (!editingTrackInfo) return;
+  const handleRateAnother = () => {
+    setShowFeedbackPopup(false);
+    toast.info("Pick another song in this playlist to rate.");
+  };
+
+  const handleFeedbackChange = (entries: SongFeedback[]) => {
+    setPendingFeedback(prev => (prev ? { ...prev, entries } : prev));
+  };
 
-    const { playlistId, track } = editingTrackInfo;
-    const trackId = String(track.id);
-    const originalTitle = track.title;
-    const toastId = toast.loading(`Replacing "${originalTitle}"...`);
+  const handleFeedbackSubmit = async (entries: SongFeedback[]) => {
+    if (!pendingFeedback) return;
+
+    const { playlistId } = pendingFeedback;
+    const label = entries.length === 1 ? `"${entries[0].track.title}"` : `${entries.length} songs`;
+    const toastId = toast.loading(`Replacing ${label}...`);
+    setIsReplacing(true);
 
     try {
-      const updatedTrackData = await replacePlaylistTrack(playlistId, trackId, rating, comment);
-      handleTrackReplacementInHistory(playlistId, trackId, updatedTrackData);
-      
+      const { tracks, failed } = await replacePlaylistTracks(
+        playlistId,
+        entries.map(entry => ({ track_id: Number(entry.track.id), rating: entry.rating, comment: entry.comment }))
+      );
+      tracks.forEach(updatedTrack => handleTrackReplacementInHistory(playlistId, String(updatedTrack.id), updatedTrack));
+
       setTrackPreviewStates((prev: TrackPreviewStates) => {
         const newState = { ...prev };
         if (newState[playlistId]) {
-          delete newState[playlistId][trackId];
+          tracks.forEach(updatedTrack => delete newState[playlistId][String(updatedTrack.id)]);
         }
         return newState;
       });
 
-      toast.success(`Replaced "${originalTitle}" with "${updatedTrackData.title}"`, {
-        id: toastId,
-      });
+      if (failed.length > 0) {
+        const failedTitles = entries.filter(entry => failed.includes(Number(entry.track.id))).map(entry => `"${entry.track.title}"`);
+        toast.warning(`Replaced ${tracks.length} of ${entries.length} songs`, {
+          id: toastId,
+          description: `Could not replace ${failedTitles.join(', ')}. Please try again later.`
+        });
+      } else {
+        toast.success(entries.length === 1 ? `Replaced "${entries[0].track.title}" with "${tracks[0].title}"` : `Replaced ${entries.length} songs`, {
+          id: toastId,
+        });
+      }
       handleCloseFeedbackPopup();
     } catch (error: any) {
-      toast.error(`Failed to replace "${originalTitle}"`, {
+      toast.error(`Failed to replace ${label}`, {
         id: toastId,
         description: error.response?.data?.detail || error.message || "Please try again later."
       });
+    } finally {
+      setIsReplacing(false);
     }
   };
 
@@ -217,13 +249,15 @@ const PlaylistsPage: React.FC = () => {
         </CardContent>
       </Card>
 
-      {editingTrackInfo && (
+      {pendingFeedback && (
         <SongFeedbackPopup
           open={showFeedbackPopup}
-          trackTitle={editingTrackInfo.track.title}
-          trackArtist={editingTrackInfo.track.artist}
+          feedback={pendingFeedback.entries}
+          onChange={handleFeedbackChange}
+          onRateAnother={handleRateAnother}
           onSubmit={handleFeedbackSubmit}
           onCancel={handleCloseFeedbackPopup}
+          isSubmitting={isReplacing}
         />
       )}
 
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { MoodPlaylistResponse, UserCredentials, AuthResponse, RegisterData, Playlist, PasswordResetConfirmData, Track, SpecializedPlaylist, Mood, EmotionRecommendation } from '../types';
+import { MoodPlaylistResponse, UserCredentials, AuthResponse, RegisterData, Playlist, PasswordResetConfirmData, Track, SpecializedPlaylist, Mood, EmotionRecommendation, ArchivedHistoryMonth, PlaylistOperation, PlaylistEditResult } from '../types';
 
 const API_URL = import.meta.env.VITE_API_URL || 'https://localhost:8000';
 
@@ -98,12 +98,16 @@ export const createMoodAndGetPlaylist = async (moodText: string, energyLevel: nu
     payload.detected_emotion_text = detectedEmotionText;
   }
 
-  const response = await apiClient.post<MoodPlaylistResponse>('/api/mood-playlist/', payload);
+  // One key per submission: retries of this request (including after a token refresh) get the
+  // first response back instead of generating a second playlist.
+  const response = await apiClient.post<MoodPlaylistResponse>('/api/mood-playlist/', payload, {
+    headers: { 'Idempotency-Key': crypto.randomUUID() }
+  });
   return response.data;
 };
 
 export const getPlaylistHistory = async (): Promise<Playlist[]> => {
-    const response = await apiClient.get<Playlist[]>('/api/playlists/history/'); 
+    const response = await apiClient.get<Playlist[]>('/api/playlists/history/', { params: { expand: 'tracks' } }); 
     return response.data;
 };
 
@@ -112,24 +116,40 @@ export const getSpecializedPlaylists = async (): Promise<SpecializedPlaylist[]>
   return response.data;
 };
 
-export const replacePlaylistTrack = async (
-    playlistId: string, 
-    trackId: string, 
-    rating: number, 
-    comment: string
-): Promise<Track> => {
-    const response = await apiClient.post<Track>(
-        `/api/playlists/${playlistId}/tracks/${trackId}/replace/`, 
-        {
-            rating: rating,
-            comment: comment
-        }
+export const replacePlaylistTracks = async (
+    playlistId: string,
+    replacements: { track_id: number; rating: number; comment: string }[]
+): Promise<{ tracks: Track[]; failed: number[] }> => {
+    const response = await apiClient.post<{ tracks: Track[]; failed: number[] }>(
+        `/api/playlists/${playlistId}/tracks/replace/`,
+        { replacements }
     );
     return response.data;
 };
 
 export const getMoodHistory = async (): Promise<Mood[]> => {
-    const response = await apiClient.get<Mood[]>('/api/mood-history/');
+    const response = await apiClient.get<Mood[]>('/api/mood-history/', { params: { expand: 'playlists.tracks' } });
+    return response.data;
+};
+
+// Months moved to cold storage by the backend's archive_history command, newest first ("2024-03").
+export const getArchivedHistoryMonths = async (): Promise<ArchivedHistoryMonth[]> => {
+    const response = await apiClient.get<ArchivedHistoryMonth[]>('/api/mood-history/archive/');
+    return response.data;
+};
+
+export const getArchivedMoodHistory = async (month: string): Promise<Mood[]> => {
+    const [year, monthNumber] = month.split('-').map(Number);
+    const response = await apiClient.get<Mood[]>(`/api/mood-history/archive/${year}/${monthNumber}/`);
+    return response.data;
+};
+
+// Streams the user's full history (archived months included) from the server as a downloadable file.
+export const exportHistory = async (output: 'csv' | 'ndjson', dateFrom?: string, dateTo?: string): Promise<Blob> => {
+    const response = await apiClient.get<Blob>('/api/mood-history/export/', {
+        params: { output, date_from: dateFrom, date_to: dateTo },
+        responseType: 'blob'
+    });
     return response.data;
 };
 
@@ -180,4 +200,17 @@ export const findAndAddSpotifyTrackAPI = async (
   return response.data;
 };
 
+// Applies the operations in order, atomically; with `version` the server answers 409 if the playlist changed since.
+export const editPlaylistTracks = async (
+  playlistId: string,
+  operations: PlaylistOperation[],
+  version?: number
+): Promise<PlaylistEditResult> => {
+  const response = await apiClient.patch<PlaylistEditResult>(
+    `/api/playlists/${playlistId}/tracks/`,
+    { operations, version }
+  );
+  return response.data;
+};
+
 export default apiClient;
\ No newline at end of file
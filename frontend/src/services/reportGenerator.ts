@@ -4,6 +4,7 @@ import { format } from 'date-fns';
 import { toast } from 'sonner';
 import jsPDF from 'jspdf';
 import { formatDate } from '@/utils/dateUtils';
+import { exportHistory } from '@/services/api';
 import { MoodCategoryName } from '@/data/moodConfig';
 
 interface MoodDistributionDataItem {
@@ -18,29 +19,18 @@ interface ChartMoodDataItem {
     mood_text: string;
 }
 
-export const exportMoodsToCSV = (filteredMoods: Mood[], dateRange?: DateRange) => {
-    if (filteredMoods.length === 0) {
-        toast.info("No Data to Export", { description: "There are no mood entries in the current view to export." });
+export const exportMoodsToCSV = async (dateRange?: DateRange) => {
+    // The server builds the file from the full history, so it doesn't depend on what this page has loaded.
+    const dateFrom = dateRange?.from ? format(dateRange.from, "yyyy-MM-dd") : undefined;
+    const dateTo = dateRange?.to ? format(dateRange.to, "yyyy-MM-dd") : dateFrom;
+    let blob: Blob;
+    try {
+        blob = await exportHistory('csv', dateFrom, dateTo);
+    } catch {
+        toast.error("Export Failed", { description: "The mood history could not be exported. Please try again later." });
         return;
     }
 
-    const headers = ["Timestamp", "Mood Text", "Category", "Energy Level", "Season"];
-    const rows = filteredMoods.map(mood => [
-        formatDate(mood.timestamp, 'long'),
-        `"${mood.mood_text.replace(/"/g, '""')}"`,
-        mood.category || 'N/A',
-        mood.energy_level,
-        mood.season || 'N/A'
-    ]);
-
-    let csvContent = "data:text/csv;charset=utf-8,"
-        + headers.join(",") + "\n"
-        + rows.map(e => e.join(",")).join("\n");
-
-    const encodedUri = encodeURI(csvContent);
-    const link = document.createElement("a");
-    link.setAttribute("href", encodedUri);
-
     let fileName = "mood_report";
     if (dateRange?.from) {
         fileName += `_${format(dateRange.from, "yyyy-MM-dd")}`;
@@ -50,11 +40,15 @@ export const exportMoodsToCSV = (filteredMoods: Mood[], dateRange?: DateRange) =
     }
     fileName += ".csv";
 
+    const url = URL.createObjectURL(blob);
+    const link = document.createElement("a");
+    link.setAttribute("href", url);
     link.setAttribute("download", fileName);
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
-    toast.success("Report Downloaded", { description: `Successfully exported ${filteredMoods.length} mood entries.` });
+    URL.revokeObjectURL(url);
+    toast.success("Report Downloaded", { description: "Your mood history was exported." });
 };
 
 export const generateDataPDF = async (
@@ -46,7 +46,7 @@ export interface Mood {
     bitrate: number | null;
     sample_rate: number | null;
     channels: number | null;
-    order_in_playlist: number;
+    order_key: string;
   }
   
   export interface BackendTrack {
@@ -74,6 +74,7 @@ export interface Mood {
     tracks: Track[];
     llm_fallback_count?: number;
     total_tracks_generated?: number;
+    version?: number;
   }
   
   export interface MoodPlaylistResponse {
@@ -124,4 +125,22 @@ export interface Mood {
   export interface EmotionRecommendationError {
     error: string;
   }
-  
\ No newline at end of file
+    
+  export interface ArchivedHistoryMonth {
+    month: string;
+    mood_count: number;
+    playlist_count: number;
+    track_count: number;
+  }
+
+  export type PlaylistOperation =
+    | { op: 'add'; title: string; artist: string; album?: string | null; spotify_uri?: string | null; duration?: string | null; position?: number; resolve?: boolean }
+    | { op: 'remove'; track_id: number }
+    | { op: 'move'; track_id: number; position: number }
+    | { op: 'replace'; track_id: number; title: string; artist: string; album?: string | null; spotify_uri?: string | null; duration?: string | null; resolve?: boolean };
+
+  export interface PlaylistEditResult {
+    version: number;
+    tracks: Track[];
+    removed: number[];
+  }
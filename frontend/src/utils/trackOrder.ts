@@ -0,0 +1,5 @@
+import { Track } from '@/types';
+
+// Order keys sort as plain strings; see backend/ordering.py.
+export const byOrderKey = (a: Track, b: Track): number =>
+    a.order_key < b.order_key ? -1 : a.order_key > b.order_key ? 1 : 0;